@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+
+# Valores são avaliados em escala logarítmica (gastos seguem ~log-normal)
+# e acumulados em um histograma fixo por categoria para a mediana/MAD
+FAIXAS_HISTOGRAMA = 256
+LARGURA_FAIXA = np.log(1e10) / FAIXAS_HISTOGRAMA
+
+# Só avalia categorias com histórico suficiente
+MINIMO_OBSERVACOES = 10
+LIMITE_Z = 3.0
+LIMITE_Z_ROBUSTO = 3.5
+# MAD -> desvio padrão sob normalidade
+FATOR_MAD = 1.4826
+
+
+def _log_valor(centavos):
+    return np.log(np.maximum(np.asarray(centavos, dtype=np.float64), 1.0))
+
+
+def _faixa(log_valor):
+    return np.clip((log_valor / LARGURA_FAIXA).astype(np.int64), 0, FAIXAS_HISTOGRAMA - 1)
+
+
+def _mediana_mad(histogramas):
+    """Mediana e MAD (log) de cada linha de histogramas (categorias x faixas)"""
+    centros = (np.arange(FAIXAS_HISTOGRAMA) + 0.5) * LARGURA_FAIXA
+    histogramas = np.atleast_2d(histogramas)
+    totais = histogramas.sum(axis=1)
+    metade = (totais + 1) // 2
+
+    acumulado = np.cumsum(histogramas, axis=1)
+    mediana = centros[np.argmax(acumulado >= metade[:, None], axis=1)]
+
+    # MAD: mediana das distâncias |centro - mediana| ponderadas pelas contagens
+    distancias = np.abs(centros[None, :] - mediana[:, None])
+    ordem = np.argsort(distancias, axis=1, kind='stable')
+    contagens = np.take_along_axis(histogramas, ordem, axis=1)
+    posicao = np.argmax(np.cumsum(contagens, axis=1) >= metade[:, None], axis=1)
+    mad = np.take_along_axis(distancias, ordem, axis=1)[np.arange(len(ordem)), posicao]
+    # Meia faixa de piso: histogramas concentrados em uma faixa têm MAD zero
+    return mediana, np.maximum(mad, LARGURA_FAIXA / 2)
+
+
+class DetectorAnomalias:
+    """Estatísticas online por categoria para sinalizar gastos incomuns
+
+    Cada categoria mantém média/variância pelo algoritmo de Welford e um
+    histograma de faixas fixas (escala log) de onde saem mediana e MAD.
+    Adicionar, remover e pontuar um gasto custam O(1) em relação ao
+    tamanho do histórico. Um gasto é anomalia quando fica acima do
+    limite nos dois modelos.
+    """
+
+    def __init__(self):
+        self.n = {}
+        self.media = {}
+        self.m2 = {}
+        self.histogramas = {}
+
+    @classmethod
+    def do_lote(cls, codigos, nomes, centavos):
+        """Monta o detector de uma vez a partir dos códigos de categoria (carga inicial)"""
+        detector = cls()
+        detector.adicionar_lote(codigos, nomes, centavos)
+        return detector
+
+    def adicionar_lote(self, codigos, nomes, centavos):
+        """Incorpora vários valores combinando as estatísticas por categoria (Chan et al.)"""
+        if not len(centavos):
+            return
+        n_b, media_b, m2_b, hist_b = _estatisticas(
+            np.asarray(codigos), _log_valor(centavos), len(nomes))
+        for i in np.flatnonzero(n_b).tolist():
+            nome = nomes[i]
+            n_a = self.n.get(nome, 0)
+            media_a = self.media.get(nome, 0.0)
+            n = n_a + int(n_b[i])
+            delta = media_b[i] - media_a
+            self.media[nome] = float(media_a + delta * n_b[i] / n)
+            self.m2[nome] = float(self.m2.get(nome, 0.0) + m2_b[i] +
+                                  delta ** 2 * n_a * n_b[i] / n)
+            self.n[nome] = n
+            if nome in self.histogramas:
+                self.histogramas[nome] = self.histogramas[nome] + hist_b[i]
+            else:
+                self.histogramas[nome] = hist_b[i].copy()
+
+    def adicionar(self, categoria, centavos):
+        """Atualização de Welford e do histograma — O(1)"""
+        x = float(_log_valor(centavos))
+        n = self.n.get(categoria, 0) + 1
+        media = self.media.get(categoria, 0.0)
+        delta = x - media
+        media += delta / n
+        self.n[categoria] = n
+        self.media[categoria] = media
+        self.m2[categoria] = self.m2.get(categoria, 0.0) + delta * (x - media)
+        if categoria not in self.histogramas:
+            self.histogramas[categoria] = np.zeros(FAIXAS_HISTOGRAMA, dtype=np.int64)
+        self.histogramas[categoria][_faixa(np.array([x]))[0]] += 1
+
+    def remover(self, categoria, centavos):
+        """Desfaz adicionar (exclusões e correções de categoria) — O(1)"""
+        n = self.n.get(categoria, 0)
+        if n == 0:
+            return
+        x = float(_log_valor(centavos))
+        if n == 1:
+            for estatistica in (self.n, self.media, self.m2, self.histogramas):
+                estatistica.pop(categoria, None)
+            return
+        media = self.media[categoria]
+        media_anterior = (n * media - x) / (n - 1)
+        self.m2[categoria] = max(self.m2[categoria] - (x - media_anterior) * (x - media), 0.0)
+        self.media[categoria] = media_anterior
+        self.n[categoria] = n - 1
+        self.histogramas[categoria][_faixa(np.array([x]))[0]] -= 1
+
+    def pontuar(self, categoria, centavos):
+        """Escores z (Welford) e z robusto (mediana/MAD) de um valor — O(1)"""
+        n = self.n.get(categoria, 0)
+        if n < MINIMO_OBSERVACOES:
+            return {'z': 0.0, 'z_robusto': 0.0, 'anomalia': False}
+        x = float(_log_valor(centavos))
+        desvio = np.sqrt(self.m2[categoria] / (n - 1))
+        z = (x - self.media[categoria]) / desvio if desvio > 0 else 0.0
+        mediana, mad = _mediana_mad(self.histogramas[categoria])
+        z_robusto = (x - mediana[0]) / (FATOR_MAD * mad[0])
+        return {
+            'z': float(z),
+            'z_robusto': float(z_robusto),
+            'anomalia': bool(z > LIMITE_Z and z_robusto > LIMITE_Z_ROBUSTO)
+        }
+
+    def pontuar_lote(self, codigos, nomes, centavos):
+        """Pontua vários valores contra as estatísticas atuais (sem atualizá-las)"""
+        categorias = list(self.n)
+        posicao = {c: i for i, c in enumerate(categorias)}
+        traducao = np.array([posicao.get(nome, -1) for nome in nomes] + [-1], dtype=np.int64)
+        return _pontuar(
+            traducao[np.asarray(codigos)], _log_valor(centavos),
+            np.array([self.n[c] for c in categorias], dtype=np.int64),
+            np.array([self.media[c] for c in categorias]),
+            np.array([self.m2[c] for c in categorias]),
+            np.array([self.histogramas[c] for c in categorias]).reshape(
+                len(categorias), FAIXAS_HISTOGRAMA))
+
+
+def pontuar_historico(gastos_df):
+    """Reavalia todos os gastos de uma vez, com estatísticas de cada categoria inteira
+
+    Versão em lote do detector: contagens, médias, variâncias e
+    histogramas saem de np.bincount/np.add.at sobre o DataFrame todo.
+    Retorna o DataFrame com z, z_robusto e anomalia.
+    """
+    if gastos_df.empty:
+        return gastos_df.assign(z=pd.Series(dtype=float), z_robusto=pd.Series(dtype=float),
+                                anomalia=pd.Series(dtype=bool))
+    codigos, nomes = pd.factorize(gastos_df['categoria'].astype(str))
+    x = _log_valor(gastos_df['valor_centavos'].to_numpy())
+    escores = _pontuar(codigos, x, *_estatisticas(codigos, x, len(nomes)))
+    return gastos_df.assign(**{coluna: escores[coluna].to_numpy() for coluna in escores})
+
+
+def _estatisticas(codigos, x, k):
+    """Contagem, média, M2 e histograma de cada uma das k categorias"""
+    n = np.bincount(codigos, minlength=k)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        media = np.where(n > 0, np.bincount(codigos, weights=x, minlength=k) / n, 0.0)
+    m2 = np.bincount(codigos, weights=(x - media[codigos]) ** 2, minlength=k)
+    histogramas = np.zeros((k, FAIXAS_HISTOGRAMA), dtype=np.int64)
+    np.add.at(histogramas, (codigos, _faixa(x)), 1)
+    return n, media, m2, histogramas
+
+
+def _pontuar(codigos, x, n, media, m2, histogramas):
+    """Escores de cada valor x dada a categoria (código -1: categoria desconhecida)"""
+    resultado = pd.DataFrame({'z': np.zeros(len(x)), 'z_robusto': np.zeros(len(x)),
+                              'anomalia': np.zeros(len(x), dtype=bool)})
+    if not len(n):
+        return resultado
+    mediana, mad = _mediana_mad(histogramas)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        desvio = np.sqrt(m2 / np.maximum(n - 1, 1))
+        z_categoria = np.where(desvio[codigos] > 0, (x - media[codigos]) / desvio[codigos], 0.0)
+    z_robusto = (x - mediana[codigos]) / (FATOR_MAD * mad[codigos])
+
+    avaliavel = (codigos >= 0) & (n[codigos] >= MINIMO_OBSERVACOES)
+    resultado['z'] = np.where(avaliavel, z_categoria, 0.0)
+    resultado['z_robusto'] = np.where(avaliavel, z_robusto, 0.0)
+    resultado['anomalia'] = avaliavel & (resultado['z'] > LIMITE_Z) & \
+        (resultado['z_robusto'] > LIMITE_Z_ROBUSTO)
+    return resultado
@@ -1,11 +1,23 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 from datetime import datetime, date
 import plotly.express as px
+import glob
+import gzip
 import json
+import lzma
+import os
 from data_manager import DataManager
-from calculations import FinanceCalculator
+from tenants import PoolDataManagers, ORCAMENTO_MEMORIA_PADRAO_MB
+from household import consolidar_arquivos
+from export import (COMPRESSOES, exportar_csv_comprimido, exportar_zip, gravar_comprimido,
+                    nome_exportacao)
+from calculations import FinanceCalculator, JANELAS_MOVEIS
 from visualizations import FinanceVisualizations
+from profiling import perfil
+from money import centavos_para_reais, formatar_reais, reais_para_centavos_lote
+from categorizer import CONFIANCA_MINIMA
 
 # Configuração da página
 st.set_page_config(
@@ -52,7 +64,46 @@ st.markdown("""
 
 @st.cache_resource
 def init_data_manager():
-    return DataManager()
+    # FINANCE_CARGA_COMPLETA=1 lê todas as transações na abertura (comparação no benchmark)
+    return DataManager(os.environ.get('FINANCE_DATA_FILE', 'finance_data.json'),
+                       sob_demanda=os.environ.get('FINANCE_CARGA_COMPLETA') != '1')
+
+
+@st.cache_resource
+def init_pool():
+    """Pool de DataManagers por usuário (modo multiusuário, FINANCE_DATA_DIR)"""
+    orcamento_mb = int(os.environ.get('FINANCE_MEMORY_MB', ORCAMENTO_MEMORIA_PADRAO_MB))
+    return PoolDataManagers(os.environ['FINANCE_DATA_DIR'],
+                            orcamento_bytes=orcamento_mb * 1024 * 1024)
+
+
+def usuario_da_sessao():
+    """Usuário logado (st.user), ?usuario= na URL ou informado na sidebar"""
+    try:
+        if st.user.is_logged_in:
+            return st.user.get('email') or st.user.get('name')
+    except Exception:
+        # Autenticação não configurada
+        pass
+    usuario = st.query_params.get('usuario', '')
+    return usuario or st.sidebar.text_input("👤 Usuário", key='usuario_sessao').strip()
+
+
+def init_data_manager_da_sessao():
+    """DataManager e usuário da sessão; sem FINANCE_DATA_DIR usa o arquivo único"""
+    if not os.environ.get('FINANCE_DATA_DIR'):
+        return init_data_manager(), None
+    usuario = usuario_da_sessao()
+    if not usuario:
+        st.info("👤 Informe o usuário na barra lateral para carregar seus dados.")
+        st.stop()
+    return init_pool().obter(usuario), usuario
+
+
+def registrar_carga():
+    """Reestima a memória do usuário no pool (importações, restaurações e fim de cada rerun)"""
+    if usuario_atual is not None:
+        init_pool().atualizar_memoria(usuario_atual)
 
 
 @st.cache_resource
@@ -66,11 +117,27 @@ def init_visualizations():
 
 
 # Instâncias globais
-data_manager = init_data_manager()
+data_manager, usuario_atual = init_data_manager_da_sessao()
 calculator = init_calculator()
 visualizations = init_visualizations()
 
 
+def sincronizar_com_disco():
+    """Uma checagem por rerun: relê os dados se outro processo gravou o arquivo"""
+    if data_manager.recarregar_se_alterado():
+        registrar_carga()
+        st.toast("🔄 Dados alterados por outro processo: recarregados")
+
+    if data_manager.conflito:
+        st.warning("⚠️ O arquivo de dados foi alterado por outro processo e há alterações "
+                   "suas ainda não gravadas. Para não sobrescrever o arquivo, nada mais "
+                   "será salvo até recarregar.")
+        if st.button("🔄 Recarregar do disco (descarta as alterações não gravadas)"):
+            data_manager.recarregar()
+            registrar_carga()
+            st.rerun()
+
+
 def main():
     # Header
     st.markdown('<h1 class="main-header">💰 Dashboard de Finanças Pessoais</h1>',
@@ -105,44 +172,46 @@ def main():
         secao_relatorios()
 
 
+@perfil.medir('app.dashboard_principal')
 def dashboard_principal():
     st.header("🏠 Dashboard Principal")
 
     # Métricas principais
     col1, col2, col3, col4 = st.columns(4)
 
-    # Calcular métricas
-    rendimentos_df = data_manager.get_rendimentos_df()
-    gastos_df = data_manager.get_gastos_df()
-    saldo_poupanca = data_manager.data['poupanca']['saldo_atual']
+    # Calcular métricas a partir dos totais mensais (sem ler as transações)
+    totais_rendimentos = data_manager.get_totais_mensais('rendimentos')
+    totais_gastos = data_manager.get_totais_mensais('gastos')
+    saldo_poupanca = data_manager.get_saldo_poupanca_centavos()
 
-    resumo_atual = calculator.calcular_resumo_mensal(rendimentos_df, gastos_df)
+    resumo_atual = calculator.calcular_resumo_mensal_dos_totais(
+        totais_rendimentos, totais_gastos)
 
     with col1:
         st.metric(
             label="💵 Rendimentos do Mês",
-            value=f"R\$ {resumo_atual['total_rendimentos']:,.2f}",
+            value=formatar_reais(resumo_atual['total_rendimentos_centavos']),
             delta=None
         )
 
     with col2:
         st.metric(
             label="💸 Gastos do Mês",
-            value=f"R\$ {resumo_atual['total_gastos']:,.2f}",
+            value=formatar_reais(resumo_atual['total_gastos_centavos']),
             delta=None
         )
 
     with col3:
         st.metric(
             label="💰 Saldo do Mês",
-            value=f"R\$ {resumo_atual['saldo_mensal']:,.2f}",
+            value=formatar_reais(resumo_atual['saldo_mensal_centavos']),
             delta=None
         )
 
     with col4:
         st.metric(
             label="🏦 Saldo Poupança",
-            value=f"R\$ {saldo_poupanca:,.2f}",
+            value=formatar_reais(saldo_poupanca),
             delta=None
         )
 
@@ -153,9 +222,9 @@ def dashboard_principal():
 
     with col1:
         # Gráfico de gastos por categoria
-        if not gastos_df.empty:
-            gastos_categoria = calculator.calcular_gastos_por_categoria(
-                gastos_df)
+        gastos_categoria = calculator.calcular_totais_por_rotulo(
+            totais_gastos, 'categoria')
+        if not gastos_categoria.empty:
             fig_gastos = visualizations.plot_gastos_por_categoria(
                 gastos_categoria)
             if fig_gastos:
@@ -165,9 +234,9 @@ def dashboard_principal():
 
     with col2:
         # Gráfico de rendimentos por fonte
-        if not rendimentos_df.empty:
-            rendimentos_fonte = calculator.calcular_rendimentos_por_fonte(
-                rendimentos_df)
+        rendimentos_fonte = calculator.calcular_totais_por_rotulo(
+            totais_rendimentos, 'fonte')
+        if not rendimentos_fonte.empty:
             fig_rendimentos = visualizations.plot_rendimentos_por_fonte(
                 rendimentos_fonte)
             if fig_rendimentos:
@@ -183,7 +252,179 @@ def dashboard_principal():
         if fig_evolucao:
             st.plotly_chart(fig_evolucao, use_container_width=True)
 
+    painel_orcamentos()
+    painel_anomalias()
+
+
+def painel_orcamentos():
+    """Utilização do orçamento de cada categoria no mês e alertas"""
+    status_df = data_manager.get_status_orcamentos()
+    if status_df.empty:
+        return
+
+    st.subheader("🎯 Orçamentos do Mês")
+
+    for linha in status_df.itertuples():
+        if linha.alerta == 'estourado':
+            st.error(f"🚨 {linha.categoria}: orçamento estourado em "
+                     f"{formatar_reais(-linha.restante_centavos)}")
+        elif linha.alerta == 'vai_estourar':
+            st.warning(f"📈 {linha.categoria}: no ritmo atual o mês fecha "
+                       f"{formatar_reais(linha.excesso_projetado_centavos)} acima do limite")
+        elif linha.alerta == 'atencao':
+            st.info(f"⚠️ {linha.categoria}: {linha.utilizacao:.0%} do orçamento já utilizado")
+
+    fig_orcamentos = visualizations.plot_orcamentos(status_df)
+    if fig_orcamentos:
+        st.plotly_chart(fig_orcamentos, use_container_width=True)
+
+    for linha in status_df.itertuples():
+        st.progress(
+            min(float(linha.utilizacao), 1.0),
+            text=f"{linha.categoria}: {formatar_reais(linha.gasto_centavos)} de "
+                 f"{formatar_reais(linha.limite_centavos)} "
+                 f"(restam {formatar_reais(max(linha.restante_centavos, 0))})")
+
+
+def painel_consolidacao():
+    """Relatório único de vários arquivos de dados (família ou várias contas)"""
+    st.subheader("👨‍👩‍👧 Consolidação Familiar")
+
+    pasta_padrao = os.environ.get('FINANCE_DATA_DIR') or \
+        os.path.dirname(os.path.abspath(data_manager.data_file))
+    padrao = st.text_input("📁 Arquivos de dados (padrão glob)",
+                           value=os.path.join(pasta_padrao, '*.json'),
+                           key='consolidacao_padrao')
+
+    if st.button("🔄 Consolidar", type="primary"):
+        caminhos = sorted(glob.glob(padrao))
+        if not caminhos:
+            st.warning("⚠️ Nenhum arquivo encontrado")
+            return
+        with st.spinner(f"Consolidando {len(caminhos)} arquivos..."):
+            st.session_state['consolidacao'] = consolidar_arquivos(caminhos)
+
+    consolidacao = st.session_state.get('consolidacao')
+    if consolidacao is None:
+        st.info("📁 Escolha os arquivos e clique em Consolidar")
+        return
+
+    resumo = consolidacao['resumo']
+    if resumo['arquivos_com_erro']:
+        st.warning(f"⚠️ {resumo['arquivos_com_erro']} arquivo(s) não puderam ser lidos")
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("💵 Total Rendimentos", formatar_reais(resumo['total_rendimentos_centavos']))
+    with col2:
+        st.metric("💸 Total Gastos", formatar_reais(resumo['total_gastos_centavos']))
+    with col3:
+        st.metric("💰 Saldo Líquido", formatar_reais(resumo['saldo_centavos']))
+    with col4:
+        st.metric("🏦 Poupança", formatar_reais(resumo['poupanca_centavos']))
+
+    fig_mensal = visualizations.plot_comparativo_mensal(
+        consolidacao['mensal'].to_dict('records'))
+    if fig_mensal:
+        st.plotly_chart(fig_mensal, use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        fig_gastos = visualizations.plot_gastos_por_categoria(consolidacao['categorias'])
+        if fig_gastos:
+            st.plotly_chart(fig_gastos, use_container_width=True)
+    with col2:
+        fig_rendimentos = visualizations.plot_rendimentos_por_fonte(consolidacao['fontes'])
+        if fig_rendimentos:
+            st.plotly_chart(fig_rendimentos, use_container_width=True)
+
+    objetivos_df = consolidacao['objetivos']
+    if not objetivos_df.empty:
+        st.write("**🎯 Objetivos da Família:**")
+        st.progress(float(objetivos_df['progresso_familia'].iloc[0]),
+                    text=f"Poupança somada cobre {objetivos_df['progresso_familia'].iloc[0]:.0%} "
+                         f"das metas ({formatar_reais(resumo['poupanca_centavos'])})")
+        st.dataframe(
+            objetivos_df.drop(columns=['saldo_membro_centavos', 'progresso_familia']),
+            column_config={
+                "arquivo": "Arquivo",
+                "nome": "Objetivo",
+                "valor_meta": st.column_config.NumberColumn("Meta (R\$)", format="%.2f"),
+                "prazo_meses": "Prazo (meses)",
+                "progresso_membro": st.column_config.ProgressColumn(
+                    "Progresso do Membro", min_value=0.0, max_value=1.0, format="percent")
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+
+    with st.expander(f"📁 Arquivos ({resumo['arquivos']})"):
+        st.dataframe(consolidacao['arquivos'], hide_index=True, use_container_width=True)
+
+
+def painel_anomalias():
+    """Gastos recentes com valor incomum para a categoria"""
+    st.subheader("🚨 Gastos Incomuns")
+
+    if not data_manager.transacoes_carregadas:
+        # Avaliar exige ler todos os gastos: a abertura do dashboard fica só nos totais
+        if not st.button("🔍 Verificar gastos incomuns",
+                         help="Lê os gastos do disco e procura valores fora do padrão da categoria"):
+            st.caption("Os gastos ainda não foram lidos do disco nesta sessão")
+            return
+
+    if st.button("🔄 Reavaliar histórico", help="Recalcula as anomalias de todos os gastos"):
+        data_manager.reavaliar_anomalias()
+
+    anomalias_df = data_manager.get_anomalias_df()
+    if anomalias_df.empty:
+        st.info("✅ Nenhum gasto fora do padrão encontrado")
+        return
+
+    df_display = anomalias_df[['data', 'categoria', 'descricao', 'valor_centavos', 'z_robusto']].copy()
+    df_display['valor'] = df_display.pop('valor_centavos').apply(formatar_reais)
+    df_display['data'] = df_display['data'].dt.strftime('%d/%m/%Y')
+    st.dataframe(
+        df_display[['data', 'categoria', 'descricao', 'valor', 'z_robusto']],
+        column_config={
+            "data": "Data",
+            "categoria": "Categoria",
+            "descricao": "Descrição",
+            "valor": "Valor",
+            "z_robusto": st.column_config.NumberColumn(
+                "Desvios (mediana/MAD)", format="%.1f")
+        },
+        hide_index=True,
+        use_container_width=True
+    )
 
+
+def aviso_duplicata(duplicata, tipo):
+    """Mostra o aviso de registro repetido e retorna a confirmação do usuário"""
+    if not duplicata:
+        return False
+    if duplicata == 'exata':
+        st.warning(f"⚠️ Já existe um {tipo} com a mesma data, valor e descrição")
+    else:
+        st.warning(f"⚠️ Existe um {tipo} parecido (mesmo valor, data próxima)")
+    return st.checkbox("Salvar mesmo assim", key=f"confirmar_duplicata_{tipo}")
+
+
+def marcar_gastos_duplicados(gastos_df):
+    """'duplicado' de cada linha (data, valor, descricao, categoria) frente aos gastos salvos"""
+    registros = [{
+        'id': i,
+        'categoria': categoria,
+        'valor_centavos': centavos,
+        'data': data,
+        'descricao': descricao
+    } for i, (categoria, centavos, data, descricao) in enumerate(zip(
+        gastos_df['categoria'], reais_para_centavos_lote(gastos_df['valor']).tolist(),
+        gastos_df['data'], gastos_df['descricao'].fillna('').astype(str)))]
+    return data_manager.detectar_duplicatas('gastos', registros)['duplicado'].to_numpy()
+
+
+@perfil.medir('app.secao_rendimentos')
 def secao_rendimentos():
     st.header("💵 Gestão de Rendimentos")
 
@@ -204,9 +445,15 @@ def secao_rendimentos():
             descricao = st.text_area(
                 "📝 Descrição (opcional)", placeholder="Detalhes adicionais...")
 
+        duplicata = data_manager.verificar_duplicata(
+            'rendimentos', fonte, valor, data_rendimento, descricao) if fonte else None
+        confirmar_duplicata = aviso_duplicata(duplicata, "rendimento")
+
         if st.button("💾 Salvar Rendimento", type="primary"):
             if fonte and valor > 0:
-                if data_manager.add_rendimento(fonte, valor, data_rendimento, descricao):
+                if duplicata and not confirmar_duplicata:
+                    st.error("❌ Confirme que deseja salvar o registro repetido")
+                elif data_manager.add_rendimento(fonte, valor, data_rendimento, descricao):
                     st.success("✅ Rendimento adicionado com sucesso!")
                     st.rerun()
                 else:
@@ -221,6 +468,9 @@ def secao_rendimentos():
 
         if not rendimentos_df.empty:
             # Filtros
+            busca = st.text_input(
+                "🔎 Buscar", key="busca_rendimentos",
+                placeholder="Ex.: mercado, aluguel")
             col1, col2 = st.columns(2)
 
             with col1:
@@ -239,6 +489,10 @@ def secao_rendimentos():
             # Aplicar filtros
             df_filtrado = rendimentos_df.copy()
 
+            ids_busca = data_manager.buscar('rendimentos', busca)
+            if ids_busca is not None:
+                df_filtrado = df_filtrado[df_filtrado['id'].isin(ids_busca)]
+
             if fonte_filtro != 'Todas':
                 df_filtrado = df_filtrado[df_filtrado['fonte'] == fonte_filtro]
 
@@ -249,9 +503,10 @@ def secao_rendimentos():
             # Exibir tabela
             if not df_filtrado.empty:
                 df_display = df_filtrado[[
-                    'fonte', 'valor', 'data', 'descricao']].copy()
-                df_display['valor'] = df_display['valor'].apply(
-                    lambda x: f"R\$ {x:,.2f}")
+                    'fonte', 'valor_centavos', 'data', 'descricao']].copy()
+                df_display['valor'] = df_display.pop(
+                    'valor_centavos').apply(formatar_reais)
+                df_display = df_display[['fonte', 'valor', 'data', 'descricao']]
                 df_display['data'] = df_display['data'].dt.strftime('%d/%m/%Y')
 
                 st.dataframe(
@@ -267,18 +522,20 @@ def secao_rendimentos():
                 )
 
                 # Resumo
-                total_filtrado = df_filtrado['valor'].sum()
-                st.metric("💰 Total do Período", f"R\$ {total_filtrado:,.2f}")
+                total_filtrado = df_filtrado['valor_centavos'].sum()
+                st.metric("💰 Total do Período", formatar_reais(total_filtrado))
             else:
                 st.info("📊 Nenhum rendimento encontrado com os filtros aplicados")
         else:
             st.info("📊 Nenhum rendimento cadastrado ainda")
 
 
+@perfil.medir('app.secao_gastos')
 def secao_gastos():
     st.header("💸 Gestão de Gastos")
 
-    tab1, tab2 = st.tabs(["➕ Adicionar Gasto", "📋 Histórico"])
+    tab1, tab2, tab3, tab4 = st.tabs(
+        ["➕ Adicionar Gasto", "📋 Histórico", "📥 Importar", "🎯 Orçamentos"])
 
     # Categorias predefinidas
     categorias_padrao = [
@@ -301,9 +558,23 @@ def secao_gastos():
             descricao = st.text_area(
                 "📝 Descrição (opcional)", placeholder="Detalhes do gasto...")
 
+        if data_manager.pontuar_gasto(categoria, valor)['anomalia']:
+            st.warning(f"🚨 Valor bem acima do habitual para {categoria}")
+
+        restante_orcamento = data_manager.verificar_orcamento(categoria, valor, data_gasto)
+        if restante_orcamento is not None and restante_orcamento < 0:
+            st.warning(f"🎯 Este gasto ultrapassa o orçamento de {categoria} em "
+                       f"{formatar_reais(-restante_orcamento)}")
+
+        duplicata = data_manager.verificar_duplicata(
+            'gastos', categoria, valor, data_gasto, descricao)
+        confirmar_duplicata = aviso_duplicata(duplicata, "gasto")
+
         if st.button("💾 Salvar Gasto", type="primary"):
             if categoria and valor > 0:
-                if data_manager.add_gasto(categoria, valor, data_gasto, descricao):
+                if duplicata and not confirmar_duplicata:
+                    st.error("❌ Confirme que deseja salvar o registro repetido")
+                elif data_manager.add_gasto(categoria, valor, data_gasto, descricao):
                     st.success("✅ Gasto adicionado com sucesso!")
                     st.rerun()
                 else:
@@ -318,6 +589,9 @@ def secao_gastos():
 
         if not gastos_df.empty:
             # Filtros
+            busca = st.text_input(
+                "🔎 Buscar", key="busca_gastos",
+                placeholder="Ex.: mercado, aluguel")
             col1, col2 = st.columns(2)
 
             with col1:
@@ -336,6 +610,10 @@ def secao_gastos():
             # Aplicar filtros
             df_filtrado = gastos_df.copy()
 
+            ids_busca = data_manager.buscar('gastos', busca)
+            if ids_busca is not None:
+                df_filtrado = df_filtrado[df_filtrado['id'].isin(ids_busca)]
+
             if categoria_filtro != 'Todas':
                 df_filtrado = df_filtrado[df_filtrado['categoria']
                                           == categoria_filtro]
@@ -347,9 +625,11 @@ def secao_gastos():
             # Exibir tabela
             if not df_filtrado.empty:
                 df_display = df_filtrado[['categoria',
-                                          'valor', 'data', 'descricao']].copy()
-                df_display['valor'] = df_display['valor'].apply(
-                    lambda x: f"R\$ {x:,.2f}")
+                                          'valor_centavos', 'data', 'descricao']].copy()
+                df_display['valor'] = df_display.pop(
+                    'valor_centavos').apply(formatar_reais)
+                df_display = df_display[[
+                    'categoria', 'valor', 'data', 'descricao']]
                 df_display['data'] = df_display['data'].dt.strftime('%d/%m/%Y')
 
                 st.dataframe(
@@ -365,14 +645,177 @@ def secao_gastos():
                 )
 
                 # Resumo
-                total_filtrado = df_filtrado['valor'].sum()
-                st.metric("💸 Total do Período", f"R\$ {total_filtrado:,.2f}")
+                total_filtrado = df_filtrado['valor_centavos'].sum()
+                st.metric("💸 Total do Período", formatar_reais(total_filtrado))
+
+                with st.expander("✏️ Corrigir categoria"):
+                    gastos_recentes = df_filtrado.sort_values(
+                        'data', ascending=False).head(500)
+                    rotulos = dict(zip(
+                        gastos_recentes['id'],
+                        gastos_recentes['data'].dt.strftime('%d/%m/%Y') + ' - ' +
+                        gastos_recentes['descricao'].astype(str) + ' (' +
+                        gastos_recentes['categoria'].astype(str) + ')'))
+                    gasto_id = st.selectbox(
+                        "Gasto", list(rotulos), format_func=rotulos.get,
+                        key="corrigir_gasto_id")
+                    nova_categoria = st.selectbox(
+                        "Nova categoria", categorias_padrao, key="corrigir_gasto_categoria")
+                    if st.button("💾 Salvar Categoria"):
+                        if data_manager.corrigir_categoria_gasto(int(gasto_id), nova_categoria):
+                            st.success("✅ Categoria corrigida!")
+                            st.rerun()
+                        else:
+                            st.warning("⚠️ O gasto já está nessa categoria")
             else:
                 st.info("📊 Nenhum gasto encontrado com os filtros aplicados")
         else:
             st.info("📊 Nenhum gasto cadastrado ainda")
 
+    with tab3:
+        st.subheader("Importar Gastos de CSV")
+        st.caption(
+            "Colunas: data, valor, descricao (categoria é opcional). "
+            "Gastos sem categoria recebem uma sugestão automática.")
+
+        arquivo_csv = st.file_uploader(
+            "📁 Escolher arquivo CSV", type=['csv'], key="importar_gastos_csv")
+
+        if arquivo_csv is not None:
+            try:
+                importados = pd.read_csv(arquivo_csv)
+            except Exception as e:
+                importados = None
+                st.error(f"❌ Erro ao ler CSV: {str(e)}")
+
+            colunas_faltando = {'data', 'valor', 'descricao'} - \
+                set(importados.columns) if importados is not None else set()
+            if colunas_faltando:
+                st.error(
+                    f"❌ Colunas ausentes: {', '.join(sorted(colunas_faltando))}")
+            elif importados is not None and not importados.empty:
+                # Colunas convertidas de uma vez; linhas com valor ou data inválidos ficam de fora
+                valores = pd.to_numeric(importados['valor'], errors='coerce')
+                datas = pd.to_datetime(importados['data'], format='mixed', errors='coerce')
+                invalidas = valores.isna() | ~(valores > 0) | datas.isna()
+                if invalidas.any():
+                    linhas = ', '.join(str(i + 2) for i in np.flatnonzero(invalidas.to_numpy())[:20])
+                    st.error(f"❌ {int(invalidas.sum())} linha(s) com valor ou data inválidos "
+                             f"ignoradas (linhas do CSV: {linhas})")
+                importados = importados[~invalidas].assign(
+                    valor=valores[~invalidas], data=datas[~invalidas].dt.strftime('%Y-%m-%d')
+                ).reset_index(drop=True)
+
+            if not colunas_faltando and importados is not None and not importados.empty:
+                sugestoes = data_manager.sugerir_categorias(
+                    importados['descricao'].fillna('').astype(str))
+                if 'categoria' not in importados.columns:
+                    importados['categoria'] = None
+                sem_categoria = importados['categoria'].isna()
+                importados.loc[sem_categoria, 'categoria'] = \
+                    sugestoes.loc[sem_categoria, 'categoria_sugerida']
+                importados['confianca'] = sugestoes['confianca'].where(
+                    sem_categoria, 1.0)
+                importados['revisar'] = importados['confianca'] < CONFIANCA_MINIMA
+
+                importados['duplicado'] = marcar_gastos_duplicados(importados)
+
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric("⚠️ Para revisar", int(importados['revisar'].sum()),
+                              help=f"Sugestões com confiança abaixo de {CONFIANCA_MINIMA:.0%}")
+                with col2:
+                    st.metric("🔁 Já cadastrados", int(importados['duplicado'].sum()),
+                              help="Mesma data, valor, categoria e descrição de um gasto existente")
+                ignorar_duplicados = st.checkbox(
+                    "Ignorar gastos já cadastrados", value=True, key="importar_ignorar_duplicados")
+
+                opcoes_categoria = sorted(
+                    set(categorias_padrao) | set(importados['categoria'].dropna()))
+                editados = st.data_editor(
+                    importados[['revisar', 'duplicado', 'data', 'valor', 'descricao',
+                                'categoria', 'confianca']],
+                    column_config={
+                        "revisar": st.column_config.CheckboxColumn("Revisar"),
+                        "duplicado": st.column_config.CheckboxColumn("Já cadastrado"),
+                        "data": "Data",
+                        "valor": st.column_config.NumberColumn("Valor (R\$)", format="%.2f"),
+                        "descricao": "Descrição",
+                        "categoria": st.column_config.SelectboxColumn(
+                            "Categoria", options=opcoes_categoria),
+                        "confianca": st.column_config.ProgressColumn(
+                            "Confiança", min_value=0.0, max_value=1.0, format="%.2f")
+                    },
+                    disabled=['revisar', 'duplicado', 'data', 'valor', 'descricao', 'confianca'],
+                    hide_index=True,
+                    use_container_width=True,
+                    key="importar_gastos_editor"
+                )
+
+                # A categoria pode ter sido trocada no editor: confere de novo com a escolhida
+                editados = editados.assign(duplicado=marcar_gastos_duplicados(editados))
+                if ignorar_duplicados:
+                    editados = editados[~editados['duplicado']]
+
+                if st.button(f"📥 Importar {len(editados)} gastos", type="primary"):
+                    if editados['categoria'].isna().any():
+                        st.error("❌ Defina a categoria de todos os gastos")
+                    elif data_manager.importar_gastos(editados):
+                        registrar_carga()
+                        st.success("✅ Gastos importados!")
+                        st.rerun()
+                    else:
+                        st.error("❌ Erro ao importar gastos")
+
+        with st.expander("📐 Regras de categorização"):
+            st.write("Descrições que contêm as palavras abaixo vão sempre para a categoria escolhida.")
+            col1, col2 = st.columns(2)
+            with col1:
+                palavras_regra = st.text_input(
+                    "Palavras-chave", placeholder="Ex.: uber", key="regra_palavras")
+            with col2:
+                categoria_regra = st.selectbox(
+                    "Categoria", categorias_padrao, key="regra_categoria")
+            if st.button("➕ Adicionar Regra"):
+                if data_manager.adicionar_regra_categoria(palavras_regra, categoria_regra):
+                    st.success("✅ Regra adicionada!")
+                    st.rerun()
+                else:
+                    st.error("❌ Informe ao menos uma palavra")
+
+            regras = data_manager.categorizador.regras
+            if regras:
+                st.dataframe(
+                    pd.DataFrame(list(regras.items()),
+                                 columns=['Palavras-chave', 'Categoria']),
+                    hide_index=True, use_container_width=True)
+
+    with tab4:
+        st.subheader("Orçamentos Mensais por Categoria")
+        st.caption("Limite de gasto por mês; valor zero remove o orçamento.")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            categoria_orcamento = st.selectbox(
+                "🏷️ Categoria", categorias_padrao, key="orcamento_categoria")
+        with col2:
+            limite_orcamento = st.number_input(
+                "💰 Limite Mensal (R\$)", min_value=0.0, step=50.0,
+                value=centavos_para_reais(
+                    data_manager.data['orcamentos'].get(categoria_orcamento, 0)),
+                key="orcamento_limite")
+
+        if st.button("💾 Salvar Orçamento"):
+            if data_manager.definir_orcamento(categoria_orcamento, limite_orcamento):
+                st.success("✅ Orçamento atualizado!")
+                st.rerun()
+            else:
+                st.error("❌ Informe um limite maior que zero")
+
+        painel_orcamentos()
+
 
+@perfil.medir('app.secao_poupanca')
 def secao_poupanca():
     st.header("🏦 Gestão da Poupança")
 
@@ -384,15 +827,29 @@ def secao_poupanca():
 
         with col1:
             st.subheader("Saldo Atual da Poupança")
-            saldo_atual = data_manager.data['poupanca']['saldo_atual']
-            st.metric("💰 Saldo", f"R\$ {saldo_atual:,.2f}")
+            saldo_atual = data_manager.get_saldo_poupanca_centavos()
+            st.metric("💰 Saldo", formatar_reais(saldo_atual))
+
+            verificacao = data_manager.verificar_saldo_poupanca()
+            if not verificacao['consistente']:
+                st.warning(
+                    f"⚠️ Saldo salvo ({formatar_reais(verificacao['saldo_salvo_centavos'])}) "
+                    f"difere do recalculado pelo histórico "
+                    f"({formatar_reais(verificacao['saldo_recalculado_centavos'])})")
 
             # Histórico de movimentações
             historico_df = data_manager.get_poupanca_historico_df()
             if not historico_df.empty:
+                rendimento_df = data_manager.get_poupanca_rendimento_df()
+                saldo_rendido = int(
+                    rendimento_df['saldo_com_rendimento_centavos'].iloc[-1])
+                st.metric("📈 Saldo com Rendimento CDI", formatar_reais(saldo_rendido),
+                          delta=formatar_reais(saldo_rendido - saldo_atual),
+                          help="Rendimento diário composto em dias úteis (base 252) sobre cada movimentação")
+
                 # Usar a função melhorada
                 fig_evolucao = visualizations.plot_evolucao_poupanca_melhorado(
-                    historico_df)
+                    historico_df, rendimento_df)
                 if fig_evolucao:
                     st.plotly_chart(fig_evolucao, use_container_width=True)
                 else:
@@ -411,15 +868,20 @@ def secao_poupanca():
             operacao = st.selectbox("🔄 Operação", ["deposito", "saque"])
             valor_operacao = st.number_input(
                 "💰 Valor (R\$)", min_value=0.01, step=0.01)
+            data_operacao = st.date_input(
+                "📅 Data", value=date.today(), key="poupanca_data",
+                help="Datas passadas registram a operação retroativamente")
             descricao_operacao = st.text_input(
                 "📝 Descrição", placeholder="Motivo da operação...")
 
             if st.button("💾 Executar Operação", type="primary"):
                 if valor_operacao > 0:
-                    if operacao == "saque" and valor_operacao > saldo_atual:
+                    # Um saque retroativo não pode deixar saldo negativo em nenhum dia seguinte
+                    saldo_disponivel = data_manager.get_saldo_sacavel_centavos(data_operacao)
+                    if operacao == "saque" and valor_operacao > centavos_para_reais(saldo_disponivel):
                         st.error("❌ Saldo insuficiente para saque")
                     else:
-                        if data_manager.update_poupanca(operacao, valor_operacao, descricao_operacao):
+                        if data_manager.update_poupanca(operacao, valor_operacao, descricao_operacao, data_operacao):
                             emoji = "📈" if operacao == "deposito" else "📉"
                             st.success(
                                 f"✅ {emoji} {operacao.capitalize()} realizado com sucesso!")
@@ -469,11 +931,13 @@ def secao_poupanca():
             # Exibir tabela
             if not df_filtrado.empty:
                 df_display = df_filtrado[[
-                    'operacao', 'valor', 'saldo_atual', 'data', 'descricao']].copy()
-                df_display['valor'] = df_display['valor'].apply(
-                    lambda x: f"R\$ {x:,.2f}")
-                df_display['saldo_atual'] = df_display['saldo_atual'].apply(
-                    lambda x: f"R\$ {x:,.2f}")
+                    'operacao', 'valor_centavos', 'saldo_atual_centavos', 'data', 'descricao']].copy()
+                df_display['valor'] = df_display.pop(
+                    'valor_centavos').apply(formatar_reais)
+                df_display['saldo_atual'] = df_display.pop(
+                    'saldo_atual_centavos').apply(formatar_reais)
+                df_display = df_display[[
+                    'operacao', 'valor', 'saldo_atual', 'data', 'descricao']]
 
                 # Formatar data
                 if 'data' in df_display.columns:
@@ -499,25 +963,80 @@ def secao_poupanca():
                 # Estatísticas do período
                 col_a, col_b, col_c = st.columns(3)
 
-                total_depositos = df_filtrado[df_filtrado['operacao'] == 'deposito']['valor'].sum(
+                total_depositos = df_filtrado[df_filtrado['operacao'] == 'deposito']['valor_centavos'].sum(
                 )
-                total_saques = df_filtrado[df_filtrado['operacao'] == 'saque']['valor'].sum(
+                total_saques = df_filtrado[df_filtrado['operacao'] == 'saque']['valor_centavos'].sum(
                 )
                 saldo_periodo = total_depositos - total_saques
 
                 with col_a:
                     st.metric("📈 Total Depósitos",
-                              f"R\$ {total_depositos:,.2f}")
+                              formatar_reais(total_depositos))
 
                 with col_b:
-                    st.metric("📉 Total Saques", f"R\$ {total_saques:,.2f}")
+                    st.metric("📉 Total Saques", formatar_reais(total_saques))
 
                 with col_c:
                     st.metric("Saldo do Período",
-                              f"R\$ {saldo_periodo:,.2f}")
+                              formatar_reais(saldo_periodo))
 
             else:
                 st.info("📊 Nenhuma movimentação encontrada com os filtros aplicados")
+
+            # Correção de movimentações passadas
+            with st.expander("✏️ Corrigir Movimentação"):
+                itens = historico_df.set_index('id')
+                operacao_id = st.selectbox(
+                    "Movimentação",
+                    list(itens.index),
+                    format_func=lambda i: (
+                        f"#{i} - {itens.at[i, 'data']:%d/%m/%Y} - {itens.at[i, 'operacao']} "
+                        f"{formatar_reais(itens.at[i, 'valor_centavos'])}"),
+                    key="corrigir_id"
+                )
+                item = itens.loc[operacao_id]
+
+                col_a, col_b = st.columns(2)
+                with col_a:
+                    operacao_corrigida = st.selectbox(
+                        "🔄 Operação", ["deposito", "saque"],
+                        index=0 if item['operacao'] == "deposito" else 1,
+                        key="corrigir_operacao")
+                    valor_corrigido = st.number_input(
+                        "💰 Valor (R\$)", min_value=0.01, step=0.01,
+                        value=centavos_para_reais(
+                            int(item['valor_centavos'])),
+                        key="corrigir_valor")
+                with col_b:
+                    data_corrigida = st.date_input(
+                        "📅 Data", value=item['data'].date(), key="corrigir_data")
+                    descricao_corrigida = st.text_input(
+                        "📝 Descrição", value=item.get('descricao') or "",
+                        key="corrigir_descricao")
+
+                col_a, col_b = st.columns(2)
+                with col_a:
+                    if st.button("💾 Salvar Correção"):
+                        if data_manager.get_saldo_minimo_apos_correcao(
+                                int(operacao_id), operacao_corrigida, valor_corrigido,
+                                data_corrigida) < 0:
+                            st.error("❌ A correção deixaria o saldo da poupança negativo")
+                        elif data_manager.corrigir_operacao_poupanca(
+                                int(operacao_id), operacao_corrigida, valor_corrigido,
+                                data_corrigida, descricao_corrigida):
+                            st.success("✅ Movimentação corrigida!")
+                            st.rerun()
+                        else:
+                            st.error("❌ Erro ao corrigir movimentação")
+                with col_b:
+                    if st.button("🗑️ Excluir Movimentação"):
+                        if data_manager.get_saldo_minimo_sem_operacao(int(operacao_id)) < 0:
+                            st.error("❌ Sem esta movimentação o saldo da poupança ficaria negativo")
+                        elif data_manager.delete_operacao_poupanca(int(operacao_id)):
+                            st.success("✅ Movimentação excluída!")
+                            st.rerun()
+                        else:
+                            st.error("❌ Erro ao excluir movimentação")
         else:
             st.info("📊 Nenhuma movimentação registrada ainda")
 
@@ -536,14 +1055,30 @@ def secao_poupanca():
             step=0.01,
             help="Taxa de rendimento anual para cálculos de simulação"
         )
+        vigencia_taxa = st.date_input(
+            "📅 Vigente a partir de", value=date.today(), key="taxa_vigencia",
+            help="Datas passadas corrigem o rendimento histórico da poupança")
 
         if st.button("💾 Atualizar Taxa CDI"):
-            if data_manager.update_taxa_cdi(nova_taxa):
+            if data_manager.update_taxa_cdi(nova_taxa, vigencia_taxa):
                 st.success("✅ Taxa CDI atualizada com sucesso!")
                 st.rerun()
             else:
                 st.error("❌ Erro ao atualizar taxa CDI")
 
+        with st.expander("📜 Histórico de Taxas"):
+            taxas_df = pd.DataFrame(
+                data_manager.data['poupanca']['historico_taxas'])
+            st.dataframe(
+                taxas_df,
+                column_config={
+                    "data": "Vigente desde",
+                    "taxa": st.column_config.NumberColumn("Taxa (% a.a.)", format="%.2f")
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+
         st.divider()
 
         # Informações adicionais
@@ -564,6 +1099,7 @@ def secao_poupanca():
             """)
 
 
+@perfil.medir('app.secao_objetivos_simulacoes')
 def secao_objetivos_simulacoes():
     st.header("🎯 Objetivos e Simulações")
 
@@ -599,7 +1135,8 @@ def secao_objetivos_simulacoes():
             st.subheader("Objetivos Cadastrados")
 
             objetivos = data_manager.data['objetivos']
-            saldo_atual = data_manager.data['poupanca']['saldo_atual']
+            saldo_atual = centavos_para_reais(
+                data_manager.get_saldo_poupanca_centavos())
             taxa_cdi = data_manager.data['poupanca']['taxa_cdi']
 
             if objetivos:
@@ -647,16 +1184,22 @@ def secao_objetivos_simulacoes():
             saldo_inicial_sim = st.number_input(
                 "💰 Saldo Inicial (R\$)",
                 min_value=0.0,
-                value=float(data_manager.data['poupanca']['saldo_atual']),
+                value=centavos_para_reais(
+                    data_manager.get_saldo_poupanca_centavos()),
                 step=100.0
             )
 
-            aporte_mensal_sim = st.number_input(
-                "💵 Aporte Mensal (R\$)",
-                min_value=0.0,
-                value=500.0,
-                step=50.0
-            )
+            origem_aporte = st.radio(
+                "💵 Aporte Mensal",
+                ["🔁 Fluxo recorrente projetado", "✍️ Valor fixo"],
+                key="origem_aporte_sim")
+            if origem_aporte.startswith("✍️"):
+                aporte_mensal_sim = st.number_input(
+                    "💵 Aporte Mensal (R\$)",
+                    min_value=0.0,
+                    value=500.0,
+                    step=50.0
+                )
 
             taxa_anual_sim = st.slider(
                 "📊 Taxa Anual (%)",
@@ -674,6 +1217,20 @@ def secao_objetivos_simulacoes():
                 step=1
             )
 
+            if origem_aporte.startswith("🔁"):
+                # Saldo mensal esperado das recorrências vira o aporte de cada mês
+                recorrencias_rendimentos = calculator.detectar_recorrencias(
+                    data_manager.get_rendimentos_df(), 'fonte')
+                recorrencias_gastos = calculator.detectar_recorrencias(
+                    data_manager.get_gastos_df(), 'categoria')
+                fluxo_df = calculator.projetar_fluxo_caixa(
+                    recorrencias_rendimentos, recorrencias_gastos, periodo_meses_sim)
+                aporte_mensal_sim = fluxo_df['saldo_mensal'].clip(lower=0).to_numpy()
+                st.metric("💵 Aporte médio esperado",
+                          f"R\$ {calculator.calcular_aporte_esperado(fluxo_df):,.2f}")
+                if not aporte_mensal_sim.any():
+                    st.caption("Nenhuma sobra mensal recorrente detectada: aportes zerados")
+
         with col2:
             # Executar simulação
             simulacao_df = calculator.simular_crescimento_poupanca(
@@ -691,8 +1248,8 @@ def secao_objetivos_simulacoes():
 
             # Resultados
             saldo_final = simulacao_df['saldo'].iloc[-1]
-            total_investido = saldo_inicial_sim + \
-                (aporte_mensal_sim * periodo_meses_sim)
+            total_investido = saldo_inicial_sim + float(np.sum(np.resize(
+                np.asarray(aporte_mensal_sim, dtype=float), periodo_meses_sim)))
             rendimento_total = saldo_final - total_investido
 
             col_a, col_b, col_c = st.columns(3)
@@ -706,6 +1263,35 @@ def secao_objetivos_simulacoes():
             with col_c:
                 st.metric("📈 Rendimento", f"R\$ {rendimento_total:,.2f}")
 
+        if origem_aporte.startswith("🔁"):
+            with st.expander("🔁 Recorrências detectadas e fluxo projetado"):
+                fig_fluxo = visualizations.plot_fluxo_projetado(fluxo_df)
+                if fig_fluxo:
+                    st.plotly_chart(fig_fluxo, use_container_width=True)
+
+                for titulo, recorrencias, campo in (
+                        ("💵 Rendimentos recorrentes", recorrencias_rendimentos, 'fonte'),
+                        ("💸 Gastos recorrentes", recorrencias_gastos, 'categoria')):
+                    st.write(f"**{titulo}**")
+                    if recorrencias.empty:
+                        st.info("Nenhuma recorrência encontrada")
+                        continue
+                    st.dataframe(
+                        recorrencias[[campo, 'descricao', 'periodo', 'valor',
+                                      'ocorrencias', 'proxima_data', 'ativa']],
+                        column_config={
+                            campo: campo.capitalize(),
+                            "descricao": "Descrição",
+                            "periodo": "Período",
+                            "valor": st.column_config.NumberColumn("Valor (R\$)", format="%.2f"),
+                            "ocorrencias": "Ocorrências",
+                            "proxima_data": st.column_config.DateColumn("Próxima", format="DD/MM/YYYY"),
+                            "ativa": "Ativa"
+                        },
+                        hide_index=True,
+                        use_container_width=True
+                    )
+
     with tab3:
         st.subheader("🧮 Calculadora de Objetivos")
 
@@ -716,8 +1302,8 @@ def secao_objetivos_simulacoes():
 
             valor_meta_calc = st.number_input(
                 "🎯 Valor do Objetivo (R\$)", min_value=1.0, step=100.0, value=10000.0)
-            saldo_atual_calc = st.number_input("💰 Saldo Atual (R\$)", min_value=0.0, step=100.0, value=float(
-                data_manager.data['poupanca']['saldo_atual']))
+            saldo_atual_calc = st.number_input("💰 Saldo Atual (R\$)", min_value=0.0, step=100.0, value=centavos_para_reais(
+                data_manager.get_saldo_poupanca_centavos()))
             prazo_calc = st.number_input(
                 "📅 Prazo (meses)", min_value=1, max_value=600, step=1, value=24)
             taxa_calc = st.number_input("📊 Taxa Anual (%)", min_value=0.1, max_value=50.0, step=0.1, value=float(
@@ -747,8 +1333,8 @@ def secao_objetivos_simulacoes():
 
             valor_meta_tempo = st.number_input(
                 "🎯 Valor do Objetivo (R\$)", min_value=1.0, step=100.0, value=10000.0, key="tempo_meta")
-            saldo_atual_tempo = st.number_input("💰 Saldo Atual (R\$)", min_value=0.0, step=100.0, value=float(
-                data_manager.data['poupanca']['saldo_atual']), key="tempo_saldo")
+            saldo_atual_tempo = st.number_input("💰 Saldo Atual (R\$)", min_value=0.0, step=100.0, value=centavos_para_reais(
+                data_manager.get_saldo_poupanca_centavos()), key="tempo_saldo")
             aporte_mensal_tempo = st.number_input(
                 "💵 Aporte Mensal (R\$)", min_value=0.0, step=50.0, value=500.0, key="tempo_aporte")
             taxa_tempo = st.number_input("📊 Taxa Anual (%)", min_value=0.1, max_value=50.0, step=0.1, value=float(
@@ -780,11 +1366,22 @@ def secao_objetivos_simulacoes():
                     st.error("❌ Meta muito alta ou aportes insuficientes")
 
 
+def abrir_backup(arquivo):
+    """Backup enviado, descomprimindo .gz e .xz"""
+    if arquivo.name.endswith('.gz'):
+        return gzip.open(arquivo)
+    if arquivo.name.endswith('.xz'):
+        return lzma.open(arquivo)
+    return arquivo
+
+
+@perfil.medir('app.secao_relatorios')
 def secao_relatorios():
     st.header("📊 Relatórios e Análises")
 
-    tab1, tab2, tab3 = st.tabs(
-        ["📈 Resumo Geral", "📊 Análise Mensal", "📋 Exportar Dados"])
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(
+        ["📈 Resumo Geral", "📊 Análise Mensal", "📉 Tendências", "🔮 Previsões",
+         "👨‍👩‍👧 Consolidação", "📋 Exportar Dados"])
 
     with tab1:
         st.subheader("Resumo Geral das Finanças")
@@ -797,23 +1394,24 @@ def secao_relatorios():
         # Métricas gerais
         col1, col2, col3, col4 = st.columns(4)
 
-        total_rendimentos = rendimentos_df['valor'].sum(
+        total_rendimentos = rendimentos_df['valor_centavos'].sum(
         ) if not rendimentos_df.empty else 0
-        total_gastos = gastos_df['valor'].sum() if not gastos_df.empty else 0
+        total_gastos = gastos_df['valor_centavos'].sum(
+        ) if not gastos_df.empty else 0
         saldo_total = total_rendimentos - total_gastos
-        saldo_poupanca = data_manager.data['poupanca']['saldo_atual']
+        saldo_poupanca = data_manager.get_saldo_poupanca_centavos()
 
         with col1:
-            st.metric("💵 Total Rendimentos", f"R\$ {total_rendimentos:,.2f}")
+            st.metric("💵 Total Rendimentos", formatar_reais(total_rendimentos))
 
         with col2:
-            st.metric("💸 Total Gastos", f"R\$ {total_gastos:,.2f}")
+            st.metric("💸 Total Gastos", formatar_reais(total_gastos))
 
         with col3:
-            st.metric("💰 Saldo Líquido", f"R\$ {saldo_total:,.2f}")
+            st.metric("💰 Saldo Líquido", formatar_reais(saldo_total))
 
         with col4:
-            st.metric("🏦 Poupança", f"R\$ {saldo_poupanca:,.2f}")
+            st.metric("🏦 Poupança", formatar_reais(saldo_poupanca))
 
         st.divider()
 
@@ -845,50 +1443,35 @@ def secao_relatorios():
             if fig_evolucao:
                 st.plotly_chart(fig_evolucao, use_container_width=True)
 
+        # Caixa, poupança e patrimônio no livro único
+        patrimonio_df = data_manager.get_patrimonio_df()
+        if not patrimonio_df.empty:
+            fig_patrimonio = visualizations.plot_patrimonio(patrimonio_df)
+            if fig_patrimonio:
+                st.plotly_chart(fig_patrimonio, use_container_width=True)
+
     with tab2:
         st.subheader("📊 Análise Mensal Comparativa")
 
-        # Calcular resumos mensais
-        resumos_mensais = []
-
-        if not rendimentos_df.empty or not gastos_df.empty:
-            # Obter todos os meses únicos
-            meses_rendimentos = set()
-            meses_gastos = set()
-
-            if not rendimentos_df.empty:
-                rendimentos_df['data'] = pd.to_datetime(rendimentos_df['data'])
-                meses_rendimentos = set(
-                    rendimentos_df['data'].dt.strftime('%Y-%m'))
-
-            if not gastos_df.empty:
-                gastos_df['data'] = pd.to_datetime(gastos_df['data'])
-                meses_gastos = set(gastos_df['data'].dt.strftime('%Y-%m'))
-
-            todos_meses = sorted(meses_rendimentos.union(meses_gastos))
-
-            for mes in todos_meses:
-                resumo = calculator.calcular_resumo_mensal(
-                    rendimentos_df, gastos_df, mes)
-                resumos_mensais.append(resumo)
+        # Resumo de todos os meses de uma vez
+        resumos_df = calculator.calcular_resumos_mensais(rendimentos_df, gastos_df)
 
-        if resumos_mensais:
+        if not resumos_df.empty:
             # Gráfico comparativo mensal
             fig_comparativo = visualizations.plot_comparativo_mensal(
-                resumos_mensais)
+                resumos_df.to_dict('records'))
             if fig_comparativo:
                 st.plotly_chart(fig_comparativo, use_container_width=True)
 
             # Tabela de resumos mensais
             st.subheader("📋 Tabela Resumo Mensal")
 
-            df_resumos = pd.DataFrame(resumos_mensais)
-            df_resumos['total_rendimentos'] = df_resumos['total_rendimentos'].apply(
-                lambda x: f"R\$ {x:,.2f}")
-            df_resumos['total_gastos'] = df_resumos['total_gastos'].apply(
-                lambda x: f"R\$ {x:,.2f}")
-            df_resumos['saldo_mensal'] = df_resumos['saldo_mensal'].apply(
-                lambda x: f"R\$ {x:,.2f}")
+            df_resumos = pd.DataFrame({
+                'mes_ano': resumos_df['mes_ano'],
+                'total_rendimentos': resumos_df['total_rendimentos_centavos'].apply(formatar_reais),
+                'total_gastos': resumos_df['total_gastos_centavos'].apply(formatar_reais),
+                'saldo_mensal': resumos_df['saldo_mensal_centavos'].apply(formatar_reais)
+            })
 
             st.dataframe(
                 df_resumos,
@@ -904,7 +1487,136 @@ def secao_relatorios():
         else:
             st.info("📊 Adicione rendimentos e gastos para ver a análise mensal")
 
+        # Orçado x realizado de todos os meses em uma passada
+        comparacao_df = calculator.comparar_orcamentos(
+            data_manager.get_gastos_df(), data_manager.data['orcamentos'])
+        if not comparacao_df.empty:
+            st.subheader("🎯 Orçado x Realizado")
+            fig_comparacao = visualizations.plot_orcado_realizado(comparacao_df)
+            if fig_comparacao:
+                st.plotly_chart(fig_comparacao, use_container_width=True)
+
+            resumo_orcamentos = comparacao_df.groupby('categoria', sort=False).agg(
+                meses_estourados=('estourou', 'sum'),
+                utilizacao_media=('utilizacao', 'mean'),
+                diferenca_centavos=('diferenca_centavos', 'sum')).reset_index()
+            st.dataframe(
+                pd.DataFrame({
+                    'categoria': resumo_orcamentos['categoria'],
+                    'meses_estourados': resumo_orcamentos['meses_estourados'],
+                    'utilizacao_media': resumo_orcamentos['utilizacao_media'],
+                    'diferenca': resumo_orcamentos['diferenca_centavos'].apply(formatar_reais)
+                }),
+                column_config={
+                    "categoria": "Categoria",
+                    "meses_estourados": "Meses acima do limite",
+                    "utilizacao_media": st.column_config.NumberColumn(
+                        "Utilização média", format="percent"),
+                    "diferenca": "Sobra acumulada"
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+
     with tab3:
+        st.subheader("📉 Tendências Diárias e Semanais")
+
+        serie_df = data_manager.get_serie_diaria_df()
+        if serie_df.empty:
+            st.info("📊 Adicione rendimentos e gastos para ver as tendências")
+        else:
+            periodos = {"Últimos 90 dias": 90, "Últimos 6 meses": 182,
+                        "Último ano": 365, "Todo o histórico": None}
+            periodo = st.selectbox("📅 Período", list(periodos), index=2, key="periodo_tendencias")
+
+            # As janelas usam o histórico inteiro; o período só recorta a exibição
+            janelas_df = calculator.calcular_janelas_moveis(serie_df)
+            semanal_df = calculator.calcular_agregados_semanais(serie_df)
+            if periodos[periodo]:
+                janelas_df = janelas_df.tail(periodos[periodo])
+                semanal_df = semanal_df.tail(periodos[periodo] // 7 + 1)
+
+            col1, col2, col3 = st.columns(3)
+            ultimo = janelas_df.iloc[-1]
+            for coluna, w in zip((col1, col2, col3), JANELAS_MOVEIS):
+                with coluna:
+                    st.metric(f"💸 Gastos últimos {w} dias",
+                              formatar_reais(int(ultimo[f'gastos_{w}d_centavos'])),
+                              help=f"Média de {formatar_reais(round(ultimo[f'gastos_{w}d_media'] * 100))} por dia")
+
+            canal = st.radio("Série", ["gastos", "rendimentos"], horizontal=True,
+                             format_func=str.capitalize, key="canal_tendencias")
+            fig_janelas = visualizations.plot_janelas_moveis(janelas_df, canal, JANELAS_MOVEIS)
+            if fig_janelas:
+                st.plotly_chart(fig_janelas, use_container_width=True)
+
+            fig_semanal = visualizations.plot_agregados_semanais(semanal_df)
+            if fig_semanal:
+                st.plotly_chart(fig_semanal, use_container_width=True)
+
+            fig_acumulado = visualizations.plot_fluxo_acumulado(janelas_df)
+            if fig_acumulado:
+                st.plotly_chart(fig_acumulado, use_container_width=True)
+
+    with tab4:
+        st.subheader("🔮 Previsão de Gastos por Categoria")
+
+        meses_previsao = st.slider(
+            "📅 Meses à frente", min_value=1, max_value=12, value=6, key="meses_previsao")
+        # Cache pela versão dos dados: reruns sem alteração não reajustam os modelos
+        previsao_df = data_manager.em_cache_da_versao(
+            'previsao_gastos', meses_previsao,
+            lambda: calculator.prever_gastos_por_categoria(gastos_df, meses_previsao))
+
+        if previsao_df.empty:
+            st.info("📊 São necessários pelo menos 3 meses completos de gastos para prever")
+        else:
+            proximo_mes = previsao_df[previsao_df['horizonte'] == 1].sort_values(
+                'previsto_centavos', ascending=False)
+            categorias = st.multiselect(
+                "🏷️ Categorias", proximo_mes['categoria'].tolist(),
+                default=proximo_mes['categoria'].head(5).tolist(), key="categorias_previsao")
+
+            total_previsto = int(proximo_mes['previsto_centavos'].sum())
+            st.metric(f"💸 Gasto previsto em {proximo_mes['mes_ano'].iloc[0]}",
+                      formatar_reais(total_previsto))
+
+            if categorias:
+                nomes, meses, serie = calculator.serie_mensal_por_categoria(gastos_df)
+                posicoes = [nomes.index(c) for c in categorias if c in nomes]
+                # Últimos 24 meses do histórico bastam para o gráfico
+                recentes = slice(max(serie.shape[1] - 24, 0), None)
+                historico_df = pd.DataFrame({
+                    'categoria': np.repeat([nomes[i] for i in posicoes], len(meses[recentes])),
+                    'mes_ano': np.tile(meses[recentes].astype(str), len(posicoes)),
+                    'valor': centavos_para_reais(serie[posicoes, recentes].ravel())
+                })
+                fig_previsao = visualizations.plot_previsao_categorias(
+                    historico_df, previsao_df[previsao_df['categoria'].isin(categorias)])
+                if fig_previsao:
+                    st.plotly_chart(fig_previsao, use_container_width=True)
+
+            st.dataframe(
+                pd.DataFrame({
+                    'categoria': proximo_mes['categoria'],
+                    'previsto': proximo_mes['previsto_centavos'].apply(formatar_reais),
+                    'inferior': proximo_mes['inferior_centavos'].apply(formatar_reais),
+                    'superior': proximo_mes['superior_centavos'].apply(formatar_reais)
+                }),
+                column_config={
+                    "categoria": "Categoria",
+                    "previsto": "Previsto (próximo mês)",
+                    "inferior": "Mínimo (95%)",
+                    "superior": "Máximo (95%)"
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+
+    with tab5:
+        painel_consolidacao()
+
+    with tab6:
         st.subheader("Exportar Dados")
 
         col1, col2 = st.columns(2)
@@ -912,68 +1624,149 @@ def secao_relatorios():
         with col1:
             st.write("**Exportar para CSV:**")
 
-            if st.button("📥 Exportar Rendimentos"):
-                if not rendimentos_df.empty:
-                    csv_rendimentos = rendimentos_df.to_csv(index=False)
-                    st.download_button(
-                        label="💾 Download Rendimentos.csv",
-                        data=csv_rendimentos,
-                        file_name="rendimentos.csv",
-                        mime="text/csv"
-                    )
+            tabelas_exportacao = {
+                "Rendimentos": ('rendimentos', rendimentos_df),
+                "Gastos": ('gastos', gastos_df),
+                "Histórico Poupança": ('historico_poupanca', historico_poupanca),
+                "Livro de Patrimônio": ('livro_patrimonio', patrimonio_df)
+            }
+            escolha = st.selectbox(
+                "📄 Tabela", list(tabelas_exportacao) + ["📚 Todas (um arquivo .zip)"],
+                key="exportar_tabela")
+            tudo = escolha not in tabelas_exportacao
+
+            colunas = None
+            if not tudo:
+                nome, df_exportacao = tabelas_exportacao[escolha]
+                colunas = st.multiselect(
+                    "Colunas", list(df_exportacao.columns),
+                    default=list(df_exportacao.columns), key="exportar_colunas")
+
+            filtros = {}
+            if st.checkbox("📅 Filtrar período", key="exportar_filtrar_periodo"):
+                col_inicio, col_fim = st.columns(2)
+                with col_inicio:
+                    filtros['inicio'] = st.date_input(
+                        "De", value=date(date.today().year, 1, 1), key="exportar_inicio")
+                with col_fim:
+                    filtros['fim'] = st.date_input("Até", value=date.today(), key="exportar_fim")
+
+            compressao = st.radio("Compressão", ["nenhuma", "gzip", "xz"],
+                                  horizontal=True, key="exportar_compressao")
+
+            if st.button("📥 Exportar"):
+                if tudo:
+                    arquivo = exportar_zip(
+                        {nome: df for nome, df in tabelas_exportacao.values()},
+                        compressao, **filtros)
+                    nome_arquivo, mime = nome_exportacao('financas', compressao, tudo=True)
+                elif df_exportacao.empty:
+                    arquivo = None
+                    st.warning("⚠️ Nenhum registro para exportar")
+                elif not colunas:
+                    arquivo = None
+                    st.warning("⚠️ Escolha ao menos uma coluna")
                 else:
-                    st.warning("⚠️ Nenhum rendimento para exportar")
+                    arquivo = exportar_csv_comprimido(
+                        df_exportacao, compressao, colunas=colunas, **filtros)
+                    nome_arquivo, mime = nome_exportacao(nome, compressao)
+
+                if arquivo is not None:
+                    with arquivo:
+                        st.download_button(
+                            label=f"💾 Download {nome_arquivo}",
+                            data=arquivo.read(),
+                            file_name=nome_arquivo,
+                            mime=mime
+                        )
 
-            if st.button("📥 Exportar Gastos"):
-                if not gastos_df.empty:
-                    csv_gastos = gastos_df.to_csv(index=False)
-                    st.download_button(
-                        label="💾 Download Gastos.csv",
-                        data=csv_gastos,
-                        file_name="gastos.csv",
-                        mime="text/csv"
-                    )
-                else:
-                    st.warning("⚠️ Nenhum gasto para exportar")
+        with col2:
+            st.write("**Backup Completo:**")
 
-            if st.button("📥 Exportar Histórico Poupança"):
-                if not historico_poupanca.empty:
-                    csv_poupanca = historico_poupanca.to_csv(index=False)
+            if st.button("📦 Gerar Backup JSON"):
+                # Escrito registro a registro e comprimido conforme a escolha acima
+                with gravar_comprimido(data_manager.exportar_json, compressao) as arquivo:
+                    extensao, mime, _ = COMPRESSOES[compressao]
                     st.download_button(
-                        label="💾 Download Poupanca.csv",
-                        data=csv_poupanca,
-                        file_name="historico_poupanca.csv",
-                        mime="text/csv"
+                        label="💾 Download Backup Completo",
+                        data=arquivo.read(),
+                        file_name=f"backup_financas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json{extensao}",
+                        mime=mime or "application/json"
                     )
-                else:
-                    st.warning("⚠️ Nenhum histórico para exportar")
 
-        with col2:
-            st.write("**Backup Completo:**")
+            st.write("**Backup Incremental:**")
+            st.caption(f"📁 {data_manager.backups.pasta} · "
+                       f"{data_manager.diario.pendentes()} alteração(ões) desde o último backup")
 
-            if st.button("📦 Gerar Backup JSON"):
-                backup_data = data_manager.data
-                backup_json = json.dumps(
-                    backup_data, indent=2, ensure_ascii=False)
-
-                st.download_button(
-                    label="💾 Download Backup Completo",
-                    data=backup_json,
-                    file_name=f"backup_financas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json"
-                )
+            forcar_completo = st.checkbox("Forçar backup completo", key="backup_forcar_completo")
+            if st.button("🧩 Gerar Backup Incremental"):
+                caminho = data_manager.gerar_backup(completo=forcar_completo)
+                if caminho:
+                    st.success(f"✅ Backup gravado em {os.path.basename(caminho)}")
+                else:
+                    st.info("ℹ️ Nada mudou desde o último backup")
+
+            pontos_df = data_manager.pontos_restauracao()
+            if not pontos_df.empty:
+                pontos = pontos_df.to_dict('records')
+                ponto = st.selectbox(
+                    "⏪ Ponto de restauração",
+                    pontos[::-1],
+                    format_func=lambda p: (
+                        f"#{p['sequencia']} · {p['criado_em']:%d/%m/%Y %H:%M:%S} · "
+                        f"{'📦 completo' if p['tipo'] == 'completo' else '🧩 delta'} · "
+                        f"{p['bytes'] / 1024:,.1f} KB"),
+                    key="backup_ponto")
+                if st.button("⏪ Restaurar Ponto"):
+                    try:
+                        if data_manager.restaurar_ponto(ponto['sequencia']):
+                            registrar_carga()
+                            st.success("✅ Dados restaurados!")
+                            st.rerun()
+                        else:
+                            st.error("❌ Erro ao restaurar")
+                    except (ValueError, OSError) as e:
+                        st.error(f"❌ Erro: {str(e)}")
 
             st.write("**Restaurar Backup:**")
 
             uploaded_file = st.file_uploader(
-                "📁 Escolher arquivo JSON", type=['json'])
+                "📁 Escolher arquivo JSON", type=['json', 'gz', 'xz'])
+
+            modo_restauracao = st.radio(
+                "Modo",
+                ["🔀 Mesclar (adicionar só o que falta)", "♻️ Substituir tudo"],
+                key="modo_restauracao")
+            ignorar_similares = False
+            if modo_restauracao.startswith("🔀"):
+                ignorar_similares = st.checkbox(
+                    "Ignorar também quase-duplicados (mesmo valor, data próxima, descrição parecida)",
+                    key="restauracao_ignorar_similares")
 
             if uploaded_file is not None:
                 if st.button("🔄 Restaurar Backup"):
                     try:
-                        backup_data = json.load(uploaded_file)
-                        data_manager.data = backup_data
-                        if data_manager.save_data():
+                        backup_data = json.load(abrir_backup(uploaded_file))
+                        if modo_restauracao.startswith("🔀"):
+                            relatorio = data_manager.mesclar_dados(
+                                backup_data, ignorar_similares)
+                            registrar_carga()
+                            st.success("✅ Backup mesclado!")
+                            st.dataframe(
+                                pd.DataFrame(relatorio).T.fillna(0).astype(int),
+                                column_config={
+                                    "adicionados": "Adicionados",
+                                    "duplicados": "Já existentes",
+                                    "similares": "Quase-duplicados",
+                                    "recusados": "Recusados (saldo)"
+                                },
+                                use_container_width=True)
+                            if relatorio['poupanca']['recusados']:
+                                st.warning(
+                                    f"⚠️ {relatorio['poupanca']['recusados']} saque(s) da poupança "
+                                    "não entraram: deixariam o saldo negativo em algum dia")
+                        elif data_manager.restaurar_dados(backup_data):
+                            registrar_carga()
                             st.success("✅ Backup restaurado com sucesso!")
                             st.rerun()
                         else:
@@ -986,25 +1779,26 @@ def secao_relatorios():
 # Sidebar com informações adicionais
 
 
+@perfil.medir('app.sidebar_info')
 def sidebar_info():
     st.sidebar.markdown("---")
     st.sidebar.markdown("### 📊 Estatísticas Rápidas")
 
-    # Estatísticas rápidas
-    rendimentos_df = data_manager.get_rendimentos_df()
-    gastos_df = data_manager.get_gastos_df()
-    saldo_poupanca = data_manager.data['poupanca']['saldo_atual']
+    # Estatísticas rápidas (dos totais mensais)
+    totais_rendimentos = data_manager.get_totais_mensais('rendimentos')
+    totais_gastos = data_manager.get_totais_mensais('gastos')
+    saldo_poupanca = data_manager.get_saldo_poupanca_centavos()
 
-    if not rendimentos_df.empty:
-        total_rendimentos = rendimentos_df['valor'].sum()
+    if totais_rendimentos:
+        total_rendimentos = sum(r['total_centavos'] for r in totais_rendimentos.values())
         st.sidebar.metric("Total Rendimentos",
-                          f"R\$ {total_rendimentos:,.2f}")
+                          formatar_reais(total_rendimentos))
 
-    if not gastos_df.empty:
-        total_gastos = gastos_df['valor'].sum()
-        st.sidebar.metric("💸 Total Gastos", f"R\$ {total_gastos:,.2f}")
+    if totais_gastos:
+        total_gastos = sum(r['total_centavos'] for r in totais_gastos.values())
+        st.sidebar.metric("💸 Total Gastos", formatar_reais(total_gastos))
 
-    st.sidebar.metric("🏦 Saldo Poupança", f"R\$ {saldo_poupanca:,.2f}")
+    st.sidebar.metric("🏦 Saldo Poupança", formatar_reais(saldo_poupanca))
 
     st.sidebar.markdown("---")
     st.sidebar.markdown("### ℹ️ Sobre o App")
@@ -1013,13 +1807,62 @@ def sidebar_info():
         "Gerencie seus rendimentos, gastos e poupança de forma simples e intuitiva."
     )
 
+    if usuario_atual is not None:
+        estatisticas = init_pool().estatisticas()
+        st.sidebar.caption(
+            f"👤 {usuario_atual} · {estatisticas['usuarios_carregados']} usuário(s) em memória · "
+            f"{estatisticas['memoria_bytes'] / 2**20:,.1f} de "
+            f"{estatisticas['orcamento_bytes'] / 2**20:,.0f} MB")
+
     st.sidebar.markdown("### 🔧 Versão")
     st.sidebar.text("v1.0.0")
 
 
+def painel_desempenho():
+    """Painel de depuração com as métricas de tempo do rerun atual"""
+    registro = perfil.finalizar_rerun()
+    if registro is None:
+        return
+
+    st.sidebar.markdown("---")
+    with st.sidebar.expander("🐞 Desempenho do Rerun", expanded=False):
+        st.metric("⏱️ Tempo Total", f"{registro['duracao_total_ms']:,.1f} ms")
+
+        metricas_df = perfil.resumo_df()
+        if not metricas_df.empty:
+            st.dataframe(
+                metricas_df,
+                column_config={
+                    "funcao": "Função",
+                    "chamadas": "Chamadas",
+                    "tempo_ms": st.column_config.NumberColumn("Tempo (ms)", format="%.2f"),
+                    "linhas_entrada": "Linhas Entrada",
+                    "linhas_saida": "Linhas Saída"
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+
+        if perfil.arquivo_metricas:
+            st.caption(f"Métricas gravadas em {perfil.arquivo_metricas}")
+
+
 if __name__ == "__main__":
+    # Ativar métricas com FINANCE_PROFILE=1 ou ?debug=1 na URL
+    perfil.iniciar_rerun(
+        perfil.padrao_ativo or st.query_params.get("debug") == "1")
+
+    # Alterações de outros processos (importação, restauração em outra réplica)
+    sincronizar_com_disco()
+
     # Executar sidebar info
     sidebar_info()
 
     # Executar aplicação principal
     main()
+
+    # Transações lidas sob demanda neste rerun passam a contar no orçamento do pool
+    registrar_carga()
+
+    # Painel de desempenho (somente quando ativo)
+    painel_desempenho()
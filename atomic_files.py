@@ -0,0 +1,55 @@
+import contextlib
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: trava de um byte com msvcrt
+    fcntl = None
+    import msvcrt
+
+
+@contextlib.contextmanager
+def trava_exclusiva(caminho):
+    """Trava entre processos (e entre DataManagers do mesmo processo) em <caminho>.lock
+
+    Quem grava segura a trava da conferência de alteração até o os.replace:
+    dois processos nunca gravam o mesmo arquivo ao mesmo tempo. O arquivo
+    .lock fica no disco; só a trava é liberada.
+    """
+    with open(f'{caminho}.lock', 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def gravar_atomico(caminho, escrever):
+    """Grava escrever(f) (texto) num temporário único ao lado e troca com os.replace
+
+    O arquivo nunca fica pela metade e gravações simultâneas não dividem o
+    mesmo temporário. Retorna o os.stat do arquivo gravado (os.replace
+    mantém inode e mtime: é a assinatura do arquivo final).
+    """
+    pasta, nome = os.path.split(os.path.abspath(caminho))
+    descritor, temporario = tempfile.mkstemp(prefix=f'.{nome}.', suffix='.tmp', dir=pasta)
+    try:
+        with os.fdopen(descritor, 'w', encoding='utf-8') as f:
+            escrever(f)
+        estado = os.stat(temporario)
+        os.replace(temporario, caminho)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temporario)
+        raise
+    return estado
@@ -0,0 +1,195 @@
+import json
+import os
+import re
+import uuid
+from datetime import datetime
+
+from atomic_files import gravar_atomico
+
+# Coleções de registros com id acompanhadas registro a registro
+COLECOES_DELTA = ('rendimentos', 'gastos', 'poupanca')
+
+# Nome dos arquivos: sequência, tipo e data/hora (listagem sem abrir arquivos)
+_PADRAO_ARQUIVO = re.compile(r'^(\d{12})_(completo|delta)_(\d{8}T\d{6})\.json$')
+
+
+def diario_vazio(sequencia=0):
+    """Estado inicial do diário de alterações (salvo em data['alteracoes'])"""
+    return {
+        'sequencia': sequencia,
+        # Cadeia e sequência do último backup; None exige um backup completo
+        'cadeia': None,
+        'ultimo_backup': None,
+        # {coleção: {id: sequência}} e {seção: sequência} desde o último backup
+        'registros': {colecao: {} for colecao in COLECOES_DELTA},
+        'secoes': {}
+    }
+
+
+class DiarioAlteracoes:
+    """Número de sequência de alterações e o que mudou desde o último backup
+
+    Cada alteração do DataManager recebe o próximo número e marca os ids
+    (ou a seção) tocados. O diário guarda só a última sequência de cada
+    id, então o tamanho acompanha o volume de mudanças desde o último
+    backup, não o histórico. O estado é o próprio dict salvo no arquivo.
+    """
+
+    def __init__(self, estado):
+        self.estado = estado
+
+    @property
+    def sequencia(self):
+        return self.estado['sequencia']
+
+    @property
+    def precisa_completo(self):
+        return self.estado['ultimo_backup'] is None
+
+    def avancar(self):
+        self.estado['sequencia'] += 1
+        return self.estado['sequencia']
+
+    def registrar(self, colecao, ids):
+        """Marca ids (novos, alterados ou removidos) de uma coleção"""
+        self.avancar()
+        marcados = self.estado['registros'].setdefault(colecao, {})
+        for id_ in ids:
+            marcados[str(int(id_))] = self.sequencia
+
+    def registrar_secao(self, secao):
+        self.estado['secoes'][secao] = self.avancar()
+
+    def pendentes(self):
+        """Quantidade de registros e seções alterados desde o último backup"""
+        return (sum(len(ids) for ids in self.estado['registros'].values()) +
+                len(self.estado['secoes']))
+
+    def ids_alterados(self, colecao):
+        return [int(id_) for id_ in self.estado['registros'].get(colecao, {})]
+
+    def marcar_backup(self, cadeia):
+        """Zera as pendências: tudo até a sequência atual está no backup"""
+        self.estado['cadeia'] = cadeia
+        self.estado['ultimo_backup'] = self.estado['sequencia']
+        self.estado['registros'] = {colecao: {} for colecao in COLECOES_DELTA}
+        self.estado['secoes'] = {}
+
+
+def nova_cadeia():
+    return uuid.uuid4().hex[:12]
+
+
+class PastaBackups:
+    """Backups completos e deltas de um arquivo de dados numa pasta
+
+    Um backup completo abre uma cadeia; cada delta guarda só os registros
+    alterados desde o anterior (com a sequência base) e os removidos.
+    Restaurar um ponto aplica o completo da cadeia e os deltas até ele.
+    """
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+
+    def _caminho(self, sequencia, tipo, criado_em):
+        return os.path.join(self.pasta, f"{sequencia:012d}_{tipo}_{criado_em:%Y%m%dT%H%M%S}.json")
+
+    def gravar(self, cabecalho, escrever_corpo):
+        """Grava cabeçalho + corpo (escrito por escrever_corpo(f)) e retorna o caminho"""
+        os.makedirs(self.pasta, exist_ok=True)
+        caminho = self._caminho(cabecalho['sequencia'], cabecalho['tipo'],
+                                datetime.fromisoformat(cabecalho['criado_em']))
+
+        def escrever(f):
+            f.write('{"cabecalho": ')
+            json.dump(cabecalho, f, ensure_ascii=False)
+            f.write(',\n"corpo": ')
+            escrever_corpo(f)
+            f.write('}\n')
+        # Um backup pela metade nunca aparece na listagem
+        gravar_atomico(caminho, escrever)
+        return caminho
+
+    def listar(self):
+        """Pontos de restauração (sequência, tipo, data/hora, bytes, arquivo), do mais antigo ao mais novo"""
+        if not os.path.isdir(self.pasta):
+            return []
+        pontos = []
+        for nome in sorted(os.listdir(self.pasta)):
+            encontrado = _PADRAO_ARQUIVO.match(nome)
+            if encontrado:
+                caminho = os.path.join(self.pasta, nome)
+                pontos.append({
+                    'sequencia': int(encontrado.group(1)),
+                    'tipo': encontrado.group(2),
+                    'criado_em': datetime.strptime(encontrado.group(3), '%Y%m%dT%H%M%S'),
+                    'bytes': os.path.getsize(caminho),
+                    'arquivo': caminho
+                })
+        return pontos
+
+    @staticmethod
+    def ler(caminho):
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def reconstruir(self, sequencia):
+        """Dados no ponto `sequencia`: backup completo da cadeia + deltas até ele"""
+        pontos = self.listar()
+        alvo = next((p for p in pontos if p['sequencia'] == sequencia), None)
+        if alvo is None:
+            raise ValueError(f"ponto de restauração {sequencia} não encontrado")
+
+        # Volta do alvo até o completo seguindo a sequência base de cada delta
+        cadeia = []
+        atual = self.ler(alvo['arquivo'])
+        por_sequencia = {p['sequencia']: p for p in pontos}
+        while atual['cabecalho']['tipo'] == 'delta':
+            cadeia.append(atual)
+            base = por_sequencia.get(atual['cabecalho']['base'])
+            if base is None:
+                raise ValueError(f"backup {atual['cabecalho']['base']} da cadeia não encontrado")
+            atual = self.ler(base['arquivo'])
+            if atual['cabecalho']['cadeia'] != cadeia[-1]['cabecalho']['cadeia']:
+                raise ValueError("deltas de cadeias diferentes")
+
+        dados = atual['corpo']
+        for delta in reversed(cadeia):
+            aplicar_delta(dados, delta['corpo'])
+        return dados, bool(cadeia)
+
+
+def _aplicar_registros(registros, alterados, removidos):
+    """Lista de registros com alterados sobrescritos/incluídos e removidos excluídos"""
+    por_id = {int(r['id']): r for r in registros}
+    for registro in alterados:
+        por_id[int(registro['id'])] = registro
+    for id_ in removidos:
+        por_id.pop(int(id_), None)
+    return sorted(por_id.values(), key=lambda r: int(r['id']))
+
+
+def aplicar_delta(dados, delta):
+    """Aplica um delta sobre os dados (dicts e listas simples) de um backup"""
+    for colecao, mudancas in delta['registros'].items():
+        if colecao == 'poupanca':
+            poupanca = dados['poupanca']
+            poupanca['historico'] = _aplicar_registros(
+                poupanca['historico'], mudancas['alterados'], mudancas['removidos'])
+        else:
+            dados[colecao] = _aplicar_registros(
+                dados[colecao], mudancas['alterados'], mudancas['removidos'])
+
+    secoes = delta['secoes']
+    if 'taxas' in secoes:
+        dados['poupanca']['historico_taxas'] = secoes['taxas']
+        if secoes['taxas']:
+            dados['poupanca']['taxa_cdi'] = secoes['taxas'][-1]['taxa']
+    if 'objetivos' in secoes:
+        dados['objetivos'] = secoes['objetivos']
+    if 'orcamentos' in secoes:
+        dados['orcamentos'] = secoes['orcamentos']
+    if 'regras' in secoes:
+        modelo = dados.get('modelo_categorias') or {'regras': {}, 'frases': {}}
+        modelo['regras'] = secoes['regras']
+        dados['modelo_categorias'] = modelo
@@ -0,0 +1,309 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from calculations import FinanceCalculator
+from data_manager import DataManager
+from money import centavos_para_reais
+from synthetic_data import escrever_dados_sinteticos
+from visualizations import FinanceVisualizations
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+
+def medir(func, repeticoes=1, memoria=True):
+    """Mede o melhor tempo entre as repetições e o pico de memória de uma execução"""
+    tempos = []
+    for _ in range(repeticoes):
+        gc.collect()
+        inicio = time.perf_counter()
+        func()
+        tempos.append(time.perf_counter() - inicio)
+
+    resultado = {'tempo_s': min(tempos)}
+
+    if memoria:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        resultado['pico_memoria_mb'] = pico / (1024 * 1024)
+
+    return resultado
+
+
+def casos_data_manager(caminho, caminho_saida):
+    """Casos de I/O e conversão para DataFrame do DataManager"""
+    dm = DataManager(caminho)
+    dm_saida = DataManager(caminho)
+    dm_saida.data_file = caminho_saida
+
+    descricoes = dm.get_gastos_df()['descricao'].astype(str).tolist()
+
+    return {
+        'DataManager.load_data': lambda: DataManager(caminho, sob_demanda=False),
+        'DataManager.save_data': dm_saida.save_data,
+        'DataManager.get_rendimentos_df': dm.get_rendimentos_df,
+        'DataManager.get_gastos_df': dm.get_gastos_df,
+        'DataManager.get_poupanca_historico_df': dm.get_poupanca_historico_df,
+        'DataManager.buscar': lambda: dm.buscar('gastos', 'mensal'),
+        'DataManager.get_status_orcamentos': dm.get_status_orcamentos,
+        'DataManager.get_serie_diaria_df': dm.get_serie_diaria_df,
+        'DataManager.get_patrimonio_df': dm.get_patrimonio_df,
+        'DataManager.sugerir_categorias': lambda: dm.sugerir_categorias(descricoes),
+        'DataManager.reavaliar_anomalias': dm.reavaliar_anomalias,
+        'DataManager.detectar_duplicatas':
+            lambda: dm.detectar_duplicatas('gastos', dm_saida.data['gastos'])
+    }
+
+
+def casos_calculadora(dm):
+    """Casos de todos os métodos do FinanceCalculator"""
+    calc = FinanceCalculator()
+    rendimentos_df = dm.get_rendimentos_df()
+    gastos_df = dm.get_gastos_df()
+    saldo = centavos_para_reais(dm.get_saldo_poupanca_centavos())
+    taxa = dm.data['poupanca']['taxa_cdi']
+    ultimo_mes = str(gastos_df['data'].max())[:7] if not gastos_df.empty else None
+    recorrencias_rendimentos = calc.detectar_recorrencias(rendimentos_df, 'fonte')
+    recorrencias_gastos = calc.detectar_recorrencias(gastos_df, 'categoria')
+    # Um orçamento por categoria: a média mensal de cada uma
+    categorias, _, serie = calc.serie_mensal_por_categoria(gastos_df)
+    orcamentos = dict(zip(categorias, serie.mean(axis=1).astype(int).tolist()))
+    serie_diaria = dm.get_serie_diaria_df()
+
+    return {
+        'FinanceCalculator.calcular_rendimento_poupanca':
+            lambda: calc.calcular_rendimento_poupanca(saldo, taxa, 60),
+        'FinanceCalculator.simular_crescimento_poupanca':
+            lambda: calc.simular_crescimento_poupanca(saldo, 500.0, taxa, 360),
+        'FinanceCalculator.calcular_aporte_necessario':
+            lambda: calc.calcular_aporte_necessario(100000.0, saldo, taxa, 60),
+        'FinanceCalculator.calcular_resumo_mensal':
+            lambda: calc.calcular_resumo_mensal(
+                rendimentos_df, gastos_df, ultimo_mes),
+        'FinanceCalculator.calcular_resumos_mensais':
+            lambda: calc.calcular_resumos_mensais(rendimentos_df, gastos_df),
+        'FinanceCalculator.calcular_gastos_por_categoria':
+            lambda: calc.calcular_gastos_por_categoria(gastos_df),
+        'FinanceCalculator.calcular_rendimentos_por_fonte':
+            lambda: calc.calcular_rendimentos_por_fonte(rendimentos_df),
+        'FinanceCalculator.detectar_recorrencias':
+            lambda: calc.detectar_recorrencias(gastos_df, 'categoria'),
+        'FinanceCalculator.projetar_fluxo_caixa':
+            lambda: calc.projetar_fluxo_caixa(recorrencias_rendimentos, recorrencias_gastos, 360),
+        'FinanceCalculator.prever_gastos_por_categoria':
+            lambda: calc.prever_gastos_por_categoria(gastos_df, 12),
+        'FinanceCalculator.comparar_orcamentos':
+            lambda: calc.comparar_orcamentos(gastos_df, orcamentos),
+        'FinanceCalculator.calcular_janelas_moveis':
+            lambda: calc.calcular_janelas_moveis(serie_diaria),
+        'FinanceCalculator.calcular_agregados_semanais':
+            lambda: calc.calcular_agregados_semanais(serie_diaria)
+    }
+
+
+def casos_visualizacoes(dm):
+    """Casos de todos os gráficos do FinanceVisualizations"""
+    calc = FinanceCalculator()
+    vis = FinanceVisualizations()
+    rendimentos_df = dm.get_rendimentos_df()
+    gastos_df = dm.get_gastos_df()
+    historico_df = dm.get_poupanca_historico_df()
+    rendimento_df = dm.get_poupanca_rendimento_df()
+    saldo = centavos_para_reais(dm.get_saldo_poupanca_centavos())
+    taxa = dm.data['poupanca']['taxa_cdi']
+
+    gastos_categoria = calc.calcular_gastos_por_categoria(gastos_df)
+    rendimentos_fonte = calc.calcular_rendimentos_por_fonte(rendimentos_df)
+    simulacao_df = calc.simular_crescimento_poupanca(saldo, 500.0, taxa, 360)
+    meses = sorted(set(gastos_df['data'].astype(str).str[:7])) if not gastos_df.empty else []
+    resumos = [calc.calcular_resumo_mensal(rendimentos_df, gastos_df, m)
+               for m in meses[-24:]]
+    fluxo_df = calc.projetar_fluxo_caixa(
+        calc.detectar_recorrencias(rendimentos_df, 'fonte'),
+        calc.detectar_recorrencias(gastos_df, 'categoria'), 24)
+    nomes, meses_serie, serie = calc.serie_mensal_por_categoria(gastos_df)
+    historico_categorias = pd.DataFrame({
+        'categoria': np.repeat(nomes, len(meses_serie)),
+        'mes_ano': np.tile(meses_serie.astype(str), len(nomes)),
+        'valor': centavos_para_reais(serie.ravel())
+    })
+    previsao_df = calc.prever_gastos_por_categoria(gastos_df, 12)
+    serie_diaria = dm.get_serie_diaria_df()
+    janelas_df = calc.calcular_janelas_moveis(serie_diaria)
+    semanal_df = calc.calcular_agregados_semanais(serie_diaria)
+    patrimonio_df = dm.get_patrimonio_df()
+
+    return {
+        'FinanceVisualizations.plot_evolucao_poupanca':
+            lambda: vis.plot_evolucao_poupanca(historico_df),
+        'FinanceVisualizations.plot_gastos_por_categoria':
+            lambda: vis.plot_gastos_por_categoria(gastos_categoria),
+        'FinanceVisualizations.plot_rendimentos_por_fonte':
+            lambda: vis.plot_rendimentos_por_fonte(rendimentos_fonte),
+        'FinanceVisualizations.plot_simulacao_crescimento':
+            lambda: vis.plot_simulacao_crescimento(simulacao_df),
+        'FinanceVisualizations.plot_comparativo_mensal':
+            lambda: vis.plot_comparativo_mensal(resumos),
+        'FinanceVisualizations.plot_fluxo_projetado':
+            lambda: vis.plot_fluxo_projetado(fluxo_df),
+        'FinanceVisualizations.plot_previsao_categorias':
+            lambda: vis.plot_previsao_categorias(historico_categorias, previsao_df),
+        'FinanceVisualizations.plot_janelas_moveis':
+            lambda: vis.plot_janelas_moveis(janelas_df),
+        'FinanceVisualizations.plot_agregados_semanais':
+            lambda: vis.plot_agregados_semanais(semanal_df),
+        'FinanceVisualizations.plot_fluxo_acumulado':
+            lambda: vis.plot_fluxo_acumulado(janelas_df),
+        'FinanceVisualizations.plot_patrimonio':
+            lambda: vis.plot_patrimonio(patrimonio_df),
+        'FinanceVisualizations.plot_objetivo_progresso':
+            lambda: vis.plot_objetivo_progresso(saldo, 100000.0, 'Benchmark'),
+        'FinanceVisualizations.plot_evolucao_poupanca_melhorado':
+            lambda: vis.plot_evolucao_poupanca_melhorado(historico_df.copy(), rendimento_df)
+    }
+
+
+def benchmark_app(caminho, memoria=True, repeticoes=1):
+    """Executa cada seção do app.py sem navegador, via AppTest do Streamlit"""
+    try:
+        import streamlit as st
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return {'app': {'erro': 'streamlit não instalado'}}
+
+    os.environ['FINANCE_DATA_FILE'] = caminho
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+    resultados = {}
+    # Primeira renderização real (Dashboard) lendo tudo na abertura ou só o cabeçalho
+    for modo, carga_completa in (('completa', '1'), ('sob_demanda', '0')):
+        def primeira_renderizacao(carga_completa=carga_completa):
+            os.environ['FINANCE_CARGA_COMPLETA'] = carga_completa
+            st.cache_resource.clear()
+            AppTest.from_file(APP_PATH, default_timeout=3600).run()
+
+        resultados[f'app.primeira_renderizacao.{modo}'] = medir(
+            primeira_renderizacao, repeticoes, memoria=False)
+    os.environ.pop('FINANCE_CARGA_COMPLETA')
+    st.cache_resource.clear()
+
+    app = AppTest.from_file(APP_PATH, default_timeout=3600)
+    resultados['app.inicializacao'] = medir(app.run, memoria=False)
+
+    for secao in app.sidebar.selectbox[0].options:
+        def executar_secao(secao=secao):
+            app.sidebar.selectbox[0].select(secao)
+            app.run()
+
+        medicao = medir(executar_secao, memoria=memoria)
+        if app.exception:
+            medicao['erro'] = app.exception[0].value
+        resultados[f'app.{secao}'] = medicao
+
+    return resultados
+
+
+def benchmark_tamanho(n_transacoes, seed, repeticoes=1, memoria=True, com_app=True):
+    """Roda todos os casos para um tamanho de base"""
+    pasta = tempfile.mkdtemp(prefix='finance_bench_')
+    try:
+        caminho = os.path.join(pasta, 'finance_data.json')
+        inicio = time.perf_counter()
+        escrever_dados_sinteticos(caminho, n_transacoes, seed)
+        geracao_s = time.perf_counter() - inicio
+
+        dm = DataManager(caminho)
+        casos = {}
+        casos.update(casos_data_manager(
+            caminho, os.path.join(pasta, 'saida.json')))
+        casos.update(casos_calculadora(dm))
+        casos.update(casos_visualizacoes(dm))
+
+        medicoes = {}
+        for nome, func in casos.items():
+            medicoes[nome] = medir(func, repeticoes, memoria)
+            print(f"  {nome}: {medicoes[nome]['tempo_s'] * 1000:,.1f} ms")
+
+        if com_app:
+            medicoes.update(benchmark_app(caminho, memoria, repeticoes))
+
+        return {
+            'transacoes': n_transacoes,
+            'tamanho_arquivo_mb': os.path.getsize(caminho) / (1024 * 1024),
+            'geracao_s': geracao_s,
+            'medicoes': medicoes
+        }
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+def _commit_atual():
+    """Retorna o hash do commit atual, se estiver em um repositório git"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(APP_PATH)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar_benchmark(tamanhos, seed=42, repeticoes=1, memoria=True, com_app=True):
+    """Executa o benchmark para cada tamanho e retorna o relatório"""
+    relatorio = {
+        'commit': _commit_atual(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'seed': seed,
+        'resultados': []
+    }
+
+    for n in tamanhos:
+        print(f"📊 {n:,} transações")
+        relatorio['resultados'].append(
+            benchmark_tamanho(n, seed, repeticoes, memoria, com_app))
+
+    return relatorio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark do dashboard com dados sintéticos")
+    parser.add_argument("--tamanhos", type=int, nargs='+',
+                        default=[10000, 100000, 1000000])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--sem-memoria", action='store_true',
+                        help="Não mede pico de memória (mais rápido)")
+    parser.add_argument("--sem-app", action='store_true',
+                        help="Não executa as seções do app.py")
+    parser.add_argument("-o", "--saida", default='bench_results.json')
+    args = parser.parse_args()
+
+    relatorio = executar_benchmark(
+        args.tamanhos, args.seed, args.repeticoes,
+        not args.sem_memoria, not args.sem_app)
+
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+
+    print(f"✅ Resultados gravados em {args.saida}")
@@ -0,0 +1,113 @@
+import calendar
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# Utilização a partir da qual o orçamento entra em atenção
+LIMITE_ATENCAO = 0.8
+
+# Alertas do mais grave para o mais leve
+ALERTAS = ('estourado', 'vai_estourar', 'atencao', 'ok')
+
+
+def mes_do_dia(dias):
+    """Mês (datetime64[M]) de dias contados desde 1970-01-01"""
+    return np.asarray(dias, dtype=np.int64).astype('datetime64[D]').astype('datetime64[M]')
+
+
+class MonitorOrcamentos:
+    """Gasto do mês corrente por categoria, contra os limites mensais
+
+    Os limites são o próprio dict salvo em data['orcamentos']
+    ({categoria: limite em centavos}). O gasto do mês é montado uma vez
+    com np.bincount e depois cada gasto adicionado, removido ou
+    recategorizado custa O(1); só a virada do mês exige recontar.
+    """
+
+    def __init__(self, limites, mes):
+        self.limites = limites
+        self.mes = np.datetime64(mes, 'M')
+        self.gasto_mes = {}
+
+    @classmethod
+    def do_lote(cls, limites, mes, dias, codigos, nomes, centavos):
+        """Monta o monitor a partir das colunas do TransactionStore de gastos"""
+        monitor = cls(limites, mes)
+        monitor.adicionar_lote(dias, codigos, nomes, centavos)
+        return monitor
+
+    @classmethod
+    def dos_totais(cls, limites, mes, por_categoria):
+        """Monta o monitor dos totais do mês ({categoria: centavos}), sem as transações"""
+        monitor = cls(limites, mes)
+        for categoria, centavos in por_categoria.items():
+            monitor._somar(categoria, int(centavos))
+        return monitor
+
+    def adicionar_lote(self, dias, codigos, nomes, centavos):
+        """Soma os gastos do mês corrente de um lote (carga inicial, importação, mescla)"""
+        no_mes = mes_do_dia(dias) == self.mes
+        if not no_mes.any():
+            return
+        totais = np.bincount(np.asarray(codigos)[no_mes],
+                             weights=np.asarray(centavos)[no_mes], minlength=len(nomes))
+        for i in np.flatnonzero(totais).tolist():
+            self._somar(nomes[i], int(round(totais[i])))
+
+    def adicionar(self, categoria, centavos, data):
+        """Gasto novo ('AAAA-MM-DD') — O(1)"""
+        if np.datetime64(str(data)[:7], 'M') == self.mes:
+            self._somar(categoria, int(centavos))
+
+    def remover(self, categoria, centavos, data):
+        """Desfaz adicionar (exclusões e correções de categoria) — O(1)"""
+        if np.datetime64(str(data)[:7], 'M') == self.mes:
+            self._somar(categoria, -int(centavos))
+
+    def _somar(self, categoria, centavos):
+        total = self.gasto_mes.get(categoria, 0) + centavos
+        if total:
+            self.gasto_mes[categoria] = total
+        else:
+            self.gasto_mes.pop(categoria, None)
+
+    def restante(self, categoria):
+        """Centavos que ainda cabem no orçamento da categoria (None sem orçamento)"""
+        if categoria not in self.limites:
+            return None
+        return self.limites[categoria] - self.gasto_mes.get(categoria, 0)
+
+    def status(self, hoje=None):
+        """Utilização, saldo e projeção de fim de mês de cada orçamento
+
+        A projeção extrapola o ritmo diário do mês até o último dia.
+        """
+        colunas = ['categoria', 'limite_centavos', 'gasto_centavos', 'restante_centavos',
+                   'utilizacao', 'projetado_centavos', 'excesso_projetado_centavos', 'alerta']
+        if not self.limites:
+            return pd.DataFrame(columns=colunas)
+
+        hoje = hoje or date.today()
+        dias_no_mes = calendar.monthrange(hoje.year, hoje.month)[1]
+        categorias = list(self.limites)
+        limite = np.array([self.limites[c] for c in categorias], dtype=np.int64)
+        gasto = np.array([self.gasto_mes.get(c, 0) for c in categorias], dtype=np.int64)
+        projetado = np.rint(gasto * dias_no_mes / hoje.day).astype(np.int64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            utilizacao = np.where(limite > 0, gasto / limite, np.inf)
+
+        alerta = np.select(
+            [gasto > limite, projetado > limite, utilizacao >= LIMITE_ATENCAO],
+            ALERTAS[:3], default=ALERTAS[3])
+        resultado = pd.DataFrame({
+            'categoria': categorias,
+            'limite_centavos': limite,
+            'gasto_centavos': gasto,
+            'restante_centavos': limite - gasto,
+            'utilizacao': utilizacao,
+            'projetado_centavos': projetado,
+            'excesso_projetado_centavos': np.maximum(projetado - limite, 0),
+            'alerta': alerta
+        })
+        return resultado.sort_values('utilizacao', ascending=False, ignore_index=True)
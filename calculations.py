@@ -1,8 +1,48 @@
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+from dedup import texto_normalizado
+from money import centavos_para_reais
+from profiling import perfil
 
+# Periodicidades reconhecidas: nome -> (dias, meses); meses > 0 projeta por mês-calendário
+PERIODOS_RECORRENCIA = {
+    'semanal': (7, 0),
+    'quinzenal': (14, 0),
+    'mensal': (30.44, 1),
+    'bimestral': (60.88, 2),
+    'trimestral': (91.31, 3),
+    'semestral': (182.62, 6),
+    'anual': (365.25, 12)
+}
 
+# Valores a até ~10% de distância caem na mesma faixa (escala logarítmica)
+TOLERANCIA_VALOR_RECORRENCIA = 0.10
+# Desvio aceito entre o intervalo observado e o período
+TOLERANCIA_PERIODO = 0.15
+# Dispersão aceita nos intervalos do grupo (MAD dos intervalos / intervalo mediano)
+DISPERSAO_MAXIMA_INTERVALO = 0.15
+# Teto da dispersão em dias: contas com data certa variam poucos dias
+# mesmo em períodos longos (anual com 0.15 aceitaria ~55 dias)
+DISPERSAO_MAXIMA_DIAS = 2
+MINIMO_OCORRENCIAS = 3
+
+# Janelas móveis (dias) das tendências de rendimentos e gastos
+JANELAS_MOVEIS = (7, 30, 90)
+CANAIS_FLUXO = ('rendimentos', 'gastos')
+
+# Previsão por categoria (Holt-Winters aditivo): grade de suavização testada
+# em todas as categorias de uma vez
+GRADE_ALFA = np.array([0.1, 0.2, 0.3, 0.5, 0.7, 0.9])
+GRADE_BETA = np.array([0.01, 0.05, 0.1, 0.2])
+GRADE_GAMA = np.array([0.05, 0.1, 0.3])
+PERIODO_SAZONAL = 12
+MINIMO_MESES_PREVISAO = 3
+# Intervalo de ~95%
+Z_INTERVALO = 1.96
+
+
+@perfil.instrumentar
 class FinanceCalculator:
 
     @staticmethod
@@ -14,8 +54,13 @@ class FinanceCalculator:
 
     @staticmethod
     def simular_crescimento_poupanca(saldo_inicial, aporte_mensal, taxa_anual, meses):
-        """Simula crescimento da poupança com aportes mensais"""
+        """Simula crescimento da poupança com aportes mensais
+
+        aporte_mensal pode ser um valor fixo ou uma sequência com o aporte
+        de cada mês (ex.: o saldo do fluxo de caixa projetado).
+        """
         taxa_mensal = (taxa_anual / 100) / 12
+        aportes = np.resize(np.asarray(aporte_mensal, dtype=np.float64), max(meses, 1))
 
         historico = []
         saldo_atual = saldo_inicial
@@ -25,7 +70,7 @@ class FinanceCalculator:
                 # Aplica rendimento
                 saldo_atual = saldo_atual * (1 + taxa_mensal)
                 # Adiciona aporte
-                saldo_atual += aporte_mensal
+                saldo_atual += aportes[mes - 1]
 
             historico.append({
                 'mes': mes,
@@ -67,13 +112,13 @@ class FinanceCalculator:
         if mes_ano is None:
             mes_ano = datetime.now().strftime('%Y-%m')
 
-        # Filtrar por mês/ano
+        # Filtrar por mês/ano e somar em centavos (soma inteira, exata)
         if not rendimentos_df.empty:
             rendimentos_mes = rendimentos_df[
                 pd.to_datetime(rendimentos_df['data']).dt.strftime(
                     '%Y-%m') == mes_ano
             ]
-            total_rendimentos = rendimentos_mes['valor'].sum()
+            total_rendimentos = int(rendimentos_mes['valor_centavos'].sum())
         else:
             total_rendimentos = 0
 
@@ -82,26 +127,66 @@ class FinanceCalculator:
                 pd.to_datetime(gastos_df['data']).dt.strftime(
                     '%Y-%m') == mes_ano
             ]
-            total_gastos = gastos_mes['valor'].sum()
+            total_gastos = int(gastos_mes['valor_centavos'].sum())
         else:
             total_gastos = 0
 
-        saldo_mensal = total_rendimentos - total_gastos
+        return FinanceCalculator._resumo(total_rendimentos, total_gastos, mes_ano)
+
+    @staticmethod
+    def calcular_resumo_mensal_dos_totais(totais_rendimentos, totais_gastos, mes_ano=None):
+        """calcular_resumo_mensal a partir dos totais mensais ({'AAAA-MM': resumo}), sem as transações"""
+        if mes_ano is None:
+            mes_ano = datetime.now().strftime('%Y-%m')
+        return FinanceCalculator._resumo(
+            int(totais_rendimentos.get(mes_ano, {}).get('total_centavos', 0)),
+            int(totais_gastos.get(mes_ano, {}).get('total_centavos', 0)), mes_ano)
 
+    @staticmethod
+    def _resumo(total_rendimentos, total_gastos, mes_ano):
+        saldo_mensal = total_rendimentos - total_gastos
         return {
-            'total_rendimentos': total_rendimentos,
-            'total_gastos': total_gastos,
-            'saldo_mensal': saldo_mensal,
+            'total_rendimentos_centavos': total_rendimentos,
+            'total_gastos_centavos': total_gastos,
+            'saldo_mensal_centavos': saldo_mensal,
+            'total_rendimentos': centavos_para_reais(total_rendimentos),
+            'total_gastos': centavos_para_reais(total_gastos),
+            'saldo_mensal': centavos_para_reais(saldo_mensal),
             'mes_ano': mes_ano
         }
 
+    @staticmethod
+    def calcular_resumos_mensais(rendimentos_df, gastos_df):
+        """Resumo de todos os meses com movimento de uma vez (um groupby por coleção)
+
+        Mesmas colunas de calcular_resumo_mensal, uma linha por mês.
+        """
+        totais = {}
+        for nome, df in (('total_rendimentos', rendimentos_df), ('total_gastos', gastos_df)):
+            if df.empty:
+                totais[nome] = pd.Series(dtype=np.int64)
+                continue
+            meses = pd.to_datetime(df['data']).dt.strftime('%Y-%m')
+            totais[nome] = df['valor_centavos'].groupby(meses).sum()
+
+        resumos = pd.DataFrame({f'{nome}_centavos': serie for nome, serie in totais.items()})
+        resumos = resumos.fillna(0).astype(np.int64).sort_index()
+        resumos['saldo_mensal_centavos'] = \
+            resumos['total_rendimentos_centavos'] - resumos['total_gastos_centavos']
+        for nome in ('total_rendimentos', 'total_gastos', 'saldo_mensal'):
+            resumos[nome] = centavos_para_reais(resumos[f'{nome}_centavos'])
+        return resumos.rename_axis('mes_ano').reset_index()
+
     @staticmethod
     def calcular_gastos_por_categoria(gastos_df):
         """Calcula gastos agrupados por categoria"""
         if gastos_df.empty:
             return pd.DataFrame()
 
-        return gastos_df.groupby('categoria')['valor'].sum().reset_index()
+        df = gastos_df.groupby('categoria', observed=True)[
+            'valor_centavos'].sum().reset_index()
+        df['valor'] = centavos_para_reais(df['valor_centavos'])
+        return df
 
     @staticmethod
     def calcular_rendimentos_por_fonte(rendimentos_df):
@@ -109,4 +194,395 @@ class FinanceCalculator:
         if rendimentos_df.empty:
             return pd.DataFrame()
 
-        return rendimentos_df.groupby('fonte')['valor'].sum().reset_index()
+        df = rendimentos_df.groupby('fonte', observed=True)[
+            'valor_centavos'].sum().reset_index()
+        df['valor'] = centavos_para_reais(df['valor_centavos'])
+        return df
+
+    @staticmethod
+    def calcular_totais_por_rotulo(totais, campo_rotulo):
+        """Soma por fonte/categoria dos totais mensais (mesmo formato de calcular_gastos_por_categoria)"""
+        por_rotulo = {}
+        for resumo in totais.values():
+            for rotulo, centavos in resumo['por_rotulo'].items():
+                por_rotulo[rotulo] = por_rotulo.get(rotulo, 0) + centavos
+        if not por_rotulo:
+            return pd.DataFrame()
+
+        df = pd.DataFrame({
+            campo_rotulo: list(por_rotulo),
+            'valor_centavos': np.fromiter(por_rotulo.values(), dtype=np.int64, count=len(por_rotulo))
+        }).sort_values(campo_rotulo, ignore_index=True)
+        df['valor'] = centavos_para_reais(df['valor_centavos'])
+        return df
+
+    @staticmethod
+    def detectar_recorrencias(transacoes_df, campo_rotulo='categoria'):
+        """Agrupa transações repetidas (descrição e faixa de valor) e infere o período
+
+        Os grupos saem de uma ordenação por (rótulo, descrição normalizada,
+        faixa de valor, data): intervalos entre ocorrências são diferenças
+        de linhas vizinhas, sem comparar transações duas a duas.
+        """
+        colunas = [campo_rotulo, 'descricao', 'periodo', 'periodo_dias', 'periodo_meses',
+                   'ocorrencias', 'valor_centavos', 'valor', 'ultima_data', 'proxima_data', 'ativa']
+        if transacoes_df.empty:
+            return pd.DataFrame(columns=colunas)
+
+        # Normaliza cada descrição distinta uma vez
+        descricoes = transacoes_df['descricao'].astype('category')
+        normalizadas = pd.Series(descricoes.cat.categories).map(texto_normalizado)
+        cod_normalizada, _ = pd.factorize(normalizadas)
+        chave_descricao = np.where(
+            descricoes.cat.codes.to_numpy() >= 0,
+            cod_normalizada[descricoes.cat.codes.to_numpy()], -1)
+        cod_rotulo, _ = pd.factorize(transacoes_df[campo_rotulo])
+
+        valores = transacoes_df['valor_centavos'].to_numpy(dtype=np.int64)
+        faixa = np.floor(np.log(np.maximum(valores, 1)) /
+                         np.log1p(TOLERANCIA_VALOR_RECORRENCIA)).astype(np.int64)
+        dias = transacoes_df['data'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+        ordem = np.lexsort((dias, faixa, chave_descricao, cod_rotulo))
+        chaves = np.stack([cod_rotulo[ordem], chave_descricao[ordem], faixa[ordem]])
+        novo_grupo = np.r_[True, (chaves[:, 1:] != chaves[:, :-1]).any(axis=0)]
+        grupo = np.cumsum(novo_grupo) - 1
+        dias_ordenados = dias[ordem]
+        intervalo = np.r_[np.nan, np.diff(dias_ordenados).astype(np.float64)]
+        intervalo[novo_grupo] = np.nan
+
+        linhas = pd.DataFrame({
+            'grupo': grupo,
+            'dia': dias_ordenados,
+            'valor_centavos': valores[ordem],
+            'intervalo': intervalo,
+            'posicao': ordem
+        })
+        grupos = linhas.groupby('grupo').agg(
+            ocorrencias=('dia', 'size'),
+            ultimo_dia=('dia', 'max'),
+            valor_centavos=('valor_centavos', 'median'),
+            intervalo_mediano=('intervalo', 'median'),
+            posicao=('posicao', 'last'))
+        grupos = grupos[grupos['ocorrencias'] >= MINIMO_OCORRENCIAS]
+        if grupos.empty:
+            return pd.DataFrame(columns=colunas)
+
+        # Período mais próximo do intervalo mediano, dentro da tolerância
+        nomes = list(PERIODOS_RECORRENCIA)
+        periodos = np.array([PERIODOS_RECORRENCIA[n][0] for n in nomes])
+        mediano = grupos['intervalo_mediano'].to_numpy()
+        erro = np.abs(mediano[:, None] / periodos[None, :] - 1)
+        melhor = erro.argmin(axis=1)
+        valido = erro[np.arange(len(melhor)), melhor] <= TOLERANCIA_PERIODO
+
+        # Regularidade pela dispersão dos intervalos (MAD em torno do intervalo
+        # mediano): um lançamento avulso na faixa cria intervalos fora da
+        # mediana sem mover o MAD; compras frequentes sem período têm
+        # intervalos espalhados e MAD da ordem da própria mediana
+        desvio = np.abs(linhas['intervalo'].to_numpy() -
+                        grupos['intervalo_mediano'].reindex(linhas['grupo']).to_numpy())
+        mad = pd.Series(desvio).groupby(linhas['grupo'].to_numpy()).median().reindex(
+            grupos.index).to_numpy()
+        regular = mad <= np.minimum(DISPERSAO_MAXIMA_DIAS, DISPERSAO_MAXIMA_INTERVALO * mediano)
+
+        manter = valido & regular
+        grupos = grupos[manter]
+        melhor = melhor[manter]
+        if grupos.empty:
+            return pd.DataFrame(columns=colunas)
+
+        referencia = dias.max()
+        periodo_dias = periodos[melhor]
+        periodo_meses = np.array([PERIODOS_RECORRENCIA[nomes[i]][1] for i in melhor])
+        ultimo = grupos['ultimo_dia'].to_numpy()
+        ultima_data = ultimo.astype('datetime64[D]')
+        # Período em meses segue o calendário; em dias, soma os dias
+        proxima = np.where(
+            periodo_meses > 0,
+            (ultima_data.astype('datetime64[M]') + periodo_meses).astype('datetime64[D]') +
+            (ultima_data - ultima_data.astype('datetime64[M]').astype('datetime64[D]')),
+            ultima_data + np.rint(periodo_dias).astype(np.int64))
+        exemplos = transacoes_df.iloc[grupos['posicao'].to_numpy()]
+        valor_centavos = np.rint(grupos['valor_centavos'].to_numpy()).astype(np.int64)
+
+        resultado = pd.DataFrame({
+            campo_rotulo: exemplos[campo_rotulo].astype(str).to_numpy(),
+            'descricao': exemplos['descricao'].astype(str).to_numpy(),
+            'periodo': [nomes[i] for i in melhor],
+            'periodo_dias': periodo_dias,
+            'periodo_meses': periodo_meses,
+            'ocorrencias': grupos['ocorrencias'].to_numpy(),
+            'valor_centavos': valor_centavos,
+            'valor': centavos_para_reais(valor_centavos),
+            'ultima_data': ultima_data.astype('datetime64[s]'),
+            'proxima_data': proxima.astype('datetime64[s]'),
+            # Ainda ativa se não passou mais de 1,5 período desde a última
+            'ativa': (referencia - ultimo) <= 1.5 * periodo_dias
+        })
+        return resultado.sort_values('valor_centavos', ascending=False, ignore_index=True)
+
+    @staticmethod
+    def projetar_fluxo_caixa(recorrencias_rendimentos, recorrencias_gastos, meses=12, inicio=None):
+        """Fluxo de caixa mensal esperado a partir das recorrências ativas
+
+        Todas as ocorrências futuras são geradas de uma vez como uma matriz
+        (recorrência x repetição) e somadas por mês com np.bincount.
+        """
+        inicio = np.datetime64(inicio or datetime.now().strftime('%Y-%m'), 'M')
+        meses_projecao = np.arange(inicio, inicio + meses)
+        totais = {}
+        for nome, recorrencias in (('rendimentos', recorrencias_rendimentos),
+                                   ('gastos', recorrencias_gastos)):
+            totais[nome] = np.zeros(meses, dtype=np.int64)
+            if recorrencias is None or recorrencias.empty:
+                continue
+            ativas = recorrencias[recorrencias['ativa'].astype(bool)]
+            if ativas.empty:
+                continue
+
+            proxima = ativas['proxima_data'].to_numpy(dtype='datetime64[D]')
+            por_mes = ativas['periodo_meses'].to_numpy(dtype=np.int64)
+            por_dia = np.rint(ativas['periodo_dias'].to_numpy()).astype(np.int64)
+            repeticoes = int(np.ceil(meses * 31 / por_dia.min())) + 1
+            k = np.arange(repeticoes)[None, :]
+
+            mes_calendario = proxima.astype('datetime64[M]').astype(np.int64)[:, None] + \
+                k * por_mes[:, None]
+            mes_por_dias = (proxima[:, None] + k * por_dia[:, None]).astype(
+                'datetime64[M]').astype(np.int64)
+            mes_ocorrencia = np.where(por_mes[:, None] > 0, mes_calendario, mes_por_dias)
+
+            posicao = mes_ocorrencia - inicio.astype(np.int64)
+            dentro = (posicao >= 0) & (posicao < meses)
+            valores = np.broadcast_to(
+                ativas['valor_centavos'].to_numpy(dtype=np.int64)[:, None], posicao.shape)
+            totais[nome] = np.bincount(
+                posicao[dentro], weights=valores[dentro], minlength=meses).astype(np.int64)
+
+        saldo = totais['rendimentos'] - totais['gastos']
+        return pd.DataFrame({
+            'mes_ano': meses_projecao.astype(str),
+            'rendimentos_centavos': totais['rendimentos'],
+            'gastos_centavos': totais['gastos'],
+            'saldo_centavos': saldo,
+            'total_rendimentos': centavos_para_reais(totais['rendimentos']),
+            'total_gastos': centavos_para_reais(totais['gastos']),
+            'saldo_mensal': centavos_para_reais(saldo)
+        })
+
+    @staticmethod
+    def calcular_aporte_esperado(fluxo_df):
+        """Aporte mensal esperado (R$): média do saldo projetado, nunca negativa"""
+        if fluxo_df.empty:
+            return 0.0
+        return max(0.0, centavos_para_reais(float(fluxo_df['saldo_centavos'].mean())))
+
+    @staticmethod
+    def calcular_janelas_moveis(serie_df, janelas=JANELAS_MOVEIS):
+        """Somas e médias diárias móveis de rendimentos e gastos e o fluxo líquido acumulado
+
+        Parte da série diária densa (DataManager.get_serie_diaria_df): a
+        soma de uma janela de w dias terminando em cada dia é
+        acumulado[i] - acumulado[i - w], O(1) por ponto e janela. Nos
+        primeiros dias a janela cobre só o histórico disponível.
+        """
+        if serie_df.empty:
+            return pd.DataFrame()
+
+        resultado = {'data': serie_df['data'].to_numpy()}
+        dias_cobertos = np.arange(1, len(serie_df) + 1)
+        for canal in CANAIS_FLUXO:
+            acumulado = np.concatenate(
+                ([0], serie_df[f'{canal}_acumulado_centavos'].to_numpy(dtype=np.int64)))
+            for w in janelas:
+                inicio = np.maximum(np.arange(1, len(acumulado)) - w, 0)
+                soma = acumulado[1:] - acumulado[inicio]
+                resultado[f'{canal}_{w}d_centavos'] = soma
+                resultado[f'{canal}_{w}d_media'] = centavos_para_reais(
+                    soma / np.minimum(dias_cobertos, w))
+
+        liquido = serie_df['rendimentos_acumulado_centavos'].to_numpy(dtype=np.int64) - \
+            serie_df['gastos_acumulado_centavos'].to_numpy(dtype=np.int64)
+        resultado['fluxo_liquido_acumulado_centavos'] = liquido
+        resultado['fluxo_liquido_acumulado'] = centavos_para_reais(liquido)
+        return pd.DataFrame(resultado)
+
+    @staticmethod
+    def calcular_agregados_semanais(serie_df):
+        """Rendimentos, gastos e saldo por semana (segunda a domingo)
+
+        Cada semana é a diferença do acumulado entre o último dia da
+        semana e o último da anterior: uma subtração por semana.
+        """
+        if serie_df.empty:
+            return pd.DataFrame()
+
+        dias = serie_df['data'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+        # 1970-01-01 foi quinta: (dia + 3) // 7 numera as semanas começando na segunda
+        semana = (dias + 3) // 7
+        fim = np.flatnonzero(np.r_[semana[1:] != semana[:-1], True])
+        totais = {}
+        for canal in CANAIS_FLUXO:
+            acumulado = serie_df[f'{canal}_acumulado_centavos'].to_numpy(dtype=np.int64)
+            totais[canal] = np.diff(acumulado[fim], prepend=0)
+        saldo = totais['rendimentos'] - totais['gastos']
+        return pd.DataFrame({
+            'semana': (semana[fim] * 7 - 3).astype('datetime64[D]').astype('datetime64[s]'),
+            'rendimentos_centavos': totais['rendimentos'],
+            'gastos_centavos': totais['gastos'],
+            'saldo_centavos': saldo,
+            'total_rendimentos': centavos_para_reais(totais['rendimentos']),
+            'total_gastos': centavos_para_reais(totais['gastos']),
+            'saldo_semanal': centavos_para_reais(saldo)
+        })
+
+    @staticmethod
+    def serie_mensal_por_categoria(gastos_df, ate=None):
+        """Matriz densa (categoria x mês) de gastos em centavos, meses sem gasto = 0
+
+        O mês corrente, ainda incompleto, fica de fora (ou tudo após `ate`).
+        Retorna (categorias, meses, matriz).
+        """
+        vazio = ([], np.array([], dtype='datetime64[M]'), np.zeros((0, 0), dtype=np.int64))
+        if gastos_df.empty:
+            return vazio
+        ate = np.datetime64(ate or datetime.now().strftime('%Y-%m'), 'M') - \
+            (0 if ate else 1)
+        mes = gastos_df['data'].to_numpy(dtype='datetime64[M]')
+        dentro = mes <= ate
+        if not dentro.any():
+            return vazio
+
+        codigos, categorias = pd.factorize(gastos_df['categoria'][dentro])
+        mes = mes[dentro].astype(np.int64)
+        primeiro = mes.min()
+        n_meses = int(mes.max() - primeiro + 1)
+        # Soma por célula (categoria, mês) com um único bincount
+        matriz = np.bincount(
+            codigos * n_meses + (mes - primeiro),
+            weights=gastos_df['valor_centavos'].to_numpy(dtype=np.int64)[dentro],
+            minlength=len(categorias) * n_meses
+        ).round().astype(np.int64).reshape(len(categorias), n_meses)
+        meses = np.arange(primeiro, primeiro + n_meses).astype('datetime64[M]')
+        return [str(c) for c in categorias], meses, matriz
+
+    @staticmethod
+    def comparar_orcamentos(gastos_df, orcamentos, ate=None):
+        """Orçado x realizado de cada categoria com orçamento em todos os meses
+
+        Uma única passada: a matriz (categoria x mês) de gastos é comparada
+        com o vetor de limites por broadcasting. Considera meses completos
+        (ou até `ate`, inclusive).
+        """
+        colunas = ['mes_ano', 'categoria', 'orcado_centavos', 'realizado_centavos',
+                   'diferenca_centavos', 'utilizacao', 'estourou']
+        categorias, meses, serie = FinanceCalculator.serie_mensal_por_categoria(gastos_df, ate)
+        if not orcamentos or not len(meses):
+            return pd.DataFrame(columns=colunas)
+
+        orcadas = list(orcamentos)
+        posicao = {c: i for i, c in enumerate(categorias)}
+        # Categoria orçada sem nenhum gasto: linha de zeros
+        linhas = np.array([posicao.get(c, len(categorias)) for c in orcadas])
+        realizado = np.vstack([serie, np.zeros((1, len(meses)), dtype=np.int64)])[linhas]
+        orcado = np.broadcast_to(
+            np.array([orcamentos[c] for c in orcadas], dtype=np.int64)[:, None], realizado.shape)
+
+        return pd.DataFrame({
+            'mes_ano': np.tile(meses.astype(str), len(orcadas)),
+            'categoria': np.repeat(np.array(orcadas, dtype=object), len(meses)),
+            'orcado_centavos': orcado.ravel(),
+            'realizado_centavos': realizado.ravel(),
+            'diferenca_centavos': (orcado - realizado).ravel(),
+            'utilizacao': (realizado / orcado).ravel(),
+            'estourou': (realizado > orcado).ravel()
+        })
+
+    @staticmethod
+    def prever_gastos_por_categoria(gastos_df, meses=6, sazonal=None, ate=None):
+        """Previsão dos próximos meses de cada categoria por suavização exponencial
+
+        Holt-Winters aditivo (nível + tendência + sazonalidade anual, esta
+        só com 24+ meses de histórico) ajustado em todas as categorias ao
+        mesmo tempo: a recursão anda mês a mês sobre arrays (categoria x
+        parâmetros) e cada categoria escolhe a combinação da grade com
+        menor erro de um passo. Intervalos de ~95% vêm da variância dos
+        erros. Para reaproveitar entre reruns, use DataManager.em_cache_da_versao.
+        """
+        categorias, historico, serie = FinanceCalculator.serie_mensal_por_categoria(gastos_df, ate)
+        colunas = ['categoria', 'mes_ano', 'horizonte', 'previsto_centavos', 'inferior_centavos',
+                   'superior_centavos', 'previsto', 'inferior', 'superior']
+        if not categorias or serie.shape[1] < MINIMO_MESES_PREVISAO:
+            return pd.DataFrame(columns=colunas)
+
+        y = serie.astype(np.float64)
+        k, n = y.shape
+        if sazonal is None:
+            sazonal = n >= 2 * PERIODO_SAZONAL
+        m = PERIODO_SAZONAL if sazonal and n >= 2 * PERIODO_SAZONAL else 1
+
+        # Grade de parâmetros: eixo 1 de todos os estados
+        alfa, beta, gama = (g.ravel() for g in np.meshgrid(
+            GRADE_ALFA, GRADE_BETA, GRADE_GAMA if m > 1 else [0.0], indexing='ij'))
+
+        # Estado inicial: primeira estação (ou os dois primeiros meses)
+        if m > 1:
+            media_ano = y[:, :m].mean(axis=1)
+            tendencia0 = (y[:, m:2 * m].mean(axis=1) - media_ano) / m
+            # Nível no primeiro mês e índices sazonais sem a tendência do primeiro ano
+            nivel0 = media_ano - (m - 1) / 2 * tendencia0
+            estacao0 = y[:, :m] - nivel0[:, None] - np.arange(m)[None, :] * tendencia0[:, None]
+        else:
+            nivel0 = y[:, 0]
+            tendencia0 = y[:, 1] - y[:, 0]
+            estacao0 = np.zeros((k, 1))
+        nivel = np.repeat(nivel0[:, None], len(alfa), axis=1)
+        tendencia = np.repeat(tendencia0[:, None], len(alfa), axis=1)
+        estacao = np.repeat(estacao0[:, None, :], len(alfa), axis=1)
+        sse = np.zeros_like(nivel)
+
+        for t in range(1, n):
+            s = estacao[:, :, t % m]
+            erro = y[:, t, None] - (nivel + tendencia + s)
+            sse += erro ** 2
+            novo_nivel = alfa * (y[:, t, None] - s) + (1 - alfa) * (nivel + tendencia)
+            tendencia = beta * (novo_nivel - nivel) + (1 - beta) * tendencia
+            estacao[:, :, t % m] = gama * (y[:, t, None] - novo_nivel) + (1 - gama) * s
+            nivel = novo_nivel
+
+        melhor = sse.argmin(axis=1)
+        linhas = np.arange(k)
+        nivel, tendencia = nivel[linhas, melhor], tendencia[linhas, melhor]
+        estacao = estacao[linhas, melhor]
+        a, b, g = alfa[melhor], beta[melhor], gama[melhor]
+        parametros = 3 if m > 1 else 2
+        sigma = np.sqrt(sse[linhas, melhor] / max(n - 1 - parametros, 1))
+
+        h = np.arange(1, meses + 1)
+        previsto = nivel[:, None] + h[None, :] * tendencia[:, None] + \
+            estacao[:, (n - 1 + h) % m]
+        # Variância do erro de h passos do modelo aditivo (Hyndman et al.)
+        j = np.arange(meses)[None, :]
+        c = a[:, None] * (1 + j * b[:, None]) + g[:, None] * ((j % m == 0) & (j > 0) & (m > 1))
+        c[:, 0] = 0
+        margem = Z_INTERVALO * sigma[:, None] * np.sqrt(1 + np.cumsum(c ** 2, axis=1))
+
+        # Gastos não ficam negativos
+        previsto_centavos = np.rint(np.maximum(previsto, 0)).astype(np.int64)
+        inferior = np.rint(np.maximum(previsto - margem, 0)).astype(np.int64)
+        superior = np.rint(np.maximum(previsto + margem, 0)).astype(np.int64)
+        meses_previstos = (historico[-1] + h).astype(str)
+
+        resultado = pd.DataFrame({
+            'categoria': np.repeat(np.array(categorias, dtype=object), meses),
+            'mes_ano': np.tile(meses_previstos, k),
+            'horizonte': np.tile(h, k),
+            'previsto_centavos': previsto_centavos.ravel(),
+            'inferior_centavos': inferior.ravel(),
+            'superior_centavos': superior.ravel(),
+            'previsto': centavos_para_reais(previsto_centavos.ravel()),
+            'inferior': centavos_para_reais(inferior.ravel()),
+            'superior': centavos_para_reais(superior.ravel())
+        })
+        return resultado
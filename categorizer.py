@@ -0,0 +1,240 @@
+import numpy as np
+import pandas as pd
+
+from search_index import tokenizar
+
+# Abaixo desta confiança a sugestão deve ser revisada pelo usuário
+CONFIANCA_MINIMA = 0.6
+
+# Suavização de Laplace do modelo de frequência de palavras
+ALFA = 1.0
+
+
+class _NoTrie:
+    __slots__ = ('filhos', 'contagens', 'regra')
+
+    def __init__(self):
+        self.filhos = {}
+        self.contagens = {}
+        self.regra = None
+
+
+class Categorizador:
+    """Sugere a categoria de um gasto a partir da descrição
+
+    Combina três fontes, da mais forte para a mais fraca:
+    * regras do usuário (palavras-chave -> categoria) em uma trie de
+      palavras, procuradas em qualquer posição da descrição;
+    * a trie das descrições já categorizadas: cada nó guarda quantas
+      vezes cada categoria apareceu com aquele começo de descrição;
+    * um modelo de frequência de palavras (Naive Bayes multinomial).
+
+    O estado persistido são só contagens, então cada gasto novo ou
+    corrigido atualiza o modelo em O(palavras), sem retreinar.
+    """
+
+    def __init__(self, estado=None):
+        estado = estado or {}
+        self.regras = dict(estado.get('regras', {}))
+        self.frases = {}
+        self._raiz = _NoTrie()
+        self._raiz_regras = _NoTrie()
+        self._palavras = {}
+        self._totais = {}
+        self.versao = 0
+        self._modelo = (None, None)
+
+        for palavras, categoria in self.regras.items():
+            self._inserir_regra(palavras, categoria)
+        for frase, contagens in estado.get('frases', {}).items():
+            for categoria, n in contagens.items():
+                self._contar(frase.split(), categoria, n)
+
+    # ------------------------------------------------------------------
+    # Aprendizado
+    # ------------------------------------------------------------------
+    @classmethod
+    def treinar(cls, pares):
+        """Modelo inicial a partir de (descricao, categoria, quantidade)"""
+        modelo = cls()
+        modelo.aprender_contagens(pares)
+        return modelo
+
+    def aprender_contagens(self, pares):
+        """Registra vários gastos de uma vez: (descricao, categoria, quantidade)"""
+        for descricao, categoria, n in pares:
+            self._contar(tokenizar(descricao), categoria, n)
+
+    def _contar(self, tokens, categoria, n):
+        """Soma n ocorrências (n negativo desfaz) na trie e nas frequências"""
+        if not tokens or not categoria or n == 0:
+            return
+        frase = ' '.join(tokens)
+        _somar(self.frases.setdefault(frase, {}), categoria, n)
+        if not self.frases[frase]:
+            del self.frases[frase]
+
+        no = self._raiz
+        for token in tokens:
+            no = no.filhos.setdefault(token, _NoTrie())
+            _somar(no.contagens, categoria, n)
+
+        for token in tokens:
+            _somar(self._palavras.setdefault(token, {}), categoria, n)
+        _somar(self._totais, categoria, n * len(tokens))
+        self.versao += 1
+
+    def aprender(self, descricao, categoria, anterior=None):
+        """Registra um gasto categorizado (ou a correção de uma categoria)"""
+        tokens = tokenizar(descricao)
+        if anterior and anterior != categoria:
+            self._contar(tokens, anterior, -1)
+        if anterior != categoria:
+            self._contar(tokens, categoria, 1)
+
+    def esquecer(self, descricao, categoria):
+        """Desfaz um gasto registrado (removido, ou antes de ser reindexado numa edição)"""
+        self._contar(tokenizar(descricao), categoria, -1)
+
+    def _inserir_regra(self, palavras, categoria):
+        no = self._raiz_regras
+        for token in tokenizar(palavras):
+            no = no.filhos.setdefault(token, _NoTrie())
+        no.regra = categoria
+
+    def adicionar_regra(self, palavras, categoria):
+        """Palavra-chave (ou expressão) que sempre indica a categoria"""
+        chave = ' '.join(tokenizar(palavras))
+        if not chave:
+            return False
+        self.regras[chave] = categoria
+        self._inserir_regra(chave, categoria)
+        self.versao += 1
+        return True
+
+    def estado(self):
+        """Contagens e regras em formato JSON"""
+        return {'regras': self.regras, 'frases': self.frases}
+
+    # ------------------------------------------------------------------
+    # Classificação
+    # ------------------------------------------------------------------
+    def _regra(self, tokens):
+        """Regra mais longa que aparece na descrição"""
+        melhor, tamanho = None, 0
+        for inicio in range(len(tokens)):
+            no = self._raiz_regras
+            for i in range(inicio, len(tokens)):
+                no = no.filhos.get(tokens[i])
+                if no is None:
+                    break
+                if no.regra is not None and i - inicio + 1 > tamanho:
+                    melhor, tamanho = no.regra, i - inicio + 1
+        return melhor
+
+    def _prefixo(self, tokens):
+        """Nó mais profundo da trie alcançado pela descrição e sua profundidade"""
+        no, profundidade = self._raiz, 0
+        for token in tokens:
+            proximo = no.filhos.get(token)
+            if proximo is None or not proximo.contagens:
+                break
+            no, profundidade = proximo, profundidade + 1
+        return no, profundidade
+
+    def _matriz(self):
+        """Log-probabilidades P(palavra | categoria), refeitas só quando o modelo muda"""
+        versao, modelo = self._modelo
+        if versao == self.versao:
+            return modelo
+
+        categorias = sorted(c for c, n in self._totais.items() if n > 0)
+        palavras = list(self._palavras)
+        indice_categoria = {c: j for j, c in enumerate(categorias)}
+        contagens = np.zeros((len(palavras) + 1, len(categorias)))
+        for i, token in enumerate(palavras):
+            for categoria, n in self._palavras[token].items():
+                if categoria in indice_categoria:
+                    contagens[i, indice_categoria[categoria]] = n
+
+        totais = contagens.sum(axis=0)
+        log_prob = np.log((contagens + ALFA) /
+                          (totais + ALFA * (len(palavras) + 1)))
+        # Última linha: palavra desconhecida
+        log_prob[-1] = 0.0
+        log_priori = np.log((totais + ALFA) / (totais.sum() + ALFA * len(categorias)))
+        modelo = (categorias, {t: i for i, t in enumerate(palavras)}, log_prob, log_priori)
+        self._modelo = (self.versao, modelo)
+        return modelo
+
+    def classificar_lote(self, descricoes):
+        """Categoria sugerida e confiança (0 a 1) para cada descrição
+
+        As descrições repetidas são classificadas uma única vez e o modelo
+        de palavras é avaliado em lote: as log-probabilidades de todas as
+        palavras são somadas por descrição com np.add.reduceat.
+        """
+        codigos, unicas = pd.factorize(
+            pd.Series(list(descricoes), dtype=object).fillna(''))
+        categorias, indice_palavras, log_prob, log_priori = self._matriz()
+        desconhecida = len(log_prob) - 1
+        tokens_por_desc = [tokenizar(d) for d in unicas]
+
+        sugestoes = []
+        confiancas = np.zeros(len(unicas))
+        origens = []
+
+        # Modelo de palavras: uma linha de log_prob por palavra, somadas por descrição
+        tamanhos = np.array([max(len(t), 1) for t in tokens_por_desc], dtype=np.int64)
+        linhas = np.fromiter(
+            (indice_palavras.get(tok, desconhecida)
+             for tokens in tokens_por_desc for tok in (tokens or [None])),
+            dtype=np.int64, count=int(tamanhos.sum()))
+        if categorias and len(unicas):
+            inicios = np.concatenate(([0], np.cumsum(tamanhos)[:-1]))
+            pontuacao = np.add.reduceat(log_prob[linhas], inicios, axis=0) + log_priori
+            pontuacao -= pontuacao.max(axis=1, keepdims=True)
+            prob_palavras = np.exp(pontuacao)
+            prob_palavras /= prob_palavras.sum(axis=1, keepdims=True)
+
+        for k, tokens in enumerate(tokens_por_desc):
+            regra = self._regra(tokens)
+            if regra is not None:
+                sugestoes.append(regra)
+                confiancas[k] = 1.0
+                origens.append('regra')
+                continue
+            if not tokens or not categorias:
+                sugestoes.append(None)
+                origens.append(None)
+                continue
+
+            probs = prob_palavras[k].copy()
+            no, profundidade = self._prefixo(tokens)
+            if profundidade:
+                # Quanto mais da descrição a trie cobre, mais peso ela recebe
+                peso = profundidade / len(tokens)
+                total = sum(no.contagens.values())
+                prob_trie = np.array([no.contagens.get(c, 0) / total for c in categorias])
+                probs = peso * prob_trie + (1 - peso) * probs
+            j = int(probs.argmax())
+            sugestoes.append(categorias[j])
+            confiancas[k] = probs[j]
+            origens.append('historico' if profundidade else 'palavras')
+
+        return pd.DataFrame({
+            'categoria_sugerida': np.array(sugestoes, dtype=object)[codigos],
+            'confianca': confiancas[codigos],
+            'origem': np.array(origens, dtype=object)[codigos]
+        })
+
+    def classificar(self, descricao):
+        """Categoria sugerida e confiança de uma única descrição"""
+        linha = self.classificar_lote([descricao]).iloc[0]
+        return linha['categoria_sugerida'], float(linha['confianca'])
+
+
+def _somar(contagens, categoria, n):
+    contagens[categoria] = contagens.get(categoria, 0) + n
+    if contagens[categoria] <= 0:
+        del contagens[categoria]
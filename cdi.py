@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+# Convenção brasileira: taxa anual capitalizada em 252 dias úteis
+DIAS_UTEIS_ANO = 252
+
+
+def feriados_nacionais(ano_inicio, ano_fim):
+    """Feriados bancários nacionais (fixos e móveis) entre dois anos"""
+    feriados = []
+    for ano in range(ano_inicio, ano_fim + 1):
+        for mes, dia in ((1, 1), (4, 21), (5, 1), (9, 7), (10, 12), (11, 2), (11, 15), (12, 25)):
+            feriados.append(np.datetime64(f'{ano:04d}-{mes:02d}-{dia:02d}'))
+        if ano >= 2024:
+            feriados.append(np.datetime64(f'{ano:04d}-11-20'))
+
+        # Móveis a partir da Páscoa (algoritmo de Meeus/Jones/Butcher)
+        a, b, c = ano % 19, ano // 100, ano % 100
+        d, e = b // 4, b % 4
+        g = (8 * b + 13) // 25
+        h = (19 * a + b - d - g + 15) % 30
+        i, k = c // 4, c % 4
+        l = (32 + 2 * e + 2 * i - h - k) % 7
+        m = (a + 11 * h + 19 * l) // 433
+        mes = (h + l - 7 * m + 90) // 25
+        dia = (h + l - 7 * m + 33 * mes + 19) % 32
+        pascoa = np.datetime64(f'{ano:04d}-{mes:02d}-{dia:02d}')
+        # Carnaval (segunda e terça), Sexta-feira Santa e Corpus Christi
+        feriados.extend([pascoa - 48, pascoa - 47, pascoa - 2, pascoa + 60])
+
+    return np.array(sorted(feriados), dtype='datetime64[D]')
+
+
+class MotorCDI:
+    """Rendimento diário da poupança pela taxa CDI (dias úteis, base 252)
+
+    O fator acumulado F[d] = prod(1 + taxa_diaria) é calculado uma única
+    vez para todo o intervalo; o rendimento entre duas datas é
+    F[fim] / F[inicio], sem laço dia a dia. Cada instância corresponde a
+    uma versão da tabela de taxas.
+    """
+
+    def __init__(self, historico_taxas, feriados=None):
+        taxas = sorted(historico_taxas, key=lambda t: t['data'])
+        self.datas_taxas = np.array(
+            [t['data'] for t in taxas], dtype='datetime64[D]')
+        self.taxas = np.array([float(t['taxa']) for t in taxas])
+        self.feriados = np.array(
+            feriados if feriados is not None else feriados_nacionais(1990, 2100),
+            dtype='datetime64[D]')
+        self.inicio = None
+        self.fatores = np.ones(0)
+
+    def _garantir_intervalo(self, inicio, fim):
+        """Calcula (ou amplia) a tabela de fatores acumulados"""
+        if self.inicio is not None and inicio >= self.inicio and fim < self.inicio + len(self.fatores):
+            return
+        if self.inicio is not None:
+            inicio = min(inicio, self.inicio)
+            fim = max(fim, self.inicio + len(self.fatores) - 1)
+
+        dias = np.arange(inicio, fim + 1, dtype='datetime64[D]')
+        idx = np.clip(np.searchsorted(self.datas_taxas,
+                      dias, side='right') - 1, 0, None)
+        taxa_anual = self.taxas[idx] / 100 if len(self.taxas) else np.zeros(len(dias))
+        diaria = (1 + taxa_anual) ** (1 / DIAS_UTEIS_ANO) - 1
+        uteis = np.is_busday(dias, holidays=self.feriados)
+        self.fatores = np.cumprod(np.where(uteis, 1 + diaria, 1.0))
+        self.inicio = inicio
+
+    def _indices(self, datas):
+        return (np.asarray(datas, dtype='datetime64[D]') - self.inicio).astype(np.int64)
+
+    def fator(self, data_inicio, data_fim):
+        """Fator de rendimento entre o fim de data_inicio e o fim de data_fim"""
+        inicio = np.datetime64(str(data_inicio)[:10], 'D')
+        fim = np.datetime64(str(data_fim)[:10], 'D')
+        self._garantir_intervalo(min(inicio, fim), max(inicio, fim))
+        i, j = self._indices([inicio, fim])
+        return self.fatores[j] / self.fatores[i]
+
+    def serie_saldo(self, historico_df, data_fim=None):
+        """Saldo diário nominal e com rendimento, a partir do histórico
+
+        Cada movimentação v na data d vale v * F[t] / F[d] na data t, então o
+        saldo com rendimento é F[t] * soma acumulada de v / F[d].
+        """
+        if historico_df.empty:
+            return pd.DataFrame()
+
+        datas = historico_df['data'].to_numpy(dtype='datetime64[D]')
+        deltas = (historico_df['saldo_atual_centavos'] -
+                  historico_df['saldo_anterior_centavos']).to_numpy(dtype=np.float64)
+        inicio = datas.min()
+        fim = max(datas.max(), np.datetime64(
+            data_fim or 'today', 'D'))
+        self._garantir_intervalo(inicio, fim)
+
+        n = int((fim - inicio).astype(np.int64)) + 1
+        posicoes = (datas - inicio).astype(np.int64)
+        base = self._indices([inicio])[0]
+        fatores = self.fatores[base:base + n]
+
+        nominal = np.zeros(n)
+        normalizado = np.zeros(n)
+        np.add.at(nominal, posicoes, deltas)
+        np.add.at(normalizado, posicoes, deltas / fatores[posicoes])
+
+        return pd.DataFrame({
+            'data': np.arange(inicio, fim + 1, dtype='datetime64[D]').astype('datetime64[s]'),
+            'saldo_centavos': np.cumsum(nominal).astype(np.int64),
+            'saldo_com_rendimento_centavos': np.rint(
+                np.cumsum(normalizado) * fatores).astype(np.int64)
+        })
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+
+class SerieDiaria:
+    """Totais por dia (canal x dia) em arrays densos e suas somas acumuladas
+
+    Com o acumulado pronto, a soma de qualquer janela é a diferença de
+    dois pontos: O(1) por dia para janelas de 7, 30 ou 90 dias. Uma
+    transação nova só atualiza o sufixo do acumulado a partir do seu
+    dia; os arrays crescem com folga para datas novas no fim.
+    """
+
+    def __init__(self, canais):
+        self.canais = tuple(canais)
+        self.inicio = None
+        self.tamanho = 0
+        self.diario = np.zeros((len(self.canais), 0), dtype=np.int64)
+        self.acumulado = np.zeros((len(self.canais), 0), dtype=np.int64)
+        self.versao = 0
+
+    def _cobrir(self, primeiro, ultimo):
+        """Garante posições para os dias de primeiro a ultimo"""
+        if self.inicio is None:
+            self.inicio = primeiro
+        deslocamento = max(self.inicio - primeiro, 0)
+        necessario = max(ultimo - self.inicio + 1, self.tamanho) + deslocamento
+
+        if deslocamento or necessario > self.diario.shape[1]:
+            # Realoca com folga; dias anteriores ao início exigem deslocar tudo
+            capacidade = max(necessario, 2 * self.diario.shape[1]) if not deslocamento else necessario
+            diario = np.zeros((len(self.canais), capacidade), dtype=np.int64)
+            acumulado = np.zeros_like(diario)
+            diario[:, deslocamento:deslocamento + self.tamanho] = self.diario[:, :self.tamanho]
+            acumulado[:, deslocamento:deslocamento + self.tamanho] = self.acumulado[:, :self.tamanho]
+            self.diario, self.acumulado = diario, acumulado
+            self.inicio -= deslocamento
+            self.tamanho += deslocamento
+
+        if necessario > self.tamanho:
+            # Dias novos no fim repetem o último acumulado
+            ultimo_acumulado = self.acumulado[:, self.tamanho - 1:self.tamanho] if self.tamanho else 0
+            self.acumulado[:, self.tamanho:necessario] = ultimo_acumulado
+            self.tamanho = necessario
+
+    def adicionar_lote(self, canal, dias, centavos):
+        """Soma várias transações de um canal e refaz o acumulado só do primeiro dia afetado em diante"""
+        dias = np.asarray(dias, dtype=np.int64)
+        if not len(dias):
+            return
+        primeiro = int(dias.min())
+        self._cobrir(primeiro, int(dias.max()))
+        linha = self.canais.index(canal)
+        a = primeiro - self.inicio
+        self.diario[linha, a:self.tamanho] += np.rint(np.bincount(
+            dias - primeiro, weights=centavos, minlength=self.tamanho - a)).astype(np.int64)
+        base = self.acumulado[linha, a - 1] if a else 0
+        np.cumsum(self.diario[linha, a:self.tamanho], out=self.acumulado[linha, a:self.tamanho])
+        self.acumulado[linha, a:self.tamanho] += base
+        self.versao += 1
+
+    def adicionar(self, canal, dia, centavos):
+        """Uma transação (centavos negativos desfazem) — atualiza o sufixo a partir do dia"""
+        self._cobrir(dia, dia)
+        linha = self.canais.index(canal)
+        posicao = dia - self.inicio
+        self.diario[linha, posicao] += centavos
+        self.acumulado[linha, posicao:self.tamanho] += centavos
+        self.versao += 1
+
+    def memoria_bytes(self):
+        return self.diario.nbytes + self.acumulado.nbytes
+
+    def to_dataframe(self, ate=None):
+        """Uma linha por dia (até `ate`, se depois do último): totais e acumulados de cada canal"""
+        if self.inicio is None:
+            return pd.DataFrame()
+        ultimo = self.inicio + self.tamanho - 1
+        if ate is not None:
+            ultimo = max(ultimo, int(np.datetime64(ate, 'D').astype(np.int64)))
+        extra = ultimo - (self.inicio + self.tamanho - 1)
+
+        colunas = {'data': np.arange(self.inicio, ultimo + 1).astype(
+            'datetime64[D]').astype('datetime64[s]')}
+        for linha, canal in enumerate(self.canais):
+            colunas[f'{canal}_centavos'] = np.pad(self.diario[linha, :self.tamanho], (0, extra))
+            colunas[f'{canal}_acumulado_centavos'] = np.pad(
+                self.acumulado[linha, :self.tamanho], (0, extra), mode='edge')
+        return pd.DataFrame(colunas)
@@ -1,101 +1,840 @@
+import contextlib
+import copy
+import functools
+import itertools
 import json
+import numpy as np
 import pandas as pd
+from collections import Counter
 from datetime import datetime
 import os
+from categorizer import Categorizador
+from anomalies import DetectorAnomalias, pontuar_historico
+from atomic_files import gravar_atomico, trava_exclusiva
+from backups import DiarioAlteracoes, PastaBackups, diario_vazio, nova_cadeia
+from budgets import MonitorOrcamentos
+from cdi import MotorCDI
+from daily_series import SerieDiaria
+from dedup import IndiceDuplicatas, pares_similares, similar_ao_registro, texto_normalizado
+from migrations import SCHEMA_VERSION, migrar, migrar_com_diario, versao_dos_dados
+from money import reais_para_centavos, reais_para_centavos_lote
+from net_worth import ORIGENS, LedgerPatrimonio
+from partitions import (ArmazemMensal, eh_particionado, meses_dos_dias, posicoes_por_mes,
+                        resumo_particao, texto_mes)
+from poupanca_ledger import LedgerPoupanca, SINAL_OPERACAO
+from profiling import perfil
+from search_index import IndiceBusca
+from transaction_store import TransactionStore, data_para_dia
 
+# Coleções armazenadas em colunas e o campo de rótulo de cada uma
+COLECOES_TRANSACOES = {
+    'rendimentos': 'fonte',
+    'gastos': 'categoria'
+}
 
+# Origem de cada coleção no livro de patrimônio e o sinal do efeito no caixa
+ORIGENS_PATRIMONIO = {
+    'rendimentos': ('rendimento', 1),
+    'gastos': ('gasto', -1)
+}
+
+# Versões dos dados, únicas no processo (chave de caches de resultados derivados)
+_VERSOES = itertools.count(1)
+
+# Índices montados a partir das transações: no carregamento sob demanda só
+# passam a existir quando rendimentos e gastos são lidos
+_INDICES_TRANSACOES = frozenset({
+    'indices_busca', '_indices_duplicatas', 'categorizador', 'detector_anomalias',
+    '_anomalias', 'serie_diaria', 'livro_patrimonio'
+})
+
+# Início da linha de uma coleção no arquivo único: o cabeçalho termina nela
+_INICIO_TRANSACOES = tuple(f'  {json.dumps(colecao)}: ' for colecao in COLECOES_TRANSACOES)
+
+
+def _campos_correcao(operacao=None, valor=None, data=None, descricao=None):
+    """Campos alterados de uma movimentação da poupança, no formato do histórico"""
+    campos = {}
+    if operacao is not None:
+        campos['operacao'] = operacao
+    if valor is not None:
+        campos['valor_centavos'] = reais_para_centavos(valor)
+    if data is not None:
+        campos['data'] = data.strftime('%Y-%m-%d')
+    if descricao is not None:
+        campos['descricao'] = descricao
+    return campos
+
+
+def _fluxo_poupanca(historico):
+    """Dias, ids e efeitos no caixa e na poupança das movimentações da poupança"""
+    dias = np.array([data_para_dia(item['data']) for item in historico], dtype=np.int64)
+    ids = np.array([int(item['id']) for item in historico], dtype=np.int64)
+    poupanca = np.array([SINAL_OPERACAO.get(item['operacao'], 0) * int(item['valor_centavos'])
+                         for item in historico], dtype=np.int64)
+    # Depósito sai do caixa e entra na poupança; saque faz o inverso
+    return dias, ids, -poupanca, poupanca
+
+
+def assinatura_arquivo(caminho):
+    """(inode, tamanho, mtime em ns) do arquivo, ou None se ele não existe
+
+    os.replace troca o inode: uma gravação de outro processo muda a
+    assinatura mesmo com o mesmo tamanho e mtime.
+    """
+    try:
+        estado = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    return (estado.st_ino, estado.st_size, estado.st_mtime_ns)
+
+
+def ler_cabecalho(caminho):
+    """Seções pequenas e totais mensais do arquivo único, sem ler as transações
+
+    O arquivo é gravado com as transações por último (DataManager._escrever_json):
+    o cabeçalho vai até a primeira linha de uma coleção. Retorna None se o
+    arquivo não tem os totais (gravado por uma versão anterior).
+    """
+    linhas = []
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for linha in f:
+            if linha.startswith(_INICIO_TRANSACOES):
+                break
+            linhas.append(linha)
+        else:
+            return None
+    try:
+        cabecalho = json.loads(''.join(linhas).rstrip().rstrip(',') + '\n}')
+    except json.JSONDecodeError:
+        return None
+    return cabecalho if 'totais_mensais' in cabecalho else None
+
+
+class DadosSobDemanda(dict):
+    """Dados do DataManager com rendimentos e gastos lidos no primeiro acesso
+
+    Começa só com o cabeçalho; o primeiro data['gastos'] (ou
+    data['rendimentos']) chama carregar(dados) uma vez, que inclui as duas
+    coleções e monta os índices. Daí em diante é um dict comum.
+    """
+
+    def __init__(self, dados, carregar):
+        super().__init__(dados)
+        self.carregar = carregar
+
+    @property
+    def pendente(self):
+        return self.carregar is not None
+
+    def carregar_pendentes(self):
+        if self.carregar is None:
+            return
+        carregar, self.carregar = self.carregar, None
+        try:
+            carregar(self)
+        except Exception:
+            self.carregar = carregar
+            raise
+
+    def __missing__(self, chave):
+        if chave not in COLECOES_TRANSACOES or self.carregar is None:
+            raise KeyError(chave)
+        self.carregar_pendentes()
+        return self[chave]
+
+    def get(self, chave, padrao=None):
+        if chave in COLECOES_TRANSACOES and self.pendente:
+            return self[chave]
+        return super().get(chave, padrao)
+
+
+def dados_padrao():
+    """Estrutura inicial de um arquivo de dados vazio"""
+    return {
+        'schema_version': SCHEMA_VERSION,
+        'rendimentos': [],
+        'gastos': [],
+        'poupanca': {
+            'saldo_atual_centavos': 0,
+            'historico': [],
+            'taxa_cdi': 13.75,
+            'historico_taxas': []
+        },
+        'objetivos': [],
+        # Limite mensal por categoria: {categoria: centavos}
+        'orcamentos': {},
+        'modelo_categorias': None,
+        # Sequência de alterações e o que mudou desde o último backup
+        'alteracoes': diario_vazio()
+    }
+
+
+@perfil.instrumentar
 class DataManager:
-    def __init__(self, data_file='finance_data.json'):
+    def __init__(self, data_file='finance_data.json', pasta_backups=None, particionado=False,
+                 sob_demanda=True):
         self.data_file = data_file
-        self.data = self.load_data()
-
-    def load_data(self):
-        """Carrega dados do arquivo JSON ou cria estrutura inicial"""
-        default_data = {
-            'rendimentos': [],
-            'gastos': [],
-            'poupanca': {
-                'saldo_atual': 0.0,
-                'historico': [],
-                'taxa_cdi': 13.75
-            },
-            'objetivos': []
-        }
+        # Dentro de gravacao_adiada(): save_data não grava
+        self._adiar_gravacao = False
+        self.backups = PastaBackups(
+            pasta_backups or f"{os.path.splitext(data_file)[0]}_backups")
+        # Pasta com uma partição por mês (partitions.py) em vez do arquivo único
+        self.particoes = (ArmazemMensal(data_file)
+                          if particionado or eh_particionado(data_file) else None)
+        self.recarregar(sob_demanda)
+
+    def recarregar(self, sob_demanda=True):
+        """Descarta o estado em memória e lê os dados do disco de novo"""
+        self.migracoes_aplicadas = []
+        # Gravação de outro processo encontrada com alterações locais não gravadas
+        self.conflito = False
+        self.data = self.load_data(sob_demanda)
+        if self.migracoes_aplicadas and self.save_data():
+            # Arquivo migrado gravado: a migração não precisa mais ser retomada
+            self._diario_migracao.encerrar()
+
+    def _arquivo_monitorado(self):
+        """Arquivo trocado a cada gravação: o próprio JSON ou o manifesto das partições"""
+        return self.particoes.caminho_manifesto if self.particoes is not None else self.data_file
+
+    def alterado_no_disco(self):
+        """True se outro processo gravou os dados depois da última leitura ou gravação (um os.stat)"""
+        caminho = self._arquivo_monitorado()
+        lido, assinatura = self._estado_disco
+        return lido == caminho and assinatura_arquivo(caminho) != assinatura
+
+    def recarregar_se_alterado(self):
+        """Relê os dados se outro processo os gravou; retorna True se recarregou
 
-        if os.path.exists(self.data_file):
+        Feito uma vez por rerun. Só o cabeçalho é relido na hora; no modo
+        particionado, as partições que não mudaram continuam no cache. Com
+        alterações locais ainda não gravadas não recarrega: marca o conflito.
+        """
+        if not self.alterado_no_disco():
+            return False
+        if self.versao != self.versao_salva:
+            self.conflito = True
+            return False
+        self.recarregar()
+        return True
+
+    def __getattr__(self, nome):
+        # Só chamado para atributos ausentes: índices de transações ainda não lidas
+        if nome in _INDICES_TRANSACOES and not self.transacoes_carregadas:
+            self.carregar_transacoes()
+            return getattr(self, nome)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{nome}'")
+
+    def load_data(self, sob_demanda=True):
+        """Carrega dados do arquivo JSON (migrando versões antigas) ou cria estrutura inicial
+
+        Com sob_demanda, lê só o cabeçalho (poupança, objetivos, orçamentos,
+        totais mensais); rendimentos e gastos são lidos no primeiro uso.
+        """
+        particionado = self.particoes is not None
+        # Assinatura tirada antes da leitura: uma gravação no meio é vista na próxima checagem
+        caminho = self._arquivo_monitorado()
+        self._estado_disco = (caminho, assinatura_arquivo(caminho))
+        existe = eh_particionado(self.data_file) if particionado else os.path.exists(self.data_file)
+        if existe:
             try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                # Garantir que todas as chaves existam
-                for key in default_data:
-                    if key not in data:
-                        data[key] = default_data[key]
-                return data
+                cabecalho = self._ler_cabecalho() if sob_demanda else None
+                if cabecalho is not None:
+                    dados, totais = cabecalho
+                    self.migracoes_aplicadas, self._diario_migracao = migrar_com_diario(
+                        dados, self.data_file)
+                    # As transações vêm do arquivo lido agora, mesmo que data_file mude
+                    return self._normalizar_secoes(DadosSobDemanda(
+                        dados, functools.partial(self._ler_transacoes, self.data_file)), totais)
+                if particionado:
+                    data = self.particoes.carregar_dados()
+                    totais = self.particoes.resumos()
+                else:
+                    with open(self.data_file, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    totais = data.get('totais_mensais')
+                self.migracoes_aplicadas, self._diario_migracao = migrar_com_diario(
+                    data, self.data_file)
+                # Dados migrados são regravados por inteiro (e os totais recontados)
+                return self._normalizar(data, None if self.migracoes_aplicadas else totais)
             except (json.JSONDecodeError, FileNotFoundError):
-                return default_data
-        return default_data
+                return self._normalizar(dados_padrao())
+        return self._normalizar(dados_padrao())
+
+    def _ler_cabecalho(self):
+        """(seções pequenas, totais mensais) sem as transações; None se for preciso ler tudo"""
+        if self.particoes is not None:
+            dados = self.particoes.ler_secoes()
+            totais = self.particoes.resumos()
+        else:
+            dados = ler_cabecalho(self.data_file)
+            if dados is None:
+                return None
+            totais = dados.pop('totais_mensais')
+        # Versões antigas do esquema são migradas junto com as transações
+        if versao_dos_dados(dados) != SCHEMA_VERSION:
+            return None
+        return dados, totais
+
+    def _ler_transacoes(self, caminho, data):
+        """Inclui rendimentos e gastos de caminho nos dados carregados só com o cabeçalho"""
+        colecoes = None
+        if self.particoes is not None:
+            try:
+                colecoes = {colecao: self.particoes.ler_colecao(colecao)
+                            for colecao in COLECOES_TRANSACOES}
+            except FileNotFoundError:
+                # Partição apagada por uma gravação de outro processo
+                pass
+        else:
+            assinatura = assinatura_arquivo(caminho)
+            with open(caminho, 'r', encoding='utf-8') as f:
+                completo = json.load(f)
+            if (caminho, assinatura) == self._estado_disco:
+                colecoes = {colecao: completo.get(colecao, []) for colecao in COLECOES_TRANSACOES}
+
+        if colecoes is None:
+            # O arquivo mudou depois da leitura do cabeçalho: relê tudo, sem misturar versões
+            print(f"{self._arquivo_monitorado()} foi alterado por outro processo: dados relidos")
+            self.conflito = False
+            atuais = self.load_data(sob_demanda=False)
+            data.clear()
+            data.update(atuais)
+            return
+        data.update(colecoes)
+        self._indexar_transacoes(data)
+
+    @property
+    def transacoes_carregadas(self):
+        """False enquanto só o cabeçalho dos dados foi lido"""
+        return not (isinstance(self.data, DadosSobDemanda) and self.data.pendente)
+
+    def carregar_transacoes(self):
+        """Lê rendimentos e gastos e monta os índices, se ainda não foram lidos"""
+        if isinstance(self.data, DadosSobDemanda):
+            self.data.carregar_pendentes()
+
+    def _normalizar(self, data, totais=None):
+        """Garante todas as chaves e converte as transações para colunas"""
+        data = self._normalizar_secoes(data, totais)
+        self._indexar_transacoes(data)
+        return data
+
+    def _normalizar_secoes(self, data, totais=None):
+        """Garante as chaves e monta o estado que não depende das transações
+
+        totais ({coleção: {mês: resumo}}) são os totais mensais já gravados;
+        sem eles, todos os meses são recontados e regravados.
+        """
+        # Backups restaurados podem ser de versões antigas do esquema
+        migrar(data)
+        # Totais gravados são refeitos a partir das transações
+        data.pop('totais_mensais', None)
+        for nome in _INDICES_TRANSACOES:
+            self.__dict__.pop(nome, None)
+        pendente = getattr(data, 'pendente', False)
+        default_data = dados_padrao()
+
+        # Garantir que todas as chaves existam
+        for key in default_data:
+            if key not in data and not (pendente and key in COLECOES_TRANSACOES):
+                data[key] = default_data[key]
+
+        # Modelo de categorias salvo: o dict é o próprio estado do modelo. Sem
+        # modelo, ele é treinado a partir dos gastos (_indexar_transacoes)
+        if data['modelo_categorias'] is not None:
+            self.categorizador = Categorizador(data['modelo_categorias'])
+            data['modelo_categorias'] = self.categorizador.estado()
+
+        self.ledger_poupanca = LedgerPoupanca(data['poupanca']['historico'])
+
+        # Série de taxas CDI: arquivos antigos só têm a taxa atual
+        if not data['poupanca'].get('historico_taxas'):
+            data['poupanca']['historico_taxas'] = [{
+                'data': datetime.now().strftime('%Y-%m-%d'),
+                'taxa': float(data['poupanca'].get('taxa_cdi', 13.75))
+            }]
+        self._motor_cdi = None
+        self._versao_taxas = 0
+        self._cache_rendimento = (None, None)
+        # Resultados derivados dos dados, por nome: (versão, parâmetros, valor)
+        self._caches_versao = {}
+        self.diario = DiarioAlteracoes(data['alteracoes'])
+
+        self._totais = totais if totais is not None else {}
+        self._versao_totais = None
+        # Meses alterados desde a última gravação: só eles são regravados
+        # (partições) e recontados (totais). None: todos
+        self._meses_alterados = (None if totais is None else
+                                 {colecao: set() for colecao in COLECOES_TRANSACOES})
+        if pendente:
+            self._montar_monitor_orcamentos(data, datetime.now().strftime('%Y-%m'))
+        self.versao = next(_VERSOES)
+        # Versão já gravada em disco (carregada ou salva)
+        self.versao_salva = self.versao
+        return data
+
+    def _indexar_transacoes(self, data):
+        """Converte rendimentos e gastos para colunas e monta os índices sobre eles"""
+        self.indices_busca = {}
+        # Índices de duplicatas são montados no primeiro uso
+        self._indices_duplicatas = {}
+        for colecao, campo_rotulo in COLECOES_TRANSACOES.items():
+            if not isinstance(data[colecao], TransactionStore):
+                data[colecao] = TransactionStore(campo_rotulo, data[colecao])
+
+            campos = (campo_rotulo, 'descricao')
+            indice = IndiceBusca(campos)
+            indice.construir(
+                {campo: data[colecao].agrupar_ids(campo) for campo in campos})
+            self.indices_busca[colecao] = indice
+
+        # Modelo de categorias: treinado uma vez a partir dos gastos e depois
+        # atualizado a cada gasto
+        if data['modelo_categorias'] is None:
+            self.categorizador = Categorizador.treinar(
+                data['gastos'].contar_rotulos_por_descricao())
+            data['modelo_categorias'] = self.categorizador.estado()
+
+        colunas_gastos = data['gastos'].visao_colunas()
+        self.detector_anomalias = DetectorAnomalias.do_lote(
+            colunas_gastos['cod_rotulo'], data['gastos'].rotulos.valores,
+            colunas_gastos['valor_centavos'])
+        # Anomalias por id, montadas na primeira consulta e depois incrementais
+        self._anomalias = None
+        self._montar_monitor_orcamentos(data, datetime.now().strftime('%Y-%m'))
+
+        # Totais diários de rendimentos e gastos para janelas móveis
+        self.serie_diaria = SerieDiaria(COLECOES_TRANSACOES)
+        for colecao in COLECOES_TRANSACOES:
+            colunas = data[colecao].visao_colunas()
+            self.serie_diaria.adicionar_lote(colecao, colunas['dia'], colunas['valor_centavos'])
+
+        # Livro único de caixa e poupança: fluxos ordenados e intercalados por data
+        fluxos = []
+        for colecao, (origem, sinal) in ORIGENS_PATRIMONIO.items():
+            colunas = data[colecao].visao_colunas()
+            fluxos.append((origem, colunas['dia'], colunas['id'],
+                           sinal * colunas['valor_centavos'], np.zeros(len(colunas['id']))))
+        fluxos.append(('poupanca', *_fluxo_poupanca(data['poupanca']['historico'])))
+        self.livro_patrimonio = LedgerPatrimonio.dos_fluxos(fluxos)
 
     def save_data(self):
         """Salva dados no arquivo JSON"""
+        # Toda alteração termina aqui: invalida os caches ligados à versão
+        self.versao = next(_VERSOES)
+        if self._adiar_gravacao:
+            return True
+        # Da conferência até o os.replace nenhum outro processo grava
+        with trava_exclusiva(self._arquivo_monitorado()):
+            if self.conflito or self.alterado_no_disco():
+                # Gravar agora apagaria o que o outro processo gravou
+                self.conflito = True
+                print(f"Erro ao salvar dados: {self._arquivo_monitorado()} foi alterado por outro "
+                      "processo depois da última leitura")
+                return False
+            try:
+                if self.particoes is not None:
+                    estado = self.particoes.gravar(self.data, self._meses_alterados)
+                    self._totais = self.particoes.resumos()
+                    self._versao_totais = self.versao
+                else:
+                    # Temporário único e troca: o arquivo nunca fica pela metade
+                    estado = gravar_atomico(self.data_file, self._escrever_json)
+                self._estado_disco = (self._arquivo_monitorado(),
+                                      (estado.st_ino, estado.st_size, estado.st_mtime_ns))
+                self._meses_alterados = {colecao: set() for colecao in COLECOES_TRANSACOES}
+                self.versao_salva = self.versao
+                return True
+            except Exception as e:
+                print(f"Erro ao salvar dados: {e}")
+                return False
+
+    @contextlib.contextmanager
+    def gravacao_adiada(self):
+        """Agrupa várias alterações em uma gravação: dentro do bloco save_data só marca a versão
+
+        Quem abre o bloco grava no fim com flush().
+        """
+        self._adiar_gravacao = True
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
+            yield self
+        finally:
+            self._adiar_gravacao = False
+
+    def flush(self):
+        """Grava só se houver alteração ainda não salva (ex.: um save que falhou)"""
+        if self.versao_salva == self.versao:
             return True
-        except Exception as e:
-            print(f"Erro ao salvar dados: {e}")
-            return False
+        return self.save_data()
+
+    def _escrever_json(self, f):
+        """Grava os dados; as transações são serializadas registro a registro
+
+        Seções pequenas e totais mensais vêm antes das transações: são o
+        cabeçalho lido no carregamento sob demanda (ler_cabecalho).
+        """
+        self.carregar_transacoes()
+        secoes = [(chave, valor) for chave, valor in self.data.items()
+                  if chave not in COLECOES_TRANSACOES]
+        secoes.append(('totais_mensais', {colecao: self.get_totais_mensais(colecao)
+                                          for colecao in COLECOES_TRANSACOES}))
+        secoes.extend((colecao, self.data[colecao]) for colecao in COLECOES_TRANSACOES)
+        f.write('{')
+        for i, (chave, valor) in enumerate(secoes):
+            f.write(',\n' if i else '\n')
+            f.write(f'  {json.dumps(chave)}: ')
+            if isinstance(valor, TransactionStore):
+                valor.escrever_json(f)
+            else:
+                f.write(json.dumps(valor, indent=2,
+                        ensure_ascii=False).replace('\n', '\n  '))
+        f.write('\n}\n')
+
+    def exportar_json(self, f):
+        """Grava o backup completo em f registro a registro, sem montar o JSON em memória"""
+        self._escrever_json(f)
+
+    def exportar_dados(self):
+        """Retorna os dados como dicts e listas simples (para backup)"""
+        self.carregar_transacoes()
+        return {
+            chave: (valor.to_records() if isinstance(valor, TransactionStore) else valor)
+            for chave, valor in self.data.items()
+        }
+
+    def restaurar_dados(self, dados):
+        """Substitui todos os dados pelos de um backup e salva"""
+        # A sequência continua; o próximo backup incremental volta a ser completo
+        dados = dict(dados, alteracoes=diario_vazio(self.diario.sequencia))
+        self.data = self._normalizar(dados)
+        return self.save_data()
+
+    def gerar_backup(self, completo=False):
+        """Backup incremental na pasta de backups
+
+        O primeiro (ou quando pedido) é completo; os seguintes só levam os
+        registros alterados e removidos desde o anterior, então tamanho e
+        tempo acompanham o volume de mudanças. Retorna o caminho gravado,
+        ou None se nada mudou desde o último backup.
+        """
+        diario = self.diario
+        completo = completo or diario.precisa_completo
+        if not diario.pendentes() and not completo:
+            return None
+        sequencias = {p['sequencia'] for p in self.backups.listar()}
+        while diario.sequencia in sequencias:
+            # Cada ponto de restauração tem uma sequência própria (backup completo
+            # repetido, ou diário não salvo depois do último backup)
+            diario.avancar()
+
+        cabecalho = {
+            'tipo': 'completo' if completo else 'delta',
+            'cadeia': nova_cadeia() if completo else diario.estado['cadeia'],
+            'sequencia': diario.sequencia,
+            'base': None if completo else diario.estado['ultimo_backup'],
+            'criado_em': datetime.now().isoformat(timespec='seconds')
+        }
+        try:
+            if completo:
+                caminho = self.backups.gravar(cabecalho, self._escrever_json)
+            else:
+                delta = self._montar_delta()
+                caminho = self.backups.gravar(
+                    cabecalho, lambda f: json.dump(delta, f, ensure_ascii=False))
+        except OSError as e:
+            print(f"Erro ao gravar backup: {e}")
+            return None
+        diario.marcar_backup(cabecalho['cadeia'])
+        # O diário vai para o disco no próximo save (ou flush), sem regravar tudo agora
+        self.versao = next(_VERSOES)
+        return caminho
+
+    def _montar_delta(self):
+        """Registros alterados (atuais) e removidos, e seções alteradas, desde o último backup"""
+        registros = {}
+        for colecao in self.diario.estado['registros']:
+            ids = self.diario.ids_alterados(colecao)
+            if not ids:
+                continue
+            if colecao == 'poupanca':
+                itens = self.ledger_poupanca.itens
+                alterados = [itens[id_] for id_ in ids if id_ in itens]
+            else:
+                alterados = self.data[colecao].obter_lote(ids)
+            presentes = {r['id'] for r in alterados}
+            registros[colecao] = {'alterados': alterados,
+                                  'removidos': [id_ for id_ in ids if id_ not in presentes]}
+
+        fontes = {
+            'taxas': lambda: self.data['poupanca']['historico_taxas'],
+            'objetivos': lambda: self.data['objetivos'],
+            'orcamentos': lambda: self.data['orcamentos'],
+            'regras': lambda: self.categorizador.regras
+        }
+        secoes = {secao: fontes[secao]() for secao in self.diario.estado['secoes']}
+        return {'registros': registros, 'secoes': secoes}
+
+    def pontos_restauracao(self):
+        """Backups completos e deltas disponíveis, do mais antigo ao mais novo"""
+        return pd.DataFrame(self.backups.listar(),
+                            columns=['sequencia', 'tipo', 'criado_em', 'bytes', 'arquivo'])
+
+    def restaurar_ponto(self, sequencia):
+        """Restaura os dados como estavam no backup `sequencia` (completo + deltas até ele)"""
+        dados, com_deltas = self.backups.reconstruir(sequencia)
+        regras = (dados.get('modelo_categorias') or {}).get('regras', {})
+        if com_deltas:
+            # As contagens do modelo não vão nos deltas: retreina a partir dos gastos
+            dados['modelo_categorias'] = None
+        dados['alteracoes'] = diario_vazio(self.diario.sequencia)
+        self.data = self._normalizar(dados)
+        for palavras, categoria in regras.items():
+            self.categorizador.adicionar_regra(palavras, categoria)
+        self.data['poupanca']['saldo_atual_centavos'] = self.ledger_poupanca.total
+        return self.save_data()
+
+    def memoria_transacoes(self):
+        """Memória aproximada (bytes) usada por rendimentos e gastos (0 se ainda não lidos)"""
+        if not self.transacoes_carregadas:
+            return 0
+        return sum(self.data[colecao].memoria_bytes() for colecao in COLECOES_TRANSACOES)
+
+    def memoria_bytes(self):
+        """Memória aproximada (bytes) da instância: transações, série diária e livro de patrimônio"""
+        if not self.transacoes_carregadas:
+            return 0
+        return (self.memoria_transacoes() + self.serie_diaria.memoria_bytes() +
+                self.livro_patrimonio.memoria_bytes())
 
     def add_rendimento(self, fonte, valor, data, descricao=""):
         """Adiciona um novo rendimento"""
         rendimento = {
-            'id': len(self.data['rendimentos']) + 1,
+            'id': self.data['rendimentos'].proximo_id,
             'fonte': fonte,
-            'valor': float(valor),
+            'valor_centavos': reais_para_centavos(valor),
             'data': data.strftime('%Y-%m-%d'),
             'descricao': descricao,
             'timestamp': datetime.now().isoformat()
         }
         self.data['rendimentos'].append(rendimento)
+        self._indexar_novos('rendimentos', len(self.data['rendimentos']) - 1)
         return self.save_data()
 
     def add_gasto(self, categoria, valor, data, descricao=""):
         """Adiciona um novo gasto"""
         gasto = {
-            'id': len(self.data['gastos']) + 1,
+            'id': self.data['gastos'].proximo_id,
             'categoria': categoria,
-            'valor': float(valor),
+            'valor_centavos': reais_para_centavos(valor),
             'data': data.strftime('%Y-%m-%d'),
             'descricao': descricao,
             'timestamp': datetime.now().isoformat()
         }
         self.data['gastos'].append(gasto)
+        self._indexar_novos('gastos', len(self.data['gastos']) - 1)
+        return self.save_data()
+
+    def _indexar_novos(self, colecao, inicio):
+        """Atualiza busca, duplicatas e modelo de categorias com as linhas a partir de inicio"""
+        store = self.data[colecao]
+        self.indices_busca[colecao].construir(
+            {campo: store.agrupar_ids(campo, inicio) for campo in (store.campo_rotulo, 'descricao')})
+        indice_duplicatas = self._indices_duplicatas.get(colecao)
+        if indice_duplicatas is not None:
+            indice_duplicatas.adicionar_lote(
+                indice_duplicatas.hashes(store, inicio=inicio))
+        colunas = {k: v[inicio:] for k, v in store.visao_colunas().items()}
+        if len(colunas['id']):
+            self.diario.registrar(colecao, colunas['id'])
+            self._marcar_meses(colecao, colunas['dia'])
+        self.serie_diaria.adicionar_lote(colecao, colunas['dia'], colunas['valor_centavos'])
+        origem, sinal = ORIGENS_PATRIMONIO[colecao]
+        self.livro_patrimonio.acrescentar(
+            origem, colunas['dia'], colunas['id'], sinal * colunas['valor_centavos'],
+            np.zeros(len(colunas['id'])))
+        if colecao == 'gastos':
+            self.categorizador.aprender_contagens(
+                store.contar_rotulos_por_descricao(inicio))
+
+            # Cada gasto novo é pontuado antes de entrar nas estatísticas
+            escores = self.detector_anomalias.pontuar_lote(
+                colunas['cod_rotulo'], store.rotulos.valores, colunas['valor_centavos'])
+            self.detector_anomalias.adicionar_lote(
+                colunas['cod_rotulo'], store.rotulos.valores, colunas['valor_centavos'])
+            if self._anomalias is not None:
+                anomalos = escores['anomalia'].to_numpy()
+                for id_, z, z_robusto in zip(colunas['id'][anomalos].tolist(),
+                                             escores['z'][anomalos], escores['z_robusto'][anomalos]):
+                    self._anomalias[id_] = (z, z_robusto)
+            self.monitor_orcamentos.adicionar_lote(
+                colunas['dia'], colunas['cod_rotulo'], store.rotulos.valores,
+                colunas['valor_centavos'])
+
+    def importar_gastos(self, gastos_df):
+        """Adiciona vários gastos (colunas categoria, valor, data, descricao) de uma vez"""
+        return self._importar('gastos', gastos_df)
+
+    def importar_rendimentos(self, rendimentos_df):
+        """Adiciona vários rendimentos (colunas fonte, valor, data, descricao) de uma vez"""
+        return self._importar('rendimentos', rendimentos_df)
+
+    def _importar(self, colecao, df):
+        if df.empty:
+            return True
+        campo_rotulo = COLECOES_TRANSACOES[colecao]
+        proximo_id = self.data[colecao].proximo_id
+        agora = datetime.now().isoformat()
+        registros = [{
+            'id': proximo_id + i,
+            campo_rotulo: rotulo,
+            'valor_centavos': centavos,
+            'data': str(data)[:10],
+            'descricao': descricao,
+            'timestamp': agora
+        } for i, (rotulo, centavos, data, descricao) in enumerate(zip(
+            df[campo_rotulo],
+            reais_para_centavos_lote(df['valor']).tolist(),
+            pd.to_datetime(df['data']).dt.strftime('%Y-%m-%d'),
+            df['descricao'].fillna('').astype(str)))]
+
+        inicio = len(self.data[colecao])
+        self.data[colecao].extend(registros)
+        self._indexar_novos(colecao, inicio)
+        return self.save_data()
+
+    def sugerir_categorias(self, descricoes):
+        """Categoria sugerida, confiança e origem para cada descrição"""
+        return self.categorizador.classificar_lote(descricoes)
+
+    def corrigir_categoria_gasto(self, gasto_id, categoria):
+        """Troca a categoria de um gasto e ensina a correção ao modelo"""
+        gasto = self.data['gastos'].obter(gasto_id)
+        if gasto is None or gasto['categoria'] == categoria:
+            return False
+        self.data['gastos'].atualizar_rotulo(gasto_id, categoria)
+        # Desindexar já tira a categoria anterior do modelo: só aprende a nova
+        self._desindexar_transacao('gastos', gasto)
+        self.categorizador.aprender(gasto['descricao'], categoria)
+        gasto['categoria'] = categoria
+        self.indices_busca['gastos'].adicionar(gasto)
+        # Pontuado na nova categoria antes de entrar nas estatísticas dela
+        escore = self.detector_anomalias.pontuar(categoria, gasto['valor_centavos'])
+        self.detector_anomalias.adicionar(categoria, gasto['valor_centavos'])
+        if self._anomalias is not None and escore['anomalia']:
+            self._anomalias[gasto_id] = (escore['z'], escore['z_robusto'])
+        self.monitor_orcamentos.adicionar(
+            categoria, gasto['valor_centavos'], gasto['data'])
+        self.serie_diaria.adicionar('gastos', data_para_dia(gasto['data']), gasto['valor_centavos'])
+        self.livro_patrimonio.acrescentar(
+            'gasto', [data_para_dia(gasto['data'])], [gasto_id], [-gasto['valor_centavos']], [0])
+        if 'gastos' in self._indices_duplicatas:
+            indice = self._indices_duplicatas['gastos']
+            indice.adicionar(indice.hash_registro(gasto, 'categoria'))
+        self.diario.registrar('gastos', [gasto_id])
+        self._marcar_meses('gastos', [data_para_dia(gasto['data'])])
         return self.save_data()
 
-    def update_poupanca(self, operacao, valor, descricao=""):
-        """Atualiza saldo da poupança (deposito ou saque)"""
-        if operacao == 'deposito':
-            self.data['poupanca']['saldo_atual'] += float(valor)
-        elif operacao == 'saque':
-            self.data['poupanca']['saldo_atual'] -= float(valor)
+    def adicionar_regra_categoria(self, palavras, categoria):
+        """Regra fixa: descrições com essas palavras vão para a categoria"""
+        if not self.categorizador.adicionar_regra(palavras, categoria):
+            return False
+        self.diario.registrar_secao('regras')
+        return self.save_data()
+
+    def update_poupanca(self, operacao, valor, descricao="", data=None):
+        """Registra um depósito ou saque na poupança (a data pode ser retroativa)"""
+        poupanca = self.data['poupanca']
+        data = data or datetime.now().date()
 
         historico_item = {
-            'id': len(self.data['poupanca']['historico']) + 1,
+            'id': self.ledger_poupanca.proximo_id,
             'operacao': operacao,
-            'valor': float(valor),
-            'saldo_anterior': self.data['poupanca']['saldo_atual'] - (float(valor) if operacao == 'deposito' else -float(valor)),
-            'saldo_atual': self.data['poupanca']['saldo_atual'],
-            'data': datetime.now().strftime('%Y-%m-%d'),
+            'valor_centavos': reais_para_centavos(valor),
+            'data': data.strftime('%Y-%m-%d'),
             'descricao': descricao,
             'timestamp': datetime.now().isoformat()
         }
-        self.data['poupanca']['historico'].append(historico_item)
+        # O livro entra antes do histórico: se ainda não foi montado, é montado
+        # agora a partir do histórico sem a operação nova
+        self.livro_patrimonio.acrescentar('poupanca', *_fluxo_poupanca([historico_item]))
+        # O ledger acrescenta o item em poupanca['historico']
+        self.ledger_poupanca.adicionar(historico_item)
+        poupanca['saldo_atual_centavos'] = self.ledger_poupanca.total
+        self.diario.registrar('poupanca', [historico_item['id']])
+        return self.save_data()
+
+    def corrigir_operacao_poupanca(self, operacao_id, operacao=None, valor=None, data=None, descricao=None):
+        """Corrige uma movimentação já registrada sem reescrever as posteriores"""
+        campos = _campos_correcao(operacao, valor, data, descricao)
+        self.livro_patrimonio.remover(
+            'poupanca', data_para_dia(self.ledger_poupanca.itens[int(operacao_id)]['data']), operacao_id)
+        item = self.ledger_poupanca.corrigir(operacao_id, **campos)
+        self.livro_patrimonio.acrescentar('poupanca', *_fluxo_poupanca([item]))
+        self.data['poupanca']['saldo_atual_centavos'] = self.ledger_poupanca.total
+        self.diario.registrar('poupanca', [operacao_id])
         return self.save_data()
 
-    def update_taxa_cdi(self, nova_taxa):
-        """Atualiza a taxa CDI"""
-        self.data['poupanca']['taxa_cdi'] = float(nova_taxa)
+    def delete_operacao_poupanca(self, operacao_id):
+        """Remove uma movimentação da poupança (recusa se algum dia ficaria com saldo negativo)"""
+        if self.get_saldo_minimo_sem_operacao(operacao_id) < 0:
+            print("Erro ao excluir movimentação: o saldo da poupança ficaria negativo")
+            return False
+        item = self.ledger_poupanca.remover(operacao_id)
+        self.livro_patrimonio.remover('poupanca', data_para_dia(item['data']), operacao_id)
+        self.data['poupanca']['saldo_atual_centavos'] = self.ledger_poupanca.total
+        self.diario.registrar('poupanca', [operacao_id])
+        return self.save_data()
+
+    def update_taxa_cdi(self, nova_taxa, data=None):
+        """Atualiza a taxa CDI, vigente a partir da data informada (padrão: hoje)"""
+        poupanca = self.data['poupanca']
+        data_str = (data or datetime.now().date()).strftime('%Y-%m-%d')
+
+        taxas = [t for t in poupanca['historico_taxas']
+                 if t['data'] != data_str]
+        taxas.append({'data': data_str, 'taxa': float(nova_taxa)})
+        taxas.sort(key=lambda t: t['data'])
+        poupanca['historico_taxas'] = taxas
+        # A taxa atual é a vigente mais recente
+        poupanca['taxa_cdi'] = taxas[-1]['taxa']
+
+        self._motor_cdi = None
+        self._versao_taxas += 1
+        self.diario.registrar_secao('taxas')
         return self.save_data()
 
+    def get_motor_cdi(self):
+        """Motor de rendimento CDI da tabela de taxas atual (reaproveitado entre reruns)"""
+        if self._motor_cdi is None:
+            self._motor_cdi = MotorCDI(
+                self.data['poupanca']['historico_taxas'])
+        return self._motor_cdi
+
+    def get_poupanca_rendimento_df(self):
+        """Saldo diário da poupança, nominal e com rendimento CDI"""
+        motor = self.get_motor_cdi()
+        chave = (self.ledger_poupanca.versao, self._versao_taxas,
+                 datetime.now().date())
+        if self._cache_rendimento[0] != chave:
+            self._cache_rendimento = (chave, motor.serie_saldo(
+                self.get_poupanca_historico_df()))
+        return self._cache_rendimento[1]
+
+    def em_cache_da_versao(self, nome, parametros, calcular):
+        """calcular() reaproveitado enquanto os dados e os parâmetros não mudam
+
+        Um resultado por nome, preso a este DataManager: sessões e usuários
+        diferentes não disputam nem apagam o cache uns dos outros.
+        """
+        chave = (self.versao, parametros)
+        entrada = self._caches_versao.get(nome)
+        if entrada is None or entrada[0] != chave:
+            entrada = (chave, calcular())
+            self._caches_versao[nome] = entrada
+        return entrada[1]
+
     def add_objetivo(self, nome, valor_meta, prazo_meses, descricao=""):
         """Adiciona um novo objetivo de poupança"""
         objetivo = {
@@ -108,44 +847,399 @@ class DataManager:
             'ativo': True
         }
         self.data['objetivos'].append(objetivo)
+        self.diario.registrar_secao('objetivos')
         return self.save_data()
 
+    def definir_orcamento(self, categoria, limite):
+        """Define o limite mensal (R$) de uma categoria; limite zero remove o orçamento"""
+        limite_centavos = reais_para_centavos(limite)
+        if limite_centavos > 0:
+            self.data['orcamentos'][categoria] = limite_centavos
+        elif self.data['orcamentos'].pop(categoria, None) is None:
+            return False
+        self.diario.registrar_secao('orcamentos')
+        return self.save_data()
+
+    def _montar_monitor_orcamentos(self, data, mes):
+        """Reconta o gasto do mês por categoria a partir das colunas de gastos
+
+        Com as transações ainda não lidas, usa os totais mensais do cabeçalho.
+        """
+        if getattr(data, 'pendente', False):
+            resumo = self._totais.get('gastos', {}).get(str(np.datetime64(mes, 'M')), {})
+            self.monitor_orcamentos = MonitorOrcamentos.dos_totais(
+                data['orcamentos'], mes, resumo.get('por_rotulo', {}))
+            return
+        colunas = data['gastos'].visao_colunas()
+        self.monitor_orcamentos = MonitorOrcamentos.do_lote(
+            data['orcamentos'], mes, colunas['dia'], colunas['cod_rotulo'],
+            data['gastos'].rotulos.valores, colunas['valor_centavos'])
+
+    def verificar_orcamento(self, categoria, valor, data):
+        """Saldo (centavos) do orçamento da categoria depois de um gasto ainda não salvo — O(1)
+
+        None quando a categoria não tem orçamento ou o gasto é de outro mês.
+        """
+        restante = self.monitor_orcamentos.restante(categoria)
+        if restante is None or np.datetime64(data, 'M') != self.monitor_orcamentos.mes:
+            return None
+        return restante - reais_para_centavos(valor)
+
+    def get_status_orcamentos(self, hoje=None):
+        """Utilização, saldo, projeção e alerta de cada orçamento no mês corrente"""
+        hoje = hoje or datetime.now().date()
+        mes = np.datetime64(hoje, 'M')
+        if mes != self.monitor_orcamentos.mes:
+            # Virada do mês: a única recontagem completa
+            self._montar_monitor_orcamentos(self.data, mes)
+        return self.monitor_orcamentos.status(hoje)
+
     def get_rendimentos_df(self):
         """Retorna DataFrame dos rendimentos"""
         if not self.data['rendimentos']:
             return pd.DataFrame()
-        return pd.DataFrame(self.data['rendimentos'])
+        return self.data['rendimentos'].to_dataframe()
 
     def get_gastos_df(self):
         """Retorna DataFrame dos gastos"""
         if not self.data['gastos']:
             return pd.DataFrame()
-        return pd.DataFrame(self.data['gastos'])
+        return self.data['gastos'].to_dataframe()
 
-    def get_poupanca_historico_df(self):
-        """Retorna DataFrame do histórico da poupança"""
-        if not self.data['poupanca']['historico']:
+    def get_totais_mensais(self, colecao):
+        """{'AAAA-MM': {registros, total_centavos, por_rotulo, max_id}} de uma coleção
+
+        Enquanto as transações não são lidas, vêm do cabeçalho do arquivo (ou
+        do manifesto); depois, só os meses alterados desde a última gravação
+        são recontados.
+        """
+        if self.transacoes_carregadas and self._versao_totais != self.versao:
+            self._atualizar_totais()
+            self._versao_totais = self.versao
+        return self._totais.get(colecao, {})
+
+    def _atualizar_totais(self):
+        for colecao in COLECOES_TRANSACOES:
+            loja = self.data[colecao]
+            if self._meses_alterados is None:
+                por_mes = posicoes_por_mes(loja)
+                totais, meses = {}, por_mes
+            else:
+                meses = self._meses_alterados[colecao]
+                por_mes = posicoes_por_mes(loja, meses)
+                totais = dict(self._totais.get(colecao, {}))
+            for mes in meses:
+                totais.pop(mes, None)
+                if mes in por_mes:
+                    totais[mes] = resumo_particao(loja, por_mes[mes])
+            self._totais[colecao] = dict(sorted(totais.items()))
+
+    def get_serie_diaria_df(self):
+        """Rendimentos e gastos por dia (até hoje) com os acumulados de cada um"""
+        return self.serie_diaria.to_dataframe(datetime.now().date())
+
+    def get_patrimonio_df(self):
+        """Livro único por data com saldos correntes de caixa, poupança e patrimônio
+
+        O caixa parte de zero: é a soma de rendimentos e saques menos gastos
+        e depósitos até cada lançamento.
+        """
+        colunas = self.livro_patrimonio.colunas()
+        n = len(colunas['id'])
+        if not n:
             return pd.DataFrame()
 
-        df = pd.DataFrame(self.data['poupanca']['historico'])
+        tipo = np.empty(n, dtype=object)
+        rotulo = np.empty(n, dtype=object)
+        descricao = np.empty(n, dtype=object)
+        for colecao, (origem, _) in ORIGENS_PATRIMONIO.items():
+            linhas = np.flatnonzero(colunas['origem'] == ORIGENS.index(origem))
+            store = self.data[colecao]
+            base = store.visao_colunas()
+            # Ids únicos (migração 4), mas não necessariamente em ordem: busca binária sobre a ordenação
+            ordem = np.argsort(base['id'], kind='stable')
+            posicao = ordem[np.searchsorted(base['id'], colunas['id'][linhas], sorter=ordem)]
+            tipo[linhas] = origem
+            rotulo[linhas] = np.array(store.rotulos.valores, dtype=object)[base['cod_rotulo'][posicao]]
+            descricao[linhas] = np.array(store.descricoes.valores, dtype=object)[
+                base['cod_descricao'][posicao]]
+
+        linhas = np.flatnonzero(colunas['origem'] == ORIGENS.index('poupanca'))
+        itens = self.ledger_poupanca.itens
+        tipo[linhas] = [itens[i]['operacao'] for i in colunas['id'][linhas].tolist()]
+        rotulo[linhas] = '🏦 Poupança'
+        descricao[linhas] = [itens[i].get('descricao', '') for i in colunas['id'][linhas].tolist()]
+
+        saldo_caixa = colunas['saldo_caixa']
+        saldo_poupanca = colunas['saldo_poupanca']
+        return pd.DataFrame({
+            'data': colunas['dia'].astype('datetime64[D]').astype('datetime64[s]'),
+            'tipo': tipo,
+            'id': colunas['id'],
+            'rotulo': rotulo,
+            'descricao': descricao,
+            'valor_centavos': np.abs(colunas['caixa']),
+            'caixa_centavos': saldo_caixa,
+            'poupanca_centavos': saldo_poupanca,
+            'patrimonio_centavos': saldo_caixa + saldo_poupanca
+        })
+
+    def get_poupanca_historico_df(self):
+        """Retorna DataFrame do histórico da poupança com o saldo após cada operação"""
+        return self.ledger_poupanca.serie_saldos()
+
+    def get_saldo_poupanca_centavos(self, data=None):
+        """Retorna o saldo da poupança em centavos (atual ou ao final de uma data)"""
+        if data is None:
+            return self.data['poupanca']['saldo_atual_centavos']
+        return self.ledger_poupanca.saldo_em(data)
 
-        # Garantir que a coluna 'data' seja datetime
-        if 'data' in df.columns:
-            df['data'] = pd.to_datetime(df['data'])
+    def get_saldo_sacavel_centavos(self, data):
+        """Maior saque possível na data sem deixar o saldo negativo em nenhum dia dali em diante"""
+        return self.ledger_poupanca.saldo_minimo_desde(data)
 
-        # Ordenar por data
-        df = df.sort_values('data') if 'data' in df.columns else df
+    def get_saldo_minimo_apos_correcao(self, operacao_id, operacao=None, valor=None, data=None):
+        """Menor saldo diário que a poupança teria com a correção (negativo: correção inválida)"""
+        return self.ledger_poupanca.saldo_minimo_corrigido(
+            operacao_id, **_campos_correcao(operacao, valor, data))
 
-        return df
+    def get_saldo_minimo_sem_operacao(self, operacao_id):
+        """Menor saldo diário que a poupança teria sem a movimentação (negativo: exclusão inválida)"""
+        return self.ledger_poupanca.saldo_minimo_sem(operacao_id)
+
+    def verificar_saldo_poupanca(self):
+        """Confere se o saldo recalculado pelo histórico bate com o saldo salvo"""
+        saldo_salvo = self.data['poupanca']['saldo_atual_centavos']
+        saldo_recalculado = self.ledger_poupanca.total
+
+        return {
+            'consistente': saldo_recalculado == saldo_salvo,
+            'saldo_salvo_centavos': saldo_salvo,
+            'saldo_recalculado_centavos': saldo_recalculado
+        }
 
     def delete_rendimento(self, rendimento_id):
         """Remove um rendimento"""
-        self.data['rendimentos'] = [
-            r for r in self.data['rendimentos'] if r['id'] != rendimento_id]
+        self._remover_transacao('rendimentos', rendimento_id)
         return self.save_data()
 
     def delete_gasto(self, gasto_id):
         """Remove um gasto"""
-        self.data['gastos'] = [
-            g for g in self.data['gastos'] if g['id'] != gasto_id]
+        self._remover_transacao('gastos', gasto_id)
         return self.save_data()
+
+    def _remover_transacao(self, colecao, transacao_id):
+        """Remove uma transação da coleção e dos índices"""
+        registro = self.data[colecao].obter(transacao_id)
+        if registro is None:
+            return False
+        self.data[colecao].remover(transacao_id)
+        self._desindexar_transacao(colecao, registro)
+        self.diario.registrar(colecao, [transacao_id])
+        self._marcar_meses(colecao, [data_para_dia(registro['data'])])
+        return True
+
+    def _marcar_meses(self, colecao, dias):
+        """Meses com transações alteradas: só eles são regravados (partições) e recontados (totais)"""
+        if self._meses_alterados is not None:
+            self._meses_alterados[colecao].update(
+                texto_mes(mes) for mes in np.unique(meses_dos_dias(dias)).tolist())
+
+    def _desindexar_transacao(self, colecao, registro):
+        """Retira um registro dos índices de busca e de duplicatas (e do modelo de categorias)"""
+        self.indices_busca[colecao].remover(registro)
+        self.serie_diaria.adicionar(colecao, data_para_dia(registro['data']), -registro['valor_centavos'])
+        self.livro_patrimonio.remover(
+            ORIGENS_PATRIMONIO[colecao][0], data_para_dia(registro['data']), registro['id'])
+        indice = self._indices_duplicatas.get(colecao)
+        if indice is not None:
+            indice.remover(indice.hash_registro(
+                registro, COLECOES_TRANSACOES[colecao]))
+        if colecao == 'gastos':
+            self.categorizador.esquecer(registro['descricao'], registro['categoria'])
+            self.detector_anomalias.remover(
+                registro['categoria'], registro['valor_centavos'])
+            if self._anomalias is not None:
+                self._anomalias.pop(registro['id'], None)
+            self.monitor_orcamentos.remover(
+                registro['categoria'], registro['valor_centavos'], registro['data'])
+
+    def pontuar_gasto(self, categoria, valor):
+        """Escores de anomalia de um gasto ainda não salvo — O(1)"""
+        return self.detector_anomalias.pontuar(categoria, reais_para_centavos(valor))
+
+    def get_anomalias_df(self, limite=20):
+        """Gastos mais recentes sinalizados como incomuns para a categoria"""
+        gastos_df = self.get_gastos_df()
+        if gastos_df.empty:
+            return pd.DataFrame()
+        if self._anomalias is None:
+            self.reavaliar_anomalias()
+
+        ids = np.fromiter(self._anomalias, dtype=np.int64, count=len(self._anomalias))
+        anomalias_df = gastos_df[gastos_df['id'].isin(ids)]
+        escores = np.array([self._anomalias[i] for i in anomalias_df['id'].tolist()]).reshape(-1, 2)
+        return anomalias_df.assign(z=escores[:, 0], z_robusto=escores[:, 1]).sort_values(
+            ['data', 'id'], ascending=False).head(limite)
+
+    def reavaliar_anomalias(self):
+        """Reavalia todo o histórico em lote (vetorizado) e substitui as anomalias salvas"""
+        gastos_df = pontuar_historico(self.get_gastos_df())
+        if gastos_df.empty:
+            self._anomalias = {}
+            return gastos_df
+        anomalos = gastos_df[gastos_df['anomalia']]
+        self._anomalias = dict(zip(anomalos['id'].tolist(),
+                                   zip(anomalos['z'].tolist(), anomalos['z_robusto'].tolist())))
+        return gastos_df
+
+    def _indice_duplicatas(self, colecao):
+        if colecao not in self._indices_duplicatas:
+            self._indices_duplicatas[colecao] = IndiceDuplicatas(
+                self.data[colecao])
+        return self._indices_duplicatas[colecao]
+
+    def detectar_duplicatas(self, colecao, registros):
+        """Marca registros (dicts) já presentes na coleção
+
+        Retorna um DataFrame com 'duplicado' (mesmo conteúdo normalizado) e
+        'similar_a' (id de um quase-duplicado: mesmo valor, data próxima e
+        descrição parecida), na ordem dos registros.
+        """
+        recebidos = registros if isinstance(registros, TransactionStore) else \
+            TransactionStore(COLECOES_TRANSACOES[colecao], registros)
+        indice = self._indice_duplicatas(colecao)
+        duplicado = indice.duplicados(indice.hashes(recebidos, cache=False))
+        similares = pares_similares(self.data[colecao], recebidos, ~duplicado)
+        return pd.DataFrame({
+            'duplicado': duplicado,
+            'similar_a': pd.array([similares.get(i) for i in range(len(recebidos))],
+                                  dtype='Int64')
+        })
+
+    def verificar_duplicata(self, colecao, rotulo, valor, data, descricao=""):
+        """'exata', 'similar' ou None para uma transação antes de adicioná-la"""
+        registro = {
+            'id': 0,
+            COLECOES_TRANSACOES[colecao]: rotulo,
+            'valor_centavos': reais_para_centavos(valor),
+            'data': data.strftime('%Y-%m-%d'),
+            'descricao': descricao
+        }
+        indice = self._indice_duplicatas(colecao)
+        if indice.contagem.get(indice.hash_registro(registro, COLECOES_TRANSACOES[colecao])):
+            return 'exata'
+        if similar_ao_registro(self.data[colecao], registro) is not None:
+            return 'similar'
+        return None
+
+    def mesclar_dados(self, dados, ignorar_similares=False):
+        """Restaura um backup adicionando só os registros que ainda não existem
+
+        Transações são comparadas por hash de conteúdo (e, opcionalmente,
+        por quase-duplicados); os registros novos recebem ids novos.
+        Retorna quantos registros foram adicionados e ignorados por coleção.
+        """
+        migrar(dados)
+        relatorio = {}
+        for colecao, campo_rotulo in COLECOES_TRANSACOES.items():
+            recebidos = TransactionStore(campo_rotulo, dados.get(colecao, []))
+            marcacao = self.detectar_duplicatas(colecao, recebidos)
+            ignorar = marcacao['duplicado'].to_numpy()
+            if ignorar_similares:
+                ignorar = ignorar | marcacao['similar_a'].notna().to_numpy()
+
+            inicio = self.data[colecao].anexar_de(
+                recebidos, np.flatnonzero(~ignorar))
+            self._indexar_novos(colecao, inicio)
+            relatorio[colecao] = {
+                'adicionados': int((~ignorar).sum()),
+                'duplicados': int(marcacao['duplicado'].sum()),
+                'similares': int(marcacao['similar_a'].notna().sum())
+            }
+
+        relatorio['poupanca'] = self._mesclar_poupanca(dados.get('poupanca', {}))
+        relatorio['objetivos'] = self._mesclar_objetivos(dados.get('objetivos', []))
+        # Orçamentos do backup só entram para categorias sem limite definido
+        novos = {c: int(v) for c, v in dados.get('orcamentos', {}).items()
+                 if c not in self.data['orcamentos']}
+        self.data['orcamentos'].update(novos)
+        if novos:
+            self.diario.registrar_secao('orcamentos')
+        relatorio['orcamentos'] = {'adicionados': len(novos),
+                                   'duplicados': len(dados.get('orcamentos', {})) - len(novos)}
+        self.save_data()
+        return relatorio
+
+    def _mesclar_poupanca(self, poupanca):
+        """Adiciona movimentações e taxas do backup que ainda não existem"""
+        poupanca = copy.deepcopy(poupanca)
+        poupanca.setdefault('historico', [])
+
+        def chave(item):
+            return (item['data'][:10], item['operacao'], int(item['valor_centavos']),
+                    texto_normalizado(item.get('descricao')))
+
+        existentes = Counter(chave(item)
+                             for item in self.data['poupanca']['historico'])
+        candidatos = []
+        for item in poupanca['historico']:
+            k = chave(item)
+            if existentes[k] > 0:
+                existentes[k] -= 1
+                continue
+            candidatos.append(item)
+
+        # Em ordem de data (depósitos antes dos saques do mesmo dia): um saque
+        # que deixaria algum dia com saldo negativo não entra
+        candidatos.sort(key=lambda item: (item['data'][:10], item['operacao'] != 'deposito'))
+        novos, recusados = [], 0
+        for item in candidatos:
+            if item['operacao'] == 'saque' and int(item['valor_centavos']) > \
+                    self.ledger_poupanca.saldo_minimo_desde(item['data']):
+                recusados += 1
+                continue
+            item['id'] = self.ledger_poupanca.proximo_id
+            self.ledger_poupanca.adicionar(item)
+            novos.append(item)
+        adicionados = len(novos)
+        self.livro_patrimonio.acrescentar('poupanca', *_fluxo_poupanca(novos))
+        if novos:
+            self.diario.registrar('poupanca', [item['id'] for item in novos])
+        self.data['poupanca']['saldo_atual_centavos'] = self.ledger_poupanca.total
+
+        datas_taxas = {t['data'] for t in self.data['poupanca']['historico_taxas']}
+        novas_taxas = [t for t in poupanca.get('historico_taxas', [])
+                       if t['data'] not in datas_taxas]
+        if novas_taxas:
+            taxas = sorted(self.data['poupanca']['historico_taxas'] + novas_taxas,
+                           key=lambda t: t['data'])
+            self.data['poupanca']['historico_taxas'] = taxas
+            self.data['poupanca']['taxa_cdi'] = taxas[-1]['taxa']
+            self._motor_cdi = None
+            self._versao_taxas += 1
+            self.diario.registrar_secao('taxas')
+
+        return {'adicionados': adicionados,
+                'duplicados': len(poupanca['historico']) - len(candidatos),
+                'recusados': recusados}
+
+    def _mesclar_objetivos(self, objetivos):
+        """Adiciona objetivos do backup com nomes ainda não cadastrados"""
+        nomes = {texto_normalizado(o['nome']) for o in self.data['objetivos']}
+        adicionados = 0
+        for objetivo in objetivos:
+            if texto_normalizado(objetivo['nome']) in nomes:
+                continue
+            objetivo = dict(objetivo, id=len(self.data['objetivos']) + 1)
+            self.data['objetivos'].append(objetivo)
+            nomes.add(texto_normalizado(objetivo['nome']))
+            adicionados += 1
+        if adicionados:
+            self.diario.registrar_secao('objetivos')
+        return {'adicionados': adicionados,
+                'duplicados': len(objetivos) - adicionados}
+
+    def buscar(self, colecao, consulta):
+        """Ids das transações cuja descrição/rótulo contém todos os termos (prefixos)"""
+        return self.indices_busca[colecao].buscar(consulta)
@@ -0,0 +1,186 @@
+import hashlib
+from collections import Counter
+
+import numpy as np
+
+from search_index import tokenizar
+
+# Quase-duplicados: mesmo valor com datas a até JANELA_DIAS de distância
+JANELA_DIAS = 3
+
+# Fração mínima de palavras em comum (descrição + rótulo) para quase-duplicados
+SIMILARIDADE_MINIMA = 0.5
+
+_PRIMO = np.uint64(0x100000001B3)
+
+
+def texto_normalizado(texto):
+    """Texto sem acentos, caixa, pontuação e espaços extras"""
+    return ' '.join(tokenizar(texto))
+
+
+def hash_texto(texto):
+    """Hash de 64 bits do texto normalizado"""
+    digest = hashlib.blake2b(texto_normalizado(
+        texto).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def _misturar(*colunas):
+    """Combina colunas inteiras em um hash de 64 bits por linha (estilo FNV)"""
+    h = np.full(len(colunas[0]), 0xCBF29CE484222325, dtype=np.uint64)
+    for coluna in colunas:
+        h = (h ^ np.asarray(coluna).astype(np.uint64)) * _PRIMO
+    return h
+
+
+class IndiceDuplicatas:
+    """Hashes de conteúdo (data, valor, descrição e rótulo normalizados) de uma coleção
+
+    Os hashes ficam em um multiconjunto (Counter), então a checagem de
+    um registro é O(1) e uma carga inteira é checada em lote. O hash de
+    cada texto distinto é calculado uma única vez por vocabulário.
+    """
+
+    def __init__(self, store):
+        self._hashes_rotulos = []
+        self._hashes_descricoes = []
+        self.contagem = Counter(self.hashes(store).tolist())
+
+    def _hashes_vocabulario(self, cache, valores):
+        """Estende o cache com os textos novos do vocabulário"""
+        cache.extend(hash_texto(v) for v in valores[len(cache):])
+        return np.array(cache, dtype=np.uint64)
+
+    def hashes(self, store, cache=True, inicio=0):
+        """Hash de conteúdo de cada linha (a partir de inicio) do TransactionStore"""
+        colunas = {k: v[inicio:] for k, v in store.visao_colunas().items()}
+        if not len(colunas['id']):
+            return np.zeros(0, dtype=np.uint64)
+        if cache:
+            rotulos = self._hashes_vocabulario(
+                self._hashes_rotulos, store.rotulos.valores)
+            descricoes = self._hashes_vocabulario(
+                self._hashes_descricoes, store.descricoes.valores)
+        else:
+            rotulos = self._hashes_vocabulario([], store.rotulos.valores)
+            descricoes = self._hashes_vocabulario([], store.descricoes.valores)
+        return _misturar(colunas['dia'], colunas['valor_centavos'],
+                         rotulos[colunas['cod_rotulo']],
+                         descricoes[colunas['cod_descricao']])
+
+    def hash_registro(self, registro, campo_rotulo):
+        """Hash de conteúdo de um dict (mesmo valor que hashes() daria)"""
+        dia = np.datetime64(str(registro['data'])[:10], 'D').astype(np.int64)
+        return int(_misturar([dia], [int(registro['valor_centavos'])],
+                             [hash_texto(registro.get(campo_rotulo))],
+                             [hash_texto(registro.get('descricao'))])[0])
+
+    def adicionar(self, h):
+        self.contagem[h] += 1
+
+    def adicionar_lote(self, hashes):
+        self.contagem.update(hashes.tolist())
+
+    def remover(self, h):
+        if self.contagem[h] <= 1:
+            self.contagem.pop(h, None)
+        else:
+            self.contagem[h] -= 1
+
+    def duplicados(self, hashes):
+        """Marca os hashes que já existem, respeitando repetições legítimas
+
+        Se a coleção tem uma ocorrência de um conteúdo e a carga traz duas,
+        só a primeira da carga é duplicada — mesclar um backup nele mesmo
+        não muda nada, e dois cafés iguais no mesmo dia não se perdem.
+        """
+        if not len(hashes):
+            return np.zeros(0, dtype=bool)
+        ordem = np.argsort(hashes, kind='stable')
+        ordenados = hashes[ordem]
+        novo_grupo = np.r_[True, ordenados[1:] != ordenados[:-1]]
+        inicio_grupo = np.maximum.accumulate(
+            np.where(novo_grupo, np.arange(len(ordenados)), 0))
+        ocorrencia = np.arange(len(ordenados)) - inicio_grupo
+
+        unicos = ordenados[novo_grupo]
+        existentes = np.fromiter((self.contagem.get(h, 0) for h in unicos.tolist()),
+                                 dtype=np.int64, count=len(unicos))
+        existentes_por_linha = existentes[np.cumsum(novo_grupo) - 1]
+
+        duplicado = np.empty(len(hashes), dtype=bool)
+        duplicado[ordem] = ocorrencia < existentes_por_linha
+        return duplicado
+
+
+def pares_similares(existente, recebidos, mascara, janela=JANELA_DIAS, limiar=SIMILARIDADE_MINIMA):
+    """Quase-duplicados entre linhas recebidas (mascara) e a coleção existente
+
+    Só compara linhas com o mesmo valor e datas a até `janela` dias: as
+    chaves (valor, dia) da coleção são ordenadas uma vez e cada linha
+    recebida acha seus vizinhos por busca binária, sem comparar todos
+    contra todos. Retorna {posição recebida: id existente}.
+    """
+    base = existente.visao_colunas()
+    novos = recebidos.visao_colunas()
+    posicoes = np.flatnonzero(mascara)
+    if not len(base['id']) or not len(posicoes):
+        return {}
+
+    deslocamento = np.int64(1 << 20)
+    chaves = base['valor_centavos'] * deslocamento + base['dia']
+    ordem = np.argsort(chaves, kind='stable')
+    chaves = chaves[ordem]
+
+    alvo = novos['valor_centavos'][posicoes] * \
+        deslocamento + novos['dia'][posicoes]
+    inicio = np.searchsorted(chaves, alvo - janela, side='left')
+    fim = np.searchsorted(chaves, alvo + janela, side='right')
+    com_vizinhos = fim > inicio
+
+    # Palavras de cada (rótulo, descrição) distinto, calculadas uma vez
+    palavras_base, palavras_novos = {}, {}
+
+    def palavras(cache, store, cod_rotulo, cod_descricao):
+        chave = (cod_rotulo, cod_descricao)
+        if chave not in cache:
+            cache[chave] = frozenset(tokenizar(store.rotulos.valores[cod_rotulo])) | \
+                frozenset(tokenizar(store.descricoes.valores[cod_descricao]))
+        return cache[chave]
+
+    pares = {}
+    for pos, i, j in zip(posicoes[com_vizinhos].tolist(), inicio[com_vizinhos].tolist(),
+                         fim[com_vizinhos].tolist()):
+        a = palavras(palavras_novos, recebidos, int(novos['cod_rotulo'][pos]),
+                     int(novos['cod_descricao'][pos]))
+        for k in ordem[i:j].tolist():
+            b = palavras(palavras_base, existente, int(base['cod_rotulo'][k]),
+                         int(base['cod_descricao'][k]))
+            if _jaccard(a, b) >= limiar:
+                pares[pos] = int(base['id'][k])
+                break
+    return pares
+
+
+def similar_ao_registro(store, registro, janela=JANELA_DIAS, limiar=SIMILARIDADE_MINIMA):
+    """Id de um quase-duplicado de um único registro (ou None) — uma máscara NumPy, O(n)"""
+    colunas = store.visao_colunas()
+    dia = np.datetime64(str(registro['data'])[:10], 'D').astype(np.int64)
+    candidatos = np.flatnonzero(
+        (colunas['valor_centavos'] == int(registro['valor_centavos'])) &
+        (np.abs(colunas['dia'] - dia) <= janela))
+    a = frozenset(tokenizar(registro.get(store.campo_rotulo))) | \
+        frozenset(tokenizar(registro.get('descricao')))
+    for k in candidatos.tolist():
+        b = frozenset(tokenizar(store.rotulos.valores[colunas['cod_rotulo'][k]])) | \
+            frozenset(tokenizar(store.descricoes.valores[colunas['cod_descricao'][k]]))
+        if _jaccard(a, b) >= limiar:
+            return int(colunas['id'][k])
+    return None
+
+
+def _jaccard(a, b):
+    """Fração de palavras em comum (dois textos vazios são iguais)"""
+    uniao = len(a | b)
+    return len(a & b) / uniao if uniao else 1.0
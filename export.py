@@ -0,0 +1,110 @@
+import gzip
+import io
+import lzma
+import tempfile
+import zipfile
+
+import pandas as pd
+
+from money import centavos_para_reais
+
+# Linhas convertidas para CSV de cada vez
+TAMANHO_BLOCO = 50000
+
+# Acima disso o arquivo exportado vai da memória para um temporário em disco
+LIMITE_MEMORIA_EXPORTACAO = 16 * 1024 * 1024
+
+# Nível 6: ~4x mais rápido que o 9 do gzip.open, arquivo só ~1% maior
+NIVEL_GZIP = 6
+
+# Compressão: extensão, MIME e método equivalente dentro de um ZIP
+COMPRESSOES = {
+    'nenhuma': ('', None, zipfile.ZIP_STORED),
+    'gzip': ('.gz', 'application/gzip', zipfile.ZIP_DEFLATED),
+    'xz': ('.xz', 'application/x-xz', zipfile.ZIP_LZMA)
+}
+
+
+def blocos_csv(df, inicio=None, fim=None, colunas=None, tamanho_bloco=TAMANHO_BLOCO):
+    """CSV de um DataFrame em pedaços de texto, filtrado por período e colunas
+
+    Cada bloco de linhas é filtrado, ganha o valor em reais das colunas em
+    centavos e vira texto; o CSV inteiro nunca fica em memória. O
+    cabeçalho sai mesmo sem nenhuma linha no período.
+    """
+    colunas = list(colunas or df.columns)
+    for coluna in [c for c in colunas if c.endswith('_centavos')]:
+        if coluna.removesuffix('_centavos') not in colunas:
+            colunas.append(coluna.removesuffix('_centavos'))
+    origem = [c for c in colunas if c in df.columns]
+
+    yield ','.join(colunas) + '\n'
+    for i in range(0, len(df), tamanho_bloco):
+        bloco = df.iloc[i:i + tamanho_bloco]
+        if (inicio is not None or fim is not None) and 'data' in bloco:
+            datas = pd.to_datetime(bloco['data'])
+            manter = pd.Series(True, index=bloco.index)
+            if inicio is not None:
+                manter &= datas >= pd.Timestamp(inicio)
+            if fim is not None:
+                manter &= datas < pd.Timestamp(fim) + pd.Timedelta(days=1)
+            bloco = bloco[manter]
+        if bloco.empty:
+            continue
+        bloco = bloco[origem].copy()
+        for coluna in colunas:
+            if coluna not in bloco:
+                bloco[coluna] = centavos_para_reais(bloco[f'{coluna}_centavos'])
+        yield bloco[colunas].to_csv(index=False, header=False)
+
+
+def gravar_comprimido(escrever, compressao='nenhuma'):
+    """Arquivo temporário com o que escrever(f) gravar em f (texto), comprimido em streaming
+
+    gzip e xz comprimem à medida que os blocos chegam; o resultado fica em
+    memória até LIMITE_MEMORIA_EXPORTACAO e depois em disco. Retorna o
+    arquivo (binário) posicionado no início.
+    """
+    arquivo = tempfile.SpooledTemporaryFile(max_size=LIMITE_MEMORIA_EXPORTACAO)
+    if compressao == 'gzip':
+        camada = gzip.GzipFile(fileobj=arquivo, mode='wb', compresslevel=NIVEL_GZIP)
+    elif compressao == 'xz':
+        camada = lzma.LZMAFile(arquivo, 'wb')
+    else:
+        camada = arquivo
+
+    texto = io.TextIOWrapper(camada, encoding='utf-8', newline='')
+    escrever(texto)
+    texto.flush()
+    # Solta o wrapper sem fechar o arquivo de baixo
+    texto.detach()
+    if camada is not arquivo:
+        camada.close()
+    arquivo.seek(0)
+    return arquivo
+
+
+def exportar_csv_comprimido(df, compressao='nenhuma', **filtros):
+    """CSV (opcionalmente .gz/.xz) de um DataFrame, gerado em blocos"""
+    return gravar_comprimido(lambda f: f.writelines(blocos_csv(df, **filtros)), compressao)
+
+
+def exportar_zip(tabelas, compressao='nenhuma', **filtros):
+    """Um ZIP com um CSV por tabela ({nome: DataFrame}), cada um escrito em blocos"""
+    metodo = COMPRESSOES[compressao][2]
+    arquivo = tempfile.SpooledTemporaryFile(max_size=LIMITE_MEMORIA_EXPORTACAO)
+    with zipfile.ZipFile(arquivo, 'w', compression=metodo) as pacote:
+        for nome, df in tabelas.items():
+            with pacote.open(f'{nome}.csv', 'w', force_zip64=True) as destino:
+                for bloco in blocos_csv(df, **filtros):
+                    destino.write(bloco.encode('utf-8'))
+    arquivo.seek(0)
+    return arquivo
+
+
+def nome_exportacao(nome, compressao, tudo=False):
+    """Nome e MIME do arquivo baixado"""
+    if tudo:
+        return f'{nome}.zip', 'application/zip'
+    extensao, mime, _ = COMPRESSOES[compressao]
+    return f'{nome}.csv{extensao}', mime or 'text/csv'
@@ -0,0 +1,176 @@
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_manager import COLECOES_TRANSACOES
+from migrations import migrar
+from money import centavos_para_reais
+from poupanca_ledger import SINAL_OPERACAO
+from transaction_store import TransactionStore
+
+# Abaixo disso abrir processos custa mais do que agregar na thread atual
+MINIMO_ARQUIVOS_PARALELO = 8
+
+
+def agregar_arquivo(caminho):
+    """Agregado parcial de um arquivo de dados (executado no processo trabalhador)
+
+    Carrega só as colunas das transações, sem os índices do DataManager,
+    e devolve totais por (mês, fonte/categoria), saldo da poupança e
+    objetivos — algumas centenas de números por arquivo, baratos de
+    enviar de volta ao processo principal.
+    """
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+        # Só em memória: a consolidação não regrava os arquivos
+        migrar(dados)
+
+        parcial = {'arquivo': caminho, 'erro': None, 'transacoes': 0}
+        for colecao, campo_rotulo in COLECOES_TRANSACOES.items():
+            loja = TransactionStore(campo_rotulo, dados.get(colecao, []))
+            colunas = loja.visao_colunas()
+            parcial[colecao] = _totais_mes_rotulo(colunas, loja.rotulos.valores)
+            parcial['transacoes'] += len(colunas['id'])
+
+        poupanca = dados.get('poupanca') or {'historico': []}
+        parcial['poupanca_centavos'] = sum(
+            SINAL_OPERACAO.get(item['operacao'], 0) * int(item['valor_centavos'])
+            for item in poupanca['historico'])
+        parcial['objetivos'] = [
+            (objetivo['nome'], float(objetivo['valor_meta']), int(objetivo['prazo_meses']))
+            for objetivo in dados.get('objetivos', []) if objetivo.get('ativo', True)]
+        return parcial
+    except Exception as e:
+        return {'arquivo': caminho, 'erro': str(e)}
+
+
+def _totais_mes_rotulo(colunas, rotulos):
+    """{(AAAA-MM, rótulo): centavos} com um único bincount"""
+    if not len(colunas['dia']):
+        return {}
+    meses = colunas['dia'].astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    primeiro = int(meses.min())
+    chaves = (meses - primeiro) * len(rotulos) + colunas['cod_rotulo']
+    totais = np.bincount(chaves, weights=colunas['valor_centavos'])
+    presentes = np.flatnonzero(totais)
+    meses_str = (presentes // len(rotulos) + primeiro).astype('datetime64[M]').astype(str)
+    return {(mes, rotulos[cod]): int(round(total)) for mes, cod, total in zip(
+        meses_str.tolist(), (presentes % len(rotulos)).tolist(), totais[presentes].tolist())}
+
+
+def consolidar_arquivos(caminhos, processos=None):
+    """Relatório único de vários arquivos de dados (membros da família, contas)
+
+    Cada arquivo é lido e pré-agregado em paralelo num pool de processos;
+    o processo principal só soma os agregados parciais. Retorna um dict de
+    DataFrames: resumo, mensal, categorias, fontes, objetivos e arquivos
+    (uma linha por arquivo, com o erro quando não pôde ser lido).
+    """
+    caminhos = list(caminhos)
+    if len(caminhos) < MINIMO_ARQUIVOS_PARALELO or processos == 1:
+        parciais = [agregar_arquivo(caminho) for caminho in caminhos]
+    else:
+        processos = processos or os.cpu_count()
+        # Lotes grandes amortizam o envio de tarefas a cada processo
+        lote = max(1, len(caminhos) // (processos * 4))
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            parciais = list(executor.map(agregar_arquivo, caminhos, chunksize=lote))
+    return mesclar_parciais(parciais)
+
+
+def mesclar_parciais(parciais):
+    """Soma os agregados parciais de agregar_arquivo em DataFrames consolidados"""
+    totais = {colecao: Counter() for colecao in COLECOES_TRANSACOES}
+    objetivos = []
+    arquivos = []
+    poupanca_total = 0
+    for parcial in parciais:
+        if parcial['erro']:
+            arquivos.append({'arquivo': parcial['arquivo'], 'erro': parcial['erro']})
+            continue
+        for colecao in COLECOES_TRANSACOES:
+            totais[colecao].update(parcial[colecao])
+        poupanca_total += parcial['poupanca_centavos']
+        for nome, meta, prazo in parcial['objetivos']:
+            objetivos.append({'arquivo': parcial['arquivo'], 'nome': nome,
+                              'valor_meta': meta, 'prazo_meses': prazo,
+                              'saldo_membro_centavos': parcial['poupanca_centavos']})
+        arquivos.append({
+            'arquivo': parcial['arquivo'],
+            'erro': None,
+            'transacoes': parcial['transacoes'],
+            'rendimentos_centavos': sum(parcial['rendimentos'].values()),
+            'gastos_centavos': sum(parcial['gastos'].values()),
+            'poupanca_centavos': parcial['poupanca_centavos']
+        })
+
+    por_mes_rotulo = {colecao: _df_mes_rotulo(totais[colecao], campo)
+                      for colecao, campo in COLECOES_TRANSACOES.items()}
+    mensal = _mensal(por_mes_rotulo)
+    total_rendimentos = int(mensal['rendimentos_centavos'].sum())
+    total_gastos = int(mensal['gastos_centavos'].sum())
+    resumo = {
+        'arquivos': len(arquivos),
+        'arquivos_com_erro': sum(1 for a in arquivos if a['erro']),
+        'total_rendimentos_centavos': total_rendimentos,
+        'total_gastos_centavos': total_gastos,
+        'saldo_centavos': total_rendimentos - total_gastos,
+        'poupanca_centavos': poupanca_total
+    }
+
+    return {
+        'resumo': resumo,
+        'mensal': mensal,
+        'categorias': _por_rotulo(por_mes_rotulo['gastos'], 'categoria'),
+        'fontes': _por_rotulo(por_mes_rotulo['rendimentos'], 'fonte'),
+        'objetivos': _progresso_objetivos(objetivos, poupanca_total),
+        'arquivos': pd.DataFrame(arquivos)
+    }
+
+
+def _df_mes_rotulo(totais, campo):
+    return pd.DataFrame([(mes, rotulo, centavos) for (mes, rotulo), centavos in totais.items()],
+                        columns=['mes_ano', campo, 'valor_centavos'])
+
+
+def _mensal(por_mes_rotulo):
+    """Rendimentos, gastos e saldo de cada mês da família"""
+    colunas = [df.groupby('mes_ano')['valor_centavos'].sum().rename(f'{colecao}_centavos')
+               for colecao, df in por_mes_rotulo.items()]
+    mensal = pd.concat(colunas, axis=1).fillna(0).astype(np.int64).sort_index()
+    mensal = mensal.reindex(columns=['rendimentos_centavos', 'gastos_centavos'], fill_value=0)
+    mensal['saldo_centavos'] = mensal['rendimentos_centavos'] - mensal['gastos_centavos']
+    mensal['total_rendimentos'] = centavos_para_reais(mensal['rendimentos_centavos'])
+    mensal['total_gastos'] = centavos_para_reais(mensal['gastos_centavos'])
+    mensal['saldo_mensal'] = centavos_para_reais(mensal['saldo_centavos'])
+    return mensal.rename_axis('mes_ano').reset_index()
+
+
+def _por_rotulo(df, campo):
+    """Total de cada categoria/fonte, do maior para o menor"""
+    resultado = df.groupby(campo)['valor_centavos'].sum().sort_values(ascending=False).reset_index()
+    resultado['valor'] = centavos_para_reais(resultado['valor_centavos'])
+    return resultado
+
+
+def _progresso_objetivos(objetivos, poupanca_total):
+    """Objetivos de todos os membros contra a poupança de cada um e a da família
+
+    O progresso da família divide a poupança somada pelas metas somadas:
+    quanto das metas de todos já estaria coberto juntando as poupanças.
+    """
+    colunas = ['arquivo', 'nome', 'valor_meta', 'prazo_meses', 'saldo_membro_centavos',
+               'progresso_membro', 'progresso_familia']
+    if not objetivos:
+        return pd.DataFrame(columns=colunas)
+    df = pd.DataFrame(objetivos)
+    saldo_membro = centavos_para_reais(df['saldo_membro_centavos'])
+    df['progresso_membro'] = np.clip(saldo_membro / df['valor_meta'], 0, 1)
+    df['progresso_familia'] = min(max(
+        centavos_para_reais(poupanca_total) / df['valor_meta'].sum(), 0), 1)
+    return df[colunas]
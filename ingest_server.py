@@ -0,0 +1,492 @@
+import argparse
+import json
+import os
+import queue
+import re
+import signal
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as TempoEsgotado
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from calculations import FinanceCalculator
+from data_manager import COLECOES_TRANSACOES, DataManager
+from money import reais_para_centavos
+from poupanca_ledger import SINAL_OPERACAO
+
+# Só a máquina local por padrão: o serviço não tem autenticação
+HOST_PADRAO = '127.0.0.1'
+PORTA_PADRAO = 8765
+
+# Pedidos aguardando o gravador; com a fila cheia o cliente espera (backpressure)
+FILA_MAXIMA = 64
+
+# Quanto um pedido espera por lugar na fila antes de receber 503
+ESPERA_FILA_S = 2.0
+
+# Transações por lote do gravador (um flush por lote; um pedido nunca é dividido)
+LOTE_MAXIMO = 20000
+
+# Depois do primeiro pedido, quanto o gravador espera por outros para o mesmo lote
+JANELA_LOTE_S = 0.005
+
+# Limites de um único pedido
+MAXIMO_POR_PEDIDO = 10000
+TAMANHO_MAXIMO_CORPO = 8 * 1024 * 1024
+
+# Quanto o cliente espera o lote do seu pedido ser gravado
+ESPERA_GRAVACAO_S = 120.0
+
+# Rotas de escrita -> tipo do pedido
+ROTAS_ESCRITA = {
+    '/gastos': 'gastos',
+    '/rendimentos': 'rendimentos',
+    '/poupanca': 'poupanca'
+}
+
+
+class ErroPedido(Exception):
+    """Pedido recusado: vira a resposta HTTP com o status e a mensagem"""
+
+    def __init__(self, status, mensagem, tentar_em=None):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+        # Segundos para o Retry-After (fila cheia, conflito com outro processo)
+        self.tentar_em = tentar_em
+
+
+class Pedido:
+    """Um POST aceito: itens validados e o Future que o handler aguarda"""
+
+    def __init__(self, tipo, dados, quantidade):
+        self.tipo = tipo
+        self.dados = dados
+        self.quantidade = quantidade
+        self.futuro = Future()
+
+
+def _itens(corpo):
+    """Objeto ou lista de objetos do corpo JSON"""
+    itens = corpo if isinstance(corpo, list) else [corpo]
+    if not itens:
+        raise ErroPedido(400, "Nenhum item enviado")
+    if len(itens) > MAXIMO_POR_PEDIDO:
+        raise ErroPedido(413, f"Máximo de {MAXIMO_POR_PEDIDO} itens por pedido")
+    for i, item in enumerate(itens):
+        if not isinstance(item, dict):
+            raise ErroPedido(400, f"Item {i}: esperado um objeto JSON")
+    return itens
+
+
+def _valor(item, i):
+    valor = item.get('valor')
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)) \
+            or not np.isfinite(valor) or valor <= 0:
+        raise ErroPedido(400, f"Item {i}: 'valor' deve ser um número positivo (reais)")
+    return valor
+
+
+def _datas(itens):
+    """'data' de cada item ('AAAA-MM-DD', padrão hoje) validada de uma vez"""
+    hoje = datetime.now().strftime('%Y-%m-%d')
+    brutas = [item.get('data', hoje) for item in itens]
+    datas = pd.to_datetime(pd.Series(brutas, dtype=object), format='%Y-%m-%d', errors='coerce')
+    invalidas = np.flatnonzero(datas.isna().to_numpy())
+    if len(invalidas):
+        i = int(invalidas[0])
+        raise ErroPedido(400, f"Item {i}: 'data' inválida ({brutas[i]!r}); use AAAA-MM-DD")
+    return datas
+
+
+def _descricao(item, i):
+    descricao = item.get('descricao', '')
+    if not isinstance(descricao, str):
+        raise ErroPedido(400, f"Item {i}: 'descricao' deve ser texto")
+    return descricao
+
+
+def validar_transacoes(colecao, corpo):
+    """DataFrame no formato de importar_gastos/importar_rendimentos
+
+    Cada item: {fonte|categoria, valor (reais), data (AAAA-MM-DD, padrão
+    hoje), descricao (opcional)}.
+    """
+    campo_rotulo = COLECOES_TRANSACOES[colecao]
+    itens = _itens(corpo)
+    rotulos, valores, descricoes = [], [], []
+    for i, item in enumerate(itens):
+        rotulo = item.get(campo_rotulo)
+        if not isinstance(rotulo, str) or not rotulo.strip():
+            raise ErroPedido(400, f"Item {i}: '{campo_rotulo}' é obrigatório")
+        rotulos.append(rotulo.strip())
+        valores.append(_valor(item, i))
+        descricoes.append(_descricao(item, i))
+    return pd.DataFrame({
+        campo_rotulo: rotulos,
+        'valor': valores,
+        'data': _datas(itens),
+        'descricao': descricoes
+    })
+
+
+def validar_poupanca(corpo):
+    """Operações da poupança: {operacao: deposito|saque, valor, data, descricao}"""
+    itens = _itens(corpo)
+    datas = _datas(itens)
+    operacoes = []
+    for i, item in enumerate(itens):
+        if item.get('operacao') not in SINAL_OPERACAO:
+            raise ErroPedido(400, f"Item {i}: 'operacao' deve ser um de {sorted(SINAL_OPERACAO)}")
+        operacoes.append({'operacao': item['operacao'], 'valor': _valor(item, i),
+                          'data': datas.iloc[i].date(), 'descricao': _descricao(item, i)})
+    return operacoes
+
+
+class _ServidorHTTP(ThreadingHTTPServer):
+    daemon_threads = True
+    # Conexões esperando o accept (o padrão, 5, derruba rajadas de clientes locais)
+    request_queue_size = 128
+
+
+class ServidorIngestao:
+    """Serviço HTTP local que grava transações em lotes no arquivo de dados
+
+    Os handlers (uma thread por conexão) só validam e enfileiram; um único
+    gravador tira da fila tudo o que chegou na janela do lote, aplica no
+    DataManager com a gravação adiada e faz um flush por lote. Cada cliente
+    recebe a resposta depois que o lote do seu pedido está em disco. A fila
+    é limitada: cheia, o pedido espera ESPERA_FILA_S e depois recebe 503
+    com Retry-After.
+
+    Outro processo (o app) pode gravar o mesmo arquivo: o gravador relê os
+    dados antes de cada lote se eles mudaram, e um lote recusado por
+    conflito é descartado da memória e respondido com 503.
+    """
+
+    def __init__(self, data_manager, host=HOST_PADRAO, porta=PORTA_PADRAO,
+                 fila_maxima=FILA_MAXIMA, lote_maximo=LOTE_MAXIMO, calculadora=None):
+        self.dm = data_manager
+        self.calc = calculadora or FinanceCalculator()
+        self.fila = queue.Queue(maxsize=fila_maxima)
+        self.lote_maximo = lote_maximo
+        # Gravador e consultas usam o DataManager um de cada vez
+        self._lock = threading.Lock()
+        self._estatisticas = {'lotes': 0, 'pedidos': 0, 'transacoes': 0,
+                              'recusados_fila_cheia': 0, 'lotes_com_falha': 0,
+                              'ultimo_lote': None}
+        self.http = _ServidorHTTP((host, porta), _ManipuladorIngestao)
+        self.http.ingestao = self
+        self._gravador = threading.Thread(target=self._gravar_lotes, name='gravador-ingestao',
+                                          daemon=True)
+        self._atendendo = False
+        # Lote com falha cuja releitura do disco também falhou
+        self._memoria_suja = False
+
+    @property
+    def endereco(self):
+        """(host, porta) em uso — com porta=0 o sistema escolhe uma livre"""
+        return self.http.server_address[:2]
+
+    def iniciar(self):
+        """Sobe gravador e servidor em threads e retorna (host, porta)"""
+        self._gravador.start()
+        self._atendendo = True
+        threading.Thread(target=self.http.serve_forever, name='servidor-ingestao',
+                         daemon=True).start()
+        return self.endereco
+
+    def servir(self):
+        """Atende até encerrar() (ou Ctrl+C) na thread atual"""
+        self._gravador.start()
+        self._atendendo = True
+        self.http.serve_forever()
+
+    def encerrar(self):
+        """Para de aceitar pedidos, grava os que estão na fila e fecha o servidor"""
+        if self._atendendo:
+            # shutdown() espera o serve_forever terminar: só se ele chegou a rodar
+            self.http.shutdown()
+            self._atendendo = False
+        self.http.server_close()
+        if self._gravador.is_alive():
+            self.fila.put(None)
+            self._gravador.join()
+        with self._lock:
+            self.dm.flush()
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+    def enfileirar(self, tipo, corpo):
+        """Valida o corpo de um POST e o coloca na fila; retorna o Pedido"""
+        if tipo == 'poupanca':
+            dados = validar_poupanca(corpo)
+        else:
+            dados = validar_transacoes(tipo, corpo)
+        pedido = Pedido(tipo, dados, len(dados))
+        try:
+            self.fila.put(pedido, timeout=ESPERA_FILA_S)
+        except queue.Full:
+            with self._lock:
+                self._estatisticas['recusados_fila_cheia'] += 1
+            raise ErroPedido(503, "Fila de gravação cheia; tente novamente", tentar_em=1)
+        return pedido
+
+    def _gravar_lotes(self):
+        """Laço do gravador: junta os pedidos da janela em um lote e grava"""
+        encerrar = False
+        while not encerrar:
+            pedido = self.fila.get()
+            if pedido is None:
+                break
+            lote, total = [pedido], pedido.quantidade
+            prazo = time.monotonic() + JANELA_LOTE_S
+            while total < self.lote_maximo:
+                try:
+                    proximo = self.fila.get(timeout=max(0.0, prazo - time.monotonic()))
+                except queue.Empty:
+                    break
+                if proximo is None:
+                    encerrar = True
+                    break
+                lote.append(proximo)
+                total += proximo.quantidade
+            try:
+                self._aplicar_lote(lote)
+            except Exception as e:
+                # O gravador não pode parar: os pedidos seguintes esperariam até o 504
+                for pedido in lote:
+                    if not pedido.futuro.done():
+                        pedido.futuro.set_exception(ErroPedido(500, f"Erro ao gravar o lote: {e}"))
+
+    def _aplicar_lote(self, lote):
+        inicio = time.perf_counter()
+        with self._lock:
+            try:
+                resultados = self._aplicar(lote)
+                gravado = self.dm.flush()
+            except Exception as e:
+                falha = ErroPedido(500, f"Erro ao gravar o lote: {e}")
+            else:
+                # Conflito com outro processo ou erro de disco: o lote sai da memória
+                falha = None if gravado else ErroPedido(
+                    503, "Dados alterados por outro processo ou erro de disco; "
+                         "nada foi gravado, tente novamente", tentar_em=1)
+            if falha is not None:
+                self._estatisticas['lotes_com_falha'] += 1
+                # Responde antes de reler: se a releitura falhar, ninguém fica esperando
+                for pedido in lote:
+                    pedido.futuro.set_exception(falha)
+                self._descartar_memoria()
+                return
+            aceitos = [p for p in lote if not isinstance(resultados[p], ErroPedido)]
+            self._estatisticas['lotes'] += 1
+            self._estatisticas['pedidos'] += len(aceitos)
+            self._estatisticas['transacoes'] += sum(p.quantidade for p in aceitos)
+            self._estatisticas['ultimo_lote'] = {
+                'pedidos': len(lote), 'transacoes': sum(p.quantidade for p in lote),
+                'duracao_s': round(time.perf_counter() - inicio, 4)}
+        for pedido in lote:
+            if isinstance(resultados[pedido], ErroPedido):
+                pedido.futuro.set_exception(resultados[pedido])
+            else:
+                pedido.futuro.set_result(resultados[pedido])
+
+    def _descartar_memoria(self):
+        """Volta ao que está em disco depois de um lote com falha (estado pela metade)
+
+        Se a releitura também falhar, a memória fica marcada como suja e o
+        próximo lote tenta reler antes de aplicar qualquer coisa: nada do
+        lote com falha chega ao disco.
+        """
+        try:
+            self.dm.recarregar()
+            self._memoria_suja = False
+        except Exception as e:
+            self._memoria_suja = True
+            print(f"Erro ao reler os dados depois de um lote com falha: {e}")
+
+    def _aplicar(self, lote):
+        """Aplica o lote em memória, sem gravar; {pedido: resposta ou ErroPedido}"""
+        if self._memoria_suja:
+            self.dm.recarregar()
+            self._memoria_suja = False
+        else:
+            self.dm.recarregar_se_alterado()
+        resultados = {}
+        with self.dm.gravacao_adiada():
+            for colecao in COLECOES_TRANSACOES:
+                pedidos = [p for p in lote if p.tipo == colecao]
+                if not pedidos:
+                    continue
+                # Um importar por coleção: ids em sequência, na ordem dos pedidos
+                proximo_id = self.dm.data[colecao].proximo_id
+                getattr(self.dm, f'importar_{colecao}')(
+                    pd.concat([p.dados for p in pedidos], ignore_index=True))
+                for pedido in pedidos:
+                    resultados[pedido] = {'ids': list(range(proximo_id,
+                                                            proximo_id + pedido.quantidade))}
+                    proximo_id += pedido.quantidade
+            for pedido in lote:
+                if pedido.tipo == 'poupanca':
+                    resultados[pedido] = self._aplicar_poupanca(pedido.dados)
+        return resultados
+
+    def _aplicar_poupanca(self, operacoes):
+        """Operações de um pedido, todas ou nenhuma (saque sem saldo desfaz as anteriores)"""
+        ids = []
+        for i, op in enumerate(operacoes):
+            if op['operacao'] == 'saque':
+                # Mesmo critério do app: nenhum dia da data do saque em diante fica negativo
+                disponivel = self.dm.get_saldo_sacavel_centavos(op['data'])
+                if reais_para_centavos(op['valor']) > disponivel:
+                    for operacao_id in reversed(ids):
+                        self.dm.delete_operacao_poupanca(operacao_id)
+                    return ErroPedido(422, f"Item {i}: saldo insuficiente para saque")
+            ids.append(self.dm.ledger_poupanca.proximo_id)
+            self.dm.update_poupanca(op['operacao'], op['valor'], op['descricao'], op['data'])
+        return {'ids': ids, 'saldo_poupanca_centavos': self.dm.get_saldo_poupanca_centavos()}
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def resumo(self, mes_ano=None):
+        """Resumo do mês e totais por fonte/categoria, dos totais mensais (sem ler transações)"""
+        with self._lock:
+            self.dm.recarregar_se_alterado()
+            totais = {colecao: self.dm.get_totais_mensais(colecao)
+                      for colecao in COLECOES_TRANSACOES}
+            saldo_poupanca = self.dm.get_saldo_poupanca_centavos()
+        resumo = self.calc.calcular_resumo_mensal_dos_totais(
+            totais['rendimentos'], totais['gastos'], mes_ano)
+        for colecao, campo_rotulo in COLECOES_TRANSACOES.items():
+            do_mes = {mes: resumo_mes for mes, resumo_mes in totais[colecao].items()
+                      if mes == resumo['mes_ano']}
+            por_rotulo = self.calc.calcular_totais_por_rotulo(do_mes, campo_rotulo)
+            resumo[f'{colecao}_por_{campo_rotulo}'] = (
+                dict(zip(por_rotulo[campo_rotulo], por_rotulo['valor_centavos'].tolist()))
+                if not por_rotulo.empty else {})
+        resumo['saldo_poupanca_centavos'] = saldo_poupanca
+        return resumo
+
+    def status(self):
+        with self._lock:
+            return {'arquivo': self.dm.data_file, 'fila': self.fila.qsize(),
+                    'fila_maxima': self.fila.maxsize, 'lote_maximo': self.lote_maximo,
+                    **self._estatisticas}
+
+
+class _ManipuladorIngestao(BaseHTTPRequestHandler):
+    """POST /gastos, /rendimentos, /poupanca; GET /resumo?mes=AAAA-MM, /status"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FinancasIngestao/1.0'
+
+    @property
+    def ingestao(self):
+        return self.server.ingestao
+
+    def do_POST(self):
+        try:
+            tipo = ROTAS_ESCRITA.get(urlsplit(self.path).path.rstrip('/'))
+            if tipo is None:
+                raise ErroPedido(404, f"Rota desconhecida: {self.path}")
+            pedido = self.ingestao.enfileirar(tipo, self._ler_json())
+            try:
+                resposta = pedido.futuro.result(timeout=ESPERA_GRAVACAO_S)
+            except TempoEsgotado:
+                raise ErroPedido(504, "Lote ainda não gravado; o pedido continua na fila")
+            self._responder(201, {'gravados': pedido.quantidade, **resposta})
+        except ErroPedido as e:
+            self._responder_erro(e)
+        except Exception as e:
+            self._responder(500, {'erro': str(e)})
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        try:
+            rota = url.path.rstrip('/')
+            if rota == '/resumo':
+                mes = parse_qs(url.query).get('mes', [None])[0]
+                if mes is not None and not re.fullmatch(r'\d{4}-(0[1-9]|1[0-2])', mes):
+                    raise ErroPedido(400, "'mes' deve estar no formato AAAA-MM")
+                self._responder(200, self.ingestao.resumo(mes))
+            elif rota == '/status':
+                self._responder(200, self.ingestao.status())
+            else:
+                raise ErroPedido(404, f"Rota desconhecida: {self.path}")
+        except ErroPedido as e:
+            self._responder_erro(e)
+        except Exception as e:
+            self._responder(500, {'erro': str(e)})
+
+    def _ler_json(self):
+        tamanho = self.headers.get('Content-Length')
+        if tamanho is None:
+            raise ErroPedido(411, "Content-Length é obrigatório")
+        if not re.fullmatch(r'[0-9]+', tamanho.strip()):
+            # Sem tamanho confiável o corpo não pode ser lido nem descartado
+            self.close_connection = True
+            raise ErroPedido(400, "Content-Length deve ser um inteiro não negativo")
+        tamanho = int(tamanho)
+        if tamanho > TAMANHO_MAXIMO_CORPO:
+            # O corpo não é lido: a conexão não pode ser reaproveitada
+            self.close_connection = True
+            raise ErroPedido(413, f"Corpo maior que {TAMANHO_MAXIMO_CORPO} bytes")
+        try:
+            return json.loads(self.rfile.read(tamanho))
+        except ValueError:
+            raise ErroPedido(400, "Corpo não é um JSON válido")
+
+    def _responder_erro(self, erro):
+        cabecalhos = {'Retry-After': str(erro.tentar_em)} if erro.tentar_em else {}
+        self._responder(erro.status, {'erro': erro.mensagem}, cabecalhos)
+
+    def _responder(self, status, corpo, cabecalhos=None):
+        conteudo = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(conteudo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(conteudo)
+
+    def log_message(self, formato, *args):
+        # Um log por pedido custaria mais que o próprio pedido nos lotes grandes
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serviço HTTP local para lançar transações em lotes, fora do app")
+    parser.add_argument("arquivo", nargs='?',
+                        default=os.environ.get('FINANCE_DATA_FILE', 'finance_data.json'),
+                        help="Arquivo de dados ou pasta particionada")
+    parser.add_argument("--host", default=HOST_PADRAO)
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    parser.add_argument("--fila", type=int, default=FILA_MAXIMA,
+                        help="Pedidos aguardando gravação antes de recusar com 503")
+    parser.add_argument("--lote", type=int, default=LOTE_MAXIMO,
+                        help="Transações gravadas por flush")
+    args = parser.parse_args()
+
+    servidor = ServidorIngestao(DataManager(args.arquivo), args.host, args.porta,
+                                args.fila, args.lote)
+    # kill (SIGTERM) encerra como o Ctrl+C: a fila é gravada antes de sair
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    host, porta = servidor.endereco
+    print(f"🚀 Ingestão em http://{host}:{porta} gravando em {args.arquivo} (Ctrl+C encerra)")
+    try:
+        servidor.servir()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.encerrar()
+        print("✅ Fila gravada; serviço encerrado")
@@ -0,0 +1,315 @@
+import argparse
+import copy
+import json
+import os
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from atomic_files import gravar_atomico
+from money import reais_para_centavos, reais_para_centavos_lote
+
+# Versão do esquema gravada em data['schema_version']; arquivos sem o campo são 0
+SCHEMA_VERSION = 4
+
+# Listas de registros migradas como DataFrames (caminho dentro dos dados)
+TABELAS = ('rendimentos', 'gastos', 'poupanca.historico')
+
+# Coleções que seguem como DataFrame, lidas coluna a coluna pelo TransactionStore
+TABELAS_COLUNARES = ('rendimentos', 'gastos')
+
+Migracao = namedtuple('Migracao', 'versao descricao funcao')
+
+# Registro ordenado: cada migração leva os dados da versão anterior para a sua
+MIGRACOES = []
+
+
+def migracao(versao, descricao):
+    """Registra uma migração; funcao(dados, tabelas) retorna quantos itens alterou"""
+    def registrar(funcao):
+        if any(m.versao == versao for m in MIGRACOES):
+            raise ValueError(f"migração {versao} registrada duas vezes")
+        MIGRACOES.append(Migracao(versao, descricao, funcao))
+        MIGRACOES.sort(key=lambda m: m.versao)
+        return funcao
+    return registrar
+
+
+class TabelasMigracao:
+    """Listas de registros dos dados como DataFrames, montados no primeiro uso
+
+    As migrações renomeiam e convertem colunas inteiras. No fim, as
+    transações alteradas ficam nos dados como DataFrame (o TransactionStore
+    as lê por coluna) e o histórico da poupança volta a ser lista de
+    dicts, uma única vez, qualquer que seja o número de etapas.
+    """
+
+    def __init__(self, dados):
+        self.dados = dados
+        self._tabelas = {}
+        self._alteradas = set()
+
+    def _lista(self, caminho):
+        secao, _, campo = caminho.partition('.')
+        if campo:
+            return (self.dados.get(secao) or {}).get(campo) or []
+        return self.dados.get(secao) or []
+
+    def __getitem__(self, caminho):
+        if caminho not in self._tabelas:
+            lista = self._lista(caminho)
+            self._tabelas[caminho] = (lista.copy() if isinstance(lista, pd.DataFrame)
+                                      else pd.DataFrame.from_records(lista))
+        return self._tabelas[caminho]
+
+    def __setitem__(self, caminho, df):
+        self._tabelas[caminho] = df
+        self._alteradas.add(caminho)
+
+    def devolver(self):
+        """Grava nos dados as tabelas alteradas"""
+        for caminho in self._alteradas:
+            secao, _, campo = caminho.partition('.')
+            if caminho in TABELAS_COLUNARES:
+                self.dados[secao] = self._tabelas[caminho]
+                continue
+            registros = _registros(self._tabelas[caminho])
+            if campo:
+                self.dados.setdefault(secao, {})[campo] = registros
+            else:
+                self.dados[secao] = registros
+
+
+def _registros(df):
+    """DataFrame -> lista de dicts, sem as chaves ausentes no registro original"""
+    esparsas = [c for c in df.columns if df[c].isna().any()]
+    if esparsas:
+        df = df.astype({c: object for c in esparsas})
+    registros = df.to_dict('records')
+    if esparsas:
+        # Só as linhas com algum campo ausente são percorridas
+        for i in np.flatnonzero(df[esparsas].isna().any(axis=1).to_numpy()):
+            registros[i] = {k: v for k, v in registros[i].items()
+                            if not (k in esparsas and pd.isna(v))}
+    return registros
+
+
+def _reais_para_centavos(df, campo):
+    """Converte a coluna `campo` (reais) em `campo`_centavos, sem sobrescrever valores já em centavos"""
+    if campo not in df:
+        return 0
+    destino = f'{campo}_centavos'
+    faltando = (df[destino].isna() if destino in df else pd.Series(True, index=df.index))
+    faltando &= df[campo].notna()
+    centavos = (df[destino].astype('Int64') if destino in df
+                else pd.Series(pd.NA, index=df.index, dtype='Int64'))
+    centavos[faltando] = reais_para_centavos_lote(df.loc[faltando, campo].to_numpy())
+    df[destino] = centavos.astype(np.int64) if centavos.notna().all() else centavos
+    del df[campo]
+    return int(faltando.sum())
+
+
+@migracao(1, "Poupança: 'saldo' renomeado para 'saldo_atual' no histórico")
+def _saldo_para_saldo_atual(dados, tabelas):
+    historico = tabelas['poupanca.historico']
+    if 'saldo' not in historico:
+        return 0
+    renomeados = int(historico['saldo'].notna().sum())
+    if 'saldo_atual' in historico:
+        # Itens que já tinham 'saldo_atual' mantêm o valor
+        renomeados = int((historico['saldo'].notna() & historico['saldo_atual'].isna()).sum())
+        historico['saldo_atual'] = historico['saldo_atual'].fillna(historico['saldo'])
+        historico = historico.drop(columns='saldo')
+    else:
+        historico = historico.rename(columns={'saldo': 'saldo_atual'})
+    tabelas['poupanca.historico'] = historico
+    return renomeados
+
+
+@migracao(2, "Valores em reais (float) convertidos para centavos inteiros")
+def _valores_para_centavos(dados, tabelas):
+    convertidos = 0
+    for caminho in TABELAS:
+        df = tabelas[caminho]
+        if 'valor' in df:
+            convertidos += _reais_para_centavos(df, 'valor')
+            tabelas[caminho] = df
+
+    poupanca = dados.get('poupanca')
+    if poupanca and 'saldo_atual_centavos' not in poupanca:
+        poupanca['saldo_atual_centavos'] = reais_para_centavos(poupanca.pop('saldo_atual', 0.0))
+        convertidos += 1
+    return convertidos
+
+
+@migracao(3, "Poupança: saldos por operação removidos (derivados do ledger)")
+def _remover_saldos_derivados(dados, tabelas):
+    historico = tabelas['poupanca.historico']
+    derivados = [c for c in ('saldo_anterior', 'saldo_atual',
+                             'saldo_anterior_centavos', 'saldo_atual_centavos')
+                 if c in historico]
+    if not derivados:
+        return 0
+    removidos = int(historico[derivados].notna().any(axis=1).sum())
+    tabelas['poupanca.historico'] = historico.drop(columns=derivados)
+    return removidos
+
+
+@migracao(4, "Ids repetidos (esquema antigo len+1) renumerados")
+def _renumerar_ids_repetidos(dados, tabelas):
+    renumerados = 0
+    for caminho in TABELAS:
+        df = tabelas[caminho]
+        if 'id' not in df:
+            continue
+        ids = pd.to_numeric(df['id'], errors='coerce')
+        # A primeira ocorrência mantém o id; as demais (e as sem id) vão para o fim
+        repetidos = (ids.duplicated(keep='first') | ids.isna()).to_numpy()
+        k = int(repetidos.sum())
+        if not k:
+            continue
+        inicio = int(ids.max()) + 1 if ids.notna().any() else 1
+        ids = ids.fillna(0).to_numpy(dtype=np.int64, copy=True)
+        ids[repetidos] = np.arange(inicio, inicio + k, dtype=np.int64)
+        df['id'] = ids
+        tabelas[caminho] = df
+        renumerados += k
+    return renumerados
+
+
+def versao_dos_dados(dados):
+    return int(dados.get('schema_version', 0))
+
+
+def pendentes(dados):
+    """Migrações ainda não aplicadas aos dados, em ordem"""
+    versao = versao_dos_dados(dados)
+    if versao > SCHEMA_VERSION:
+        raise ValueError(f"dados na versão {versao}, mais nova que a suportada ({SCHEMA_VERSION})")
+    return [m for m in MIGRACOES if m.versao > versao]
+
+
+def migrar(dados, dry_run=False, ao_concluir=None):
+    """Aplica as migrações pendentes aos dados (dict carregado do JSON)
+
+    Todas as etapas trabalham sobre os mesmos DataFrames, convertidos de
+    volta uma vez no fim. Com dry_run os dados não são alterados (as
+    etapas rodam sobre cópias rasas de cada seção). ao_concluir(versao) é
+    chamado ao fim de cada etapa. Retorna o relatório por migração.
+    """
+    etapas = pendentes(dados)
+    if not etapas:
+        return []
+
+    alvo = {chave: copy.copy(valor) for chave, valor in dados.items()} if dry_run else dados
+    tabelas = TabelasMigracao(alvo)
+    relatorio = []
+    for etapa in etapas:
+        inicio = time.perf_counter()
+        alteracoes = etapa.funcao(alvo, tabelas)
+        relatorio.append({'versao': etapa.versao, 'descricao': etapa.descricao,
+                          'alteracoes': alteracoes, 'duracao_s': time.perf_counter() - inicio})
+        if ao_concluir:
+            ao_concluir(etapa.versao)
+
+    if not dry_run:
+        tabelas.devolver()
+        dados['schema_version'] = etapas[-1].versao
+    return relatorio
+
+
+class DiarioMigracao:
+    """Registro em disco de uma migração em andamento (<arquivo>.migracao.json)
+
+    Criado antes da primeira etapa e removido depois que o arquivo migrado
+    é gravado. Como o arquivo de dados só é substituído no fim (os.replace),
+    um diário encontrado no carregamento indica uma migração interrompida:
+    ela é retomada a partir da versão efetivamente gravada no arquivo.
+    """
+
+    def __init__(self, data_file):
+        self.caminho = f'{data_file}.migracao.json'
+
+    def ler(self):
+        try:
+            with open(self.caminho, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _gravar(self, estado):
+        gravar_atomico(self.caminho, lambda f: json.dump(estado, f, ensure_ascii=False))
+
+    def iniciar(self, de, para):
+        self._gravar({'de': de, 'para': para, 'etapas': [],
+                      'iniciado_em': datetime.now().isoformat(timespec='seconds')})
+
+    def concluir_etapa(self, versao):
+        estado = self.ler() or {'etapas': []}
+        estado['etapas'].append(versao)
+        self._gravar(estado)
+
+    def encerrar(self):
+        try:
+            os.remove(self.caminho)
+        except FileNotFoundError:
+            pass
+
+
+def migrar_com_diario(dados, data_file):
+    """Migra os dados carregados de data_file registrando o andamento no diário
+
+    Retorna o relatório e o diário; quem grava o arquivo migrado chama
+    diario.encerrar() depois de gravar.
+    """
+    diario = DiarioMigracao(data_file)
+    interrompida = diario.ler()
+    etapas = pendentes(dados)
+    if interrompida:
+        print(f"Retomando migração interrompida de {data_file} "
+              f"(versão {versao_dos_dados(dados)} para {SCHEMA_VERSION})")
+    if not etapas:
+        diario.encerrar()
+        return [], diario
+    diario.iniciar(versao_dos_dados(dados), etapas[-1].versao)
+    return migrar(dados, ao_concluir=diario.concluir_etapa), diario
+
+
+def _imprimir_relatorio(relatorio):
+    for etapa in relatorio:
+        print(f"  v{etapa['versao']}: {etapa['descricao']} — "
+              f"{etapa['alteracoes']} alterações ({etapa['duracao_s']:.2f} s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Atualiza um arquivo de dados para a versão atual do esquema")
+    parser.add_argument("arquivo", nargs='?', default='finance_data.json')
+    parser.add_argument("--dry-run", action='store_true',
+                        help="Só mostra o que seria alterado, sem gravar")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.arquivo):
+        print("📁 Arquivo de dados não encontrado. Será criado na primeira execução.")
+    elif args.dry_run:
+        with open(args.arquivo, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+        versao = versao_dos_dados(dados)
+        relatorio = migrar(dados, dry_run=True)
+        if not relatorio:
+            print(f"✅ {args.arquivo} já está na versão {versao}")
+        else:
+            print(f"🔎 {args.arquivo}: versão {versao} → {relatorio[-1]['versao']} (nada gravado)")
+            _imprimir_relatorio(relatorio)
+    else:
+        # O DataManager migra ao carregar e grava o arquivo uma vez
+        from data_manager import DataManager
+        dm = DataManager(args.arquivo)
+        if not dm.migracoes_aplicadas:
+            print(f"✅ {args.arquivo} já está na versão {SCHEMA_VERSION}")
+        else:
+            print(f"✅ {args.arquivo} migrado para a versão {SCHEMA_VERSION}")
+            _imprimir_relatorio(dm.migracoes_aplicadas)
@@ -0,0 +1,24 @@
+import numpy as np
+
+
+def reais_para_centavos(valor):
+    """Converte um valor em reais (float/str/Decimal) para centavos inteiros"""
+    return int(round(float(valor) * 100))
+
+
+def reais_para_centavos_lote(valores):
+    """Converte um array de valores em reais para centavos int64"""
+    return np.rint(np.asarray(valores, dtype=np.float64) * 100).astype(np.int64)
+
+
+def centavos_para_reais(centavos):
+    """Converte centavos para reais (somente para exibição e gráficos)"""
+    return centavos / 100
+
+
+def formatar_reais(centavos):
+    """Formata centavos como 'R\\$ 1,234.56' sem passar por float"""
+    centavos = int(centavos)
+    sinal = '-' if centavos < 0 else ''
+    inteiro, resto = divmod(abs(centavos), 100)
+    return f"R\\$ {sinal}{inteiro:,}.{resto:02d}"
@@ -0,0 +1,136 @@
+import numpy as np
+
+# Fluxos do patrimônio; no mesmo dia a ordem é a desta tupla
+ORIGENS = ('rendimento', 'poupanca', 'gasto')
+
+# Chave única e ordenável de cada lançamento: (dia, origem, id) em um int64
+_FATOR_ORIGEM = 1 << 32
+_FATOR_DIA = 1 << 36
+
+
+def chave_lancamento(dias, origem, ids):
+    """Chave (dia, origem, id) de cada lançamento, na ordem do livro"""
+    return (np.asarray(dias, dtype=np.int64) * _FATOR_DIA +
+            np.int64(ORIGENS.index(origem) * _FATOR_ORIGEM) + np.asarray(ids, dtype=np.int64))
+
+
+def intercalar(chaves):
+    """Posição final de cada elemento de k sequências já ordenadas (merge k-way)
+
+    A posição de um elemento no resultado é o seu índice na própria
+    sequência mais quantos elementos de cada outra vêm antes dele — uma
+    busca binária por sequência, sem reordenar o conjunto inteiro.
+    """
+    posicoes = []
+    for i, chave in enumerate(chaves):
+        posicao = np.arange(len(chave), dtype=np.int64)
+        for j, outra in enumerate(chaves):
+            if j != i:
+                posicao += np.searchsorted(outra, chave)
+        posicoes.append(posicao)
+    return posicoes
+
+
+class LedgerPatrimonio:
+    """Livro único de rendimentos, gastos e movimentações da poupança por data
+
+    Cada lançamento guarda o efeito no caixa e na poupança; os saldos
+    correntes são somas acumuladas. Lançamentos no fim do livro (o caso
+    comum) são anexados em O(novos); retroativos e exclusões refazem só
+    o sufixo dos saldos a partir da sua posição.
+    """
+
+    _COLUNAS = ('chave', 'caixa', 'poupanca', 'saldo_caixa', 'saldo_poupanca')
+
+    def __init__(self):
+        self.tamanho = 0
+        self._alocar(1024)
+
+    def _alocar(self, capacidade):
+        antigas = getattr(self, '_arrays', None)
+        self._arrays = {c: np.zeros(capacidade, dtype=np.int64) for c in self._COLUNAS}
+        if antigas:
+            for coluna, valores in antigas.items():
+                self._arrays[coluna][:self.tamanho] = valores[:self.tamanho]
+
+    @classmethod
+    def dos_fluxos(cls, fluxos):
+        """Monta o livro de uma vez a partir de (origem, dias, ids, caixa, poupanca) por fluxo"""
+        livro = cls()
+        ordenados = [livro._ordenar(*fluxo) for fluxo in fluxos]
+        total = sum(len(f['chave']) for f in ordenados)
+        livro._alocar(max(total * 2, 1024))
+        for fluxo, posicao in zip(ordenados, intercalar([f['chave'] for f in ordenados])):
+            for coluna, valores in fluxo.items():
+                livro._arrays[coluna][posicao] = valores
+        livro.tamanho = total
+        livro._refazer_saldos(0)
+        return livro
+
+    @staticmethod
+    def _ordenar(origem, dias, ids, caixa, poupanca):
+        """Colunas de um fluxo em ordem de chave (cada fluxo já vem quase ordenado)"""
+        chave = chave_lancamento(dias, origem, ids)
+        ordem = np.argsort(chave, kind='stable')
+        return {'chave': chave[ordem],
+                'caixa': np.asarray(caixa, dtype=np.int64)[ordem],
+                'poupanca': np.asarray(poupanca, dtype=np.int64)[ordem]}
+
+    def _refazer_saldos(self, inicio):
+        """Saldos correntes da posição inicio em diante"""
+        for delta, saldo in (('caixa', 'saldo_caixa'), ('poupanca', 'saldo_poupanca')):
+            base = self._arrays[saldo][inicio - 1] if inicio else 0
+            trecho = self._arrays[saldo][inicio:self.tamanho]
+            np.cumsum(self._arrays[delta][inicio:self.tamanho], out=trecho)
+            trecho += base
+
+    def acrescentar(self, origem, dias, ids, caixa, poupanca):
+        """Inclui lançamentos de um fluxo, intercalando-os pela data"""
+        novo = self._ordenar(origem, dias, ids, caixa, poupanca)
+        n = len(novo['chave'])
+        if not n:
+            return
+        if self.tamanho + n > len(self._arrays['chave']):
+            self._alocar(max(2 * len(self._arrays['chave']), self.tamanho + n))
+
+        existente = self._arrays['chave'][:self.tamanho]
+        if not self.tamanho or novo['chave'][0] > existente[-1]:
+            # Tudo depois do último lançamento: só anexa
+            inicio = self.tamanho
+            for coluna, valores in novo.items():
+                self._arrays[coluna][inicio:inicio + n] = valores
+        else:
+            # Retroativos: intercala a partir do primeiro ponto afetado
+            inicio = int(np.searchsorted(existente, novo['chave'][0]))
+            cauda = {c: self._arrays[c][inicio:self.tamanho].copy() for c in novo}
+            pos_cauda, pos_novo = intercalar([cauda['chave'], novo['chave']])
+            for coluna in novo:
+                self._arrays[coluna][inicio + pos_cauda] = cauda[coluna]
+                self._arrays[coluna][inicio + pos_novo] = novo[coluna]
+        self.tamanho += n
+        self._refazer_saldos(inicio)
+
+    def remover(self, origem, dia, id_):
+        """Exclui um lançamento e refaz os saldos seguintes"""
+        chave = chave_lancamento([dia], origem, [id_])[0]
+        posicao = int(np.searchsorted(self._arrays['chave'][:self.tamanho], chave))
+        if posicao >= self.tamanho or self._arrays['chave'][posicao] != chave:
+            return False
+        for valores in self._arrays.values():
+            valores[posicao:self.tamanho - 1] = valores[posicao + 1:self.tamanho]
+        self.tamanho -= 1
+        self._refazer_saldos(posicao)
+        return True
+
+    def memoria_bytes(self):
+        return sum(valores.nbytes for valores in self._arrays.values())
+
+    def colunas(self):
+        """Dia, origem e id (saídos da chave), efeitos e saldos de cada lançamento"""
+        chave = self._arrays['chave'][:self.tamanho]
+        return {
+            'dia': chave // _FATOR_DIA,
+            'origem': (chave % _FATOR_DIA) // _FATOR_ORIGEM,
+            'id': chave % _FATOR_ORIGEM,
+            **{c: self._arrays[c][:self.tamanho] for c in self._COLUNAS[1:]}
+        }
@@ -0,0 +1,255 @@
+import argparse
+import json
+import os
+from collections import OrderedDict
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+from atomic_files import gravar_atomico
+
+# Manifesto: seções pequenas dos dados + índice das partições
+ARQUIVO_MANIFESTO = 'manifesto.json'
+
+# Coleções particionadas por mês e o campo de rótulo de cada uma
+COLECOES_PARTICIONADAS = {
+    'rendimentos': 'fonte',
+    'gastos': 'categoria'
+}
+
+# Partições lidas mantidas em memória (arquivos imutáveis: o cache nunca fica velho)
+PARTICOES_EM_CACHE = 64
+
+
+def meses_dos_dias(dias):
+    """Dias desde 1970-01-01 -> meses desde 1970-01 (int64)"""
+    return np.asarray(dias).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+
+def texto_mes(mes):
+    """Mês desde 1970-01 -> 'AAAA-MM'"""
+    return str(np.datetime64(int(mes), 'M'))
+
+
+def eh_particionado(caminho):
+    """True se o caminho é uma pasta de dados particionada (com manifesto)"""
+    return os.path.isfile(os.path.join(caminho, ARQUIVO_MANIFESTO))
+
+
+def posicoes_por_mes(loja, meses=None):
+    """{'AAAA-MM': posições das transações do mês}, de todos os meses ou só dos pedidos
+
+    Todos os meses saem de um único argsort; poucos meses (o caso de um
+    save comum) custam uma comparação vetorizada cada.
+    """
+    colunas = loja.visao_colunas()
+    if not len(colunas['dia']):
+        return {}
+    codigos = meses_dos_dias(colunas['dia'])
+    if meses is not None:
+        por_mes = {mes: np.flatnonzero(codigos == np.datetime64(mes, 'M').astype(np.int64))
+                   for mes in meses}
+        return {mes: posicoes for mes, posicoes in por_mes.items() if len(posicoes)}
+    ordem = np.argsort(codigos, kind='stable')
+    distintos, inicios = np.unique(codigos[ordem], return_index=True)
+    return {texto_mes(mes): posicoes for mes, posicoes in
+            zip(distintos.tolist(), np.split(ordem, inicios[1:]))}
+
+
+def resumo_particao(loja, posicoes):
+    """Totais gravados no manifesto para uma partição"""
+    colunas = loja.visao_colunas()
+    centavos = colunas['valor_centavos'][posicoes]
+    por_rotulo = np.bincount(colunas['cod_rotulo'][posicoes], weights=centavos,
+                             minlength=len(loja.rotulos))
+    return {
+        'registros': int(len(posicoes)),
+        'total_centavos': int(centavos.sum()),
+        'por_rotulo': {loja.rotulos.valores[cod]: int(round(total))
+                       for cod, total in enumerate(por_rotulo.tolist()) if total},
+        'max_id': int(colunas['id'][posicoes].max())
+    }
+
+
+class ArmazemMensal:
+    """Rendimentos e gastos em uma partição (arquivo JSON) por mês
+
+    Layout da pasta:
+        manifesto.json           seções pequenas + {coleção: {mês: resumo}}
+        gastos/2024-01.v3.json   transações do mês, uma por linha
+
+    Um arquivo de partição nunca é reescrito: alterar um mês grava uma
+    versão nova e troca o manifesto (os.replace), que é o ponto de
+    confirmação. Por isso uma partição lida pode ficar em cache para
+    sempre, identificada pelo nome do arquivo. Gravar só reescreve os meses
+    alterados — no uso normal, o mês corrente e o manifesto.
+    """
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self.manifesto = None
+        # Nome do arquivo -> registros (imutáveis, LRU)
+        self._cache = OrderedDict()
+
+    @property
+    def caminho_manifesto(self):
+        return os.path.join(self.pasta, ARQUIVO_MANIFESTO)
+
+    def _caminho(self, colecao, arquivo):
+        return os.path.join(self.pasta, colecao, arquivo)
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+    def ler_manifesto(self):
+        with open(self.caminho_manifesto, 'r', encoding='utf-8') as f:
+            self.manifesto = json.load(f)
+        return self.manifesto
+
+    def particoes(self, colecao):
+        """{mês: resumo} de uma coleção, em ordem cronológica"""
+        return dict(sorted(self.manifesto['particoes'].get(colecao, {}).items()))
+
+    def ler_mes(self, colecao, mes):
+        """Registros de um mês (lista de dicts; não alterar: pode vir do cache)"""
+        particao = self.manifesto['particoes'].get(colecao, {}).get(mes)
+        if particao is None:
+            return []
+        arquivo = particao['arquivo']
+        if arquivo in self._cache:
+            self._cache.move_to_end(arquivo)
+            return self._cache[arquivo]
+        with open(self._caminho(colecao, arquivo), 'r', encoding='utf-8') as f:
+            registros = json.load(f)
+        self._cache[arquivo] = registros
+        while len(self._cache) > PARTICOES_EM_CACHE:
+            self._cache.popitem(last=False)
+        return registros
+
+    def ler_colecao(self, colecao, meses=None):
+        """Registros dos meses pedidos (padrão: todos) em ordem de id, como no arquivo único"""
+        meses = self.particoes(colecao) if meses is None else sorted(meses)
+        registros = []
+        for mes in meses:
+            registros.extend(self.ler_mes(colecao, mes))
+        # Lançamentos retroativos deixam os ids fora da ordem dos meses
+        registros.sort(key=itemgetter('id'))
+        return registros
+
+    def ler_secoes(self):
+        """Seções pequenas dos dados (tudo menos as transações), lidas só do manifesto"""
+        manifesto = self.ler_manifesto()
+        return {chave: valor for chave, valor in manifesto.items()
+                if chave not in ('particoes', 'ultima_versao')}
+
+    def carregar_dados(self):
+        """Dados completos (seções do manifesto + todas as partições), como no arquivo único"""
+        dados = self.ler_secoes()
+        for colecao in COLECOES_PARTICIONADAS:
+            dados[colecao] = self.ler_colecao(colecao)
+        return dados
+
+    def resumos(self):
+        """{coleção: {mês: resumo}} do manifesto, sem o nome dos arquivos"""
+        return {colecao: {mes: {k: v for k, v in particao.items() if k != 'arquivo'}
+                          for mes, particao in self.particoes(colecao).items()}
+                for colecao in COLECOES_PARTICIONADAS}
+
+    def totais_mensais(self, colecao):
+        """DataFrame mes, registros, total_centavos lido só do manifesto"""
+        linhas = [{'mes': mes, 'registros': p['registros'], 'total_centavos': p['total_centavos']}
+                  for mes, p in self.particoes(colecao).items()]
+        return pd.DataFrame(linhas, columns=['mes', 'registros', 'total_centavos'])
+
+    def totais_por_rotulo(self, colecao, meses=None):
+        """{fonte/categoria: centavos} somando os resumos do manifesto"""
+        totais = {}
+        for mes, particao in self.particoes(colecao).items():
+            if meses is None or mes in meses:
+                for rotulo, centavos in particao['por_rotulo'].items():
+                    totais[rotulo] = totais.get(rotulo, 0) + centavos
+        return totais
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+    def gravar(self, dados, meses_alterados=None):
+        """Grava os dados; meses_alterados={coleção: {meses}} (None regrava tudo)
+
+        Cada mês alterado ganha um arquivo novo; o manifesto é trocado de
+        uma vez no fim e os arquivos que ele não cita mais (versões
+        antigas, restos de uma gravação interrompida) são apagados depois.
+        Retorna o os.stat do manifesto gravado.
+        """
+        anterior = (self.manifesto or {}).get('particoes', {})
+        # Versões numeradas na pasta toda: um nome de arquivo nunca é reutilizado
+        ultima_versao = (self.manifesto or {}).get('ultima_versao', 0)
+        particoes = {}
+        for colecao in COLECOES_PARTICIONADAS:
+            os.makedirs(os.path.join(self.pasta, colecao), exist_ok=True)
+            atuais = dict(anterior.get(colecao, {}))
+            if meses_alterados is not None and not meses_alterados.get(colecao):
+                # Nenhum mês alterado: a coleção nem precisa estar carregada
+                particoes[colecao] = atuais
+                continue
+            loja = dados[colecao]
+            if meses_alterados is None:
+                por_mes = posicoes_por_mes(loja)
+                alterados = set(por_mes) | set(atuais)
+            else:
+                alterados = meses_alterados.get(colecao, set())
+                por_mes = posicoes_por_mes(loja, alterados)
+            for mes in sorted(alterados):
+                atuais.pop(mes, None)
+                if mes not in por_mes:
+                    # Mês sem transações: a partição deixa de existir
+                    continue
+                ultima_versao += 1
+                arquivo = f'{mes}.v{ultima_versao}.json'
+                with open(self._caminho(colecao, arquivo), 'w', encoding='utf-8') as f:
+                    loja.escrever_json(f, indent='', posicoes=por_mes[mes])
+                    f.write('\n')
+                atuais[mes] = {'arquivo': arquivo,
+                               **resumo_particao(loja, por_mes[mes])}
+            particoes[colecao] = dict(sorted(atuais.items()))
+
+        manifesto = {chave: valor for chave, valor in dados.items()
+                     if chave not in COLECOES_PARTICIONADAS}
+        manifesto['ultima_versao'] = ultima_versao
+        manifesto['particoes'] = particoes
+        estado = gravar_atomico(
+            self.caminho_manifesto,
+            lambda f: json.dump(manifesto, f, indent=2, ensure_ascii=False))
+        self.manifesto = manifesto
+
+        for colecao in COLECOES_PARTICIONADAS:
+            citados = {p['arquivo'] for p in particoes[colecao].values()}
+            for arquivo in os.listdir(os.path.join(self.pasta, colecao)):
+                if arquivo not in citados:
+                    self._cache.pop(arquivo, None)
+                    os.remove(self._caminho(colecao, arquivo))
+        return estado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Converte entre o arquivo único e a pasta com uma partição por mês")
+    parser.add_argument("acao", choices=['particionar', 'juntar'])
+    parser.add_argument("origem", help="finance_data.json (particionar) ou pasta (juntar)")
+    parser.add_argument("destino", help="pasta (particionar) ou arquivo .json (juntar)")
+    args = parser.parse_args()
+
+    from data_manager import DataManager
+    dm = DataManager(args.origem)
+    if args.acao == 'particionar':
+        if os.path.exists(args.destino) and os.listdir(args.destino):
+            parser.error(f"{args.destino} já existe e não está vazia")
+        os.makedirs(args.destino, exist_ok=True)
+        ArmazemMensal(args.destino).gravar(dm.data)
+        meses = len(posicoes_por_mes(dm.data['gastos']) | posicoes_por_mes(dm.data['rendimentos']))
+        print(f"✅ {args.origem} particionado em {args.destino} ({meses} meses)")
+    else:
+        with open(args.destino, 'w', encoding='utf-8') as f:
+            dm.exportar_json(f)
+        print(f"✅ {args.origem} gravado em {args.destino}")
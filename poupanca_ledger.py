@@ -0,0 +1,290 @@
+import numpy as np
+import pandas as pd
+
+from transaction_store import data_para_dia
+
+# Efeito de cada operação da poupança sobre o saldo
+SINAL_OPERACAO = {
+    'deposito': 1,
+    'saque': -1
+}
+
+
+class FenwickTree:
+    """Árvore de Fenwick (BIT) com somas de prefixo em O(log n)"""
+
+    def __init__(self, valores):
+        # Construção em O(n): arvore[i] = P[i] - P[i - lowbit(i)]
+        valores = np.asarray(valores, dtype=np.int64)
+        n = len(valores)
+        prefixo = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(valores, out=prefixo[1:])
+        i = np.arange(1, n + 1)
+        arvore = np.zeros(n + 1, dtype=np.int64)
+        arvore[1:] = prefixo[i] - prefixo[i - (i & -i)]
+        # Lista de ints Python: operações escalares mais rápidas que em NumPy
+        self.arvore = arvore.tolist()
+        self.tamanho = n
+
+    def somar(self, i, delta):
+        """Soma delta na posição i (base 0)"""
+        i += 1
+        while i <= self.tamanho:
+            self.arvore[i] += delta
+            i += i & -i
+
+    def prefixo(self, i):
+        """Soma das posições 0..i (inclusive)"""
+        i = min(i + 1, self.tamanho)
+        total = 0
+        while i > 0:
+            total += self.arvore[i]
+            i -= i & -i
+        return total
+
+
+class ArvoreMenorPrefixo:
+    """Árvore de segmentos com a soma e a menor soma de prefixo de cada trecho
+
+    Responde "menor soma de prefixo terminando na posição i ou depois"
+    em O(log n), com atualização pontual também em O(log n).
+    """
+
+    def __init__(self, valores):
+        valores = np.asarray(valores, dtype=np.int64)
+        folhas = 1
+        while folhas < max(len(valores), 1):
+            folhas *= 2
+        soma = np.zeros(2 * folhas, dtype=np.int64)
+        soma[folhas:folhas + len(valores)] = valores
+        minimo = soma.copy()
+        # Nível a nível, das folhas à raiz: min(esquerda, soma da esquerda + direita)
+        nivel = folhas // 2
+        while nivel:
+            esquerda, direita = slice(2 * nivel, 4 * nivel, 2), slice(2 * nivel + 1, 4 * nivel, 2)
+            soma[nivel:2 * nivel] = soma[esquerda] + soma[direita]
+            minimo[nivel:2 * nivel] = np.minimum(minimo[esquerda], soma[esquerda] + minimo[direita])
+            nivel //= 2
+        self.soma = soma.tolist()
+        self.minimo = minimo.tolist()
+        self.folhas = folhas
+
+    def somar(self, i, delta):
+        """Soma delta na posição i (base 0)"""
+        i += self.folhas
+        self.soma[i] += delta
+        self.minimo[i] = self.soma[i]
+        i //= 2
+        while i:
+            esquerda, direita = 2 * i, 2 * i + 1
+            self.soma[i] = self.soma[esquerda] + self.soma[direita]
+            self.minimo[i] = min(self.minimo[esquerda], self.soma[esquerda] + self.minimo[direita])
+            i //= 2
+
+    def menor_prefixo_desde(self, i):
+        """Menor soma das posições 0..j entre todos os j >= i"""
+        antes, trechos_esquerda, trechos_direita = 0, [], []
+        # Soma de 0..i-1: trechos à esquerda de i no caminho até a raiz
+        no = i + self.folhas
+        while no > 1:
+            if no & 1:
+                antes += self.soma[no - 1]
+            no //= 2
+        inicio, fim = i + self.folhas, 2 * self.folhas
+        while inicio < fim:
+            if inicio & 1:
+                trechos_esquerda.append(inicio)
+                inicio += 1
+            if fim & 1:
+                fim -= 1
+                trechos_direita.append(fim)
+            inicio //= 2
+            fim //= 2
+        menor, acumulado = None, antes
+        for no in trechos_esquerda + trechos_direita[::-1]:
+            candidato = acumulado + self.minimo[no]
+            menor = candidato if menor is None else min(menor, candidato)
+            acumulado += self.soma[no]
+        return menor
+
+
+class LedgerPoupanca:
+    """Histórico da poupança indexado por data
+
+    Os valores ficam em uma árvore de Fenwick sobre os dias, então
+    operações retroativas, correções e consultas de saldo em qualquer
+    data custam O(log n). A série de saldos por operação é recalculada
+    sob demanda, só quando o histórico mudou.
+    """
+
+    def __init__(self, historico):
+        # A lista do arquivo (poupanca.historico) é mantida pelo ledger
+        self.historico = historico
+        self._posicoes = {int(item['id']): i for i, item in enumerate(historico)}
+        self.itens = {int(item['id']): item for item in historico}
+        self._max_id = max(self.itens, default=0)
+        self._versao_serie = None
+        self.versao = 0
+        self._construir(self._dias_e_deltas())
+
+    def _dias_e_deltas(self):
+        """Dias (desde 1970-01-01) e valores com sinal de todos os itens"""
+        if not self.itens:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        itens = list(self.itens.values())
+        dias = np.array([item['data'] for item in itens],
+                        dtype='datetime64[D]').astype(np.int64)
+        deltas = np.array([_delta(item) for item in itens], dtype=np.int64)
+        return dias, deltas
+
+    def _construir(self, dias_deltas, margem=366):
+        """(Re)constrói a árvore cobrindo o intervalo de dias com folga"""
+        dias, deltas = dias_deltas
+        hoje = int(np.datetime64('today', 'D').astype(np.int64))
+        inicio = int(dias.min()) if len(dias) else hoje
+        fim = max(int(dias.max()) if len(dias) else hoje, hoje)
+        self.dia_base = inicio - margem
+        tamanho = fim - self.dia_base + 1 + margem
+        totais = np.zeros(tamanho, dtype=np.int64)
+        np.add.at(totais, dias - self.dia_base, deltas)
+        self.arvore = FenwickTree(totais)
+        self.arvore_minimos = ArvoreMenorPrefixo(totais)
+        self.total = int(deltas.sum()) if len(deltas) else 0
+
+    def _posicao(self, dia):
+        """Posição do dia na árvore, expandindo o intervalo se preciso"""
+        pos = dia - self.dia_base
+        if pos < 0 or pos >= self.arvore.tamanho:
+            dias, deltas = self._dias_e_deltas()
+            margem = max(366, self.arvore.tamanho)
+            self._construir(
+                (np.append(dias, dia), np.append(deltas, 0)), margem)
+            pos = dia - self.dia_base
+        return pos
+
+    def _somar(self, pos, delta):
+        self.arvore.somar(pos, delta)
+        self.arvore_minimos.somar(pos, delta)
+
+    @property
+    def proximo_id(self):
+        return self._max_id + 1
+
+    def adicionar(self, item):
+        """Registra uma operação em qualquer data — O(log n)"""
+        # Posição antes de registrar o item: uma expansão reconstrói a árvore
+        pos = self._posicao(data_para_dia(item['data']))
+        id_ = int(item['id'])
+        self.itens[id_] = item
+        self._posicoes[id_] = len(self.historico)
+        self.historico.append(item)
+        self._max_id = max(self._max_id, id_)
+        delta = _delta(item)
+        self._somar(pos, delta)
+        self.total += delta
+        self.versao += 1
+
+    def remover(self, id_):
+        """Remove uma operação — O(log n)
+
+        Na lista do histórico o último item ocupa o lugar do removido: a
+        ordem da lista não importa (a série é ordenada por data e id).
+        """
+        item = self.itens.pop(int(id_))
+        pos = self._posicoes.pop(int(id_))
+        ultimo = self.historico.pop()
+        if ultimo is not item:
+            self.historico[pos] = ultimo
+            self._posicoes[int(ultimo['id'])] = pos
+        delta = _delta(item)
+        self._somar(self._posicao(data_para_dia(item['data'])), -delta)
+        self.total -= delta
+        self.versao += 1
+        return item
+
+    def corrigir(self, id_, **campos):
+        """Altera data, valor ou operação de um item existente — O(log n)"""
+        item = self.itens[int(id_)]
+        pos_nova = self._posicao(data_para_dia(campos.get('data', item['data'])))
+        pos_antiga = self._posicao(data_para_dia(item['data']))
+        delta_antigo = _delta(item)
+
+        item.update(campos)
+        delta = _delta(item)
+        self._somar(pos_antiga, -delta_antigo)
+        self._somar(pos_nova, delta)
+        self.total += delta - delta_antigo
+        self.versao += 1
+        return item
+
+    def saldo_em(self, data):
+        """Saldo ao final do dia informado — O(log n)"""
+        pos = data_para_dia(data) - self.dia_base
+        if pos < 0:
+            return 0
+        return self.arvore.prefixo(pos)
+
+    def saldo_minimo_desde(self, data):
+        """Menor saldo ao final de um dia, da data em diante — O(log n)
+
+        É o maior saque possível na data: o saldo atual e o saldo na
+        própria data não bastam quando há operações depois dela (um saque
+        retroativo pode deixar negativo um dia no meio).
+        """
+        pos = max(data_para_dia(data) - self.dia_base, 0)
+        if pos >= self.arvore.tamanho:
+            return self.total
+        return self.arvore_minimos.menor_prefixo_desde(pos)
+
+    def saldo_minimo_corrigido(self, id_, **campos):
+        """saldo_minimo_desde como ficaria com a correção (a partir da data mais antiga afetada)"""
+        item = self.itens[int(id_)]
+        corrigido = {**item, **campos}
+        # Nova antes da antiga, como em corrigir: uma expansão reconstrói a árvore
+        pos_nova = self._posicao(data_para_dia(corrigido['data']))
+        pos_antiga = self._posicao(data_para_dia(item['data']))
+        # Aplica a correção só na árvore de mínimos, consulta e desfaz
+        self.arvore_minimos.somar(pos_antiga, -_delta(item))
+        self.arvore_minimos.somar(pos_nova, _delta(corrigido))
+        try:
+            return self.arvore_minimos.menor_prefixo_desde(min(pos_antiga, pos_nova))
+        finally:
+            self.arvore_minimos.somar(pos_nova, -_delta(corrigido))
+            self.arvore_minimos.somar(pos_antiga, _delta(item))
+
+    def saldo_minimo_sem(self, id_):
+        """saldo_minimo_desde como ficaria sem a operação (a partir da data dela)"""
+        item = self.itens[int(id_)]
+        pos = self._posicao(data_para_dia(item['data']))
+        # Retira a operação só da árvore de mínimos, consulta e devolve
+        self.arvore_minimos.somar(pos, -_delta(item))
+        try:
+            return self.arvore_minimos.menor_prefixo_desde(pos)
+        finally:
+            self.arvore_minimos.somar(pos, _delta(item))
+
+    def serie_saldos(self):
+        """DataFrame do histórico em ordem (data, id) com saldos recalculados"""
+        if self._versao_serie == self.versao:
+            return self._serie.copy(deep=False)
+
+        if not self.itens:
+            df = pd.DataFrame()
+        else:
+            df = pd.DataFrame(list(self.itens.values()))
+            df['data'] = pd.to_datetime(df['data'])
+            df = df.sort_values(['data', 'id'], kind='stable',
+                                ignore_index=True)
+            deltas = df['operacao'].map(SINAL_OPERACAO).fillna(
+                0).astype('int64') * df['valor_centavos']
+            df['saldo_atual_centavos'] = deltas.cumsum()
+            df['saldo_anterior_centavos'] = df['saldo_atual_centavos'] - deltas
+
+        self._serie = df
+        self._versao_serie = self.versao
+        return df.copy(deep=False)
+
+
+def _delta(item):
+    """Valor com sinal de uma operação (depósito soma, saque subtrai)"""
+    return SINAL_OPERACAO.get(item['operacao'], 0) * int(item['valor_centavos'])
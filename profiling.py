@@ -0,0 +1,148 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+import pandas as pd
+
+
+class Profiler:
+    """Coleta tempo de execução, número de chamadas e tamanho de DataFrames por rerun"""
+
+    def __init__(self, arquivo_metricas=None, max_bytes=5 * 1024 * 1024, backups=3):
+        self.padrao_ativo = os.environ.get('FINANCE_PROFILE', '0') == '1'
+        self.arquivo_metricas = arquivo_metricas or os.environ.get(
+            'FINANCE_METRICS_FILE', 'metrics.jsonl')
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._local = threading.local()
+        self._logger = None
+        self._lock = threading.Lock()
+
+    @property
+    def ativo(self):
+        """Indica se a coleta está ligada na thread (sessão) atual"""
+        return getattr(self._local, 'ativo', self.padrao_ativo)
+
+    def iniciar_rerun(self, ativo=None):
+        """Reinicia as métricas no começo de um rerun"""
+        self._local.ativo = self.padrao_ativo if ativo is None else bool(ativo)
+        self._local.metricas = {}
+        self._local.inicio = time.perf_counter()
+
+    def registrar(self, nome, duracao, linhas_entrada=0, linhas_saida=0):
+        """Acumula uma medição para o rerun atual"""
+        metricas = getattr(self._local, 'metricas', None)
+        if metricas is None:
+            metricas = self._local.metricas = {}
+        item = metricas.get(nome)
+        if item is None:
+            item = metricas[nome] = {
+                'chamadas': 0,
+                'tempo_ms': 0.0,
+                'linhas_entrada': 0,
+                'linhas_saida': 0
+            }
+        item['chamadas'] += 1
+        item['tempo_ms'] += duracao * 1000
+        item['linhas_entrada'] += linhas_entrada
+        item['linhas_saida'] += linhas_saida
+
+    def medir(self, nome):
+        """Decorador que mede a função quando o profiler está ativo"""
+        def decorador(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.ativo:
+                    return func(*args, **kwargs)
+
+                inicio = time.perf_counter()
+                resultado = func(*args, **kwargs)
+                duracao = time.perf_counter() - inicio
+
+                self.registrar(
+                    nome,
+                    duracao,
+                    _contar_linhas(args) + _contar_linhas(kwargs.values()),
+                    len(resultado) if isinstance(resultado, pd.DataFrame) else 0
+                )
+                return resultado
+            return wrapper
+        return decorador
+
+    def instrumentar(self, cls):
+        """Decorador de classe que mede todos os métodos públicos"""
+        for nome_attr, attr in list(vars(cls).items()):
+            if nome_attr.startswith('_'):
+                continue
+            nome = f"{cls.__name__}.{nome_attr}"
+            if isinstance(attr, staticmethod):
+                setattr(cls, nome_attr, staticmethod(
+                    self.medir(nome)(attr.__func__)))
+            elif isinstance(attr, classmethod):
+                setattr(cls, nome_attr, classmethod(
+                    self.medir(nome)(attr.__func__)))
+            elif callable(attr):
+                setattr(cls, nome_attr, self.medir(nome)(attr))
+        return cls
+
+    def resumo_df(self):
+        """Retorna as métricas do rerun atual como DataFrame"""
+        metricas = getattr(self._local, 'metricas', {})
+        if not metricas:
+            return pd.DataFrame()
+
+        df = pd.DataFrame.from_dict(metricas, orient='index')
+        df.index.name = 'funcao'
+        return df.reset_index().sort_values('tempo_ms', ascending=False)
+
+    def finalizar_rerun(self, gravar=True):
+        """Fecha o rerun atual e grava uma linha JSON no arquivo de métricas"""
+        if not self.ativo:
+            return None
+
+        inicio = getattr(self._local, 'inicio', None)
+        registro = {
+            'timestamp': datetime.now().isoformat(),
+            'duracao_total_ms': (time.perf_counter() - inicio) * 1000 if inicio else None,
+            'metricas': getattr(self._local, 'metricas', {})
+        }
+
+        if gravar and self.arquivo_metricas:
+            try:
+                self._obter_logger().info(json.dumps(registro, ensure_ascii=False))
+            except OSError as e:
+                print(f"Erro ao gravar métricas: {e}")
+
+        return registro
+
+    def _obter_logger(self):
+        """Cria sob demanda o logger com rotação por tamanho"""
+        with self._lock:
+            if self._logger is None:
+                logger = logging.getLogger(f'finance_metrics.{id(self)}')
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                handler = RotatingFileHandler(
+                    self.arquivo_metricas,
+                    maxBytes=self.max_bytes,
+                    backupCount=self.backups,
+                    encoding='utf-8'
+                )
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                logger.addHandler(handler)
+                self._logger = logger
+            return self._logger
+
+
+def _contar_linhas(valores):
+    """Soma o número de linhas dos DataFrames recebidos como argumento"""
+    return sum(len(v) for v in valores if isinstance(v, pd.DataFrame))
+
+
+# Instância global usada por todos os módulos
+perfil = Profiler()
@@ -0,0 +1,169 @@
+import argparse
+import html
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from calculations import FinanceCalculator
+from data_manager import DataManager
+from money import formatar_reais
+from visualizations import FinanceVisualizations
+
+# Tabelas gravadas em CSV para cada arquivo de dados
+TABELAS = ('resumo_mensal', 'gastos_por_categoria', 'rendimentos_por_fonte', 'orcado_realizado')
+
+_PAGINA = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>Relatório Financeiro — {titulo}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2rem auto; max-width: 1100px; color: #222; }}
+h1 {{ color: #1f77b4; }}
+table {{ border-collapse: collapse; margin-bottom: 1.5rem; }}
+th, td {{ border: 1px solid #ddd; padding: 0.3rem 0.8rem; text-align: right; }}
+th {{ background: #f0f2f6; }}
+</style>
+</head>
+<body>
+<h1>💰 Relatório Financeiro — {titulo}</h1>
+<p>Gerado em {gerado_em}</p>
+{resumo}
+{graficos}
+</body>
+</html>
+"""
+
+
+def montar_relatorio(dm):
+    """Tabelas e gráficos do relatório de um DataManager, sem Streamlit
+
+    Mesmos cálculos das seções de Relatórios do app: resumo mensal,
+    gastos por categoria, rendimentos por fonte e orçado x realizado.
+    """
+    calc = FinanceCalculator()
+    vis = FinanceVisualizations()
+    rendimentos_df = dm.get_rendimentos_df()
+    gastos_df = dm.get_gastos_df()
+
+    resumos_df = calc.calcular_resumos_mensais(rendimentos_df, gastos_df)
+    tabelas = {
+        'resumo_mensal': resumos_df,
+        'gastos_por_categoria': calc.calcular_gastos_por_categoria(gastos_df),
+        'rendimentos_por_fonte': calc.calcular_rendimentos_por_fonte(rendimentos_df),
+        'orcado_realizado': calc.comparar_orcamentos(gastos_df, dm.data['orcamentos'])
+    }
+
+    historico_poupanca = dm.get_poupanca_historico_df()
+    graficos = [
+        vis.plot_comparativo_mensal(resumos_df.to_dict('records')),
+        vis.plot_gastos_por_categoria(tabelas['gastos_por_categoria']),
+        vis.plot_rendimentos_por_fonte(tabelas['rendimentos_por_fonte']),
+        vis.plot_evolucao_poupanca(historico_poupanca) if not historico_poupanca.empty else None,
+        vis.plot_patrimonio(dm.get_patrimonio_df()),
+        vis.plot_orcado_realizado(tabelas['orcado_realizado'])
+    ]
+
+    totais = {
+        'total_rendimentos_centavos': int(resumos_df['total_rendimentos_centavos'].sum()),
+        'total_gastos_centavos': int(resumos_df['total_gastos_centavos'].sum()),
+        'saldo_poupanca_centavos': dm.get_saldo_poupanca_centavos()
+    }
+    return tabelas, [fig for fig in graficos if fig is not None], totais
+
+
+def _html_relatorio(titulo, totais, resumos_df, graficos, plotly_js):
+    """Página HTML única; com plotly_js='inline' abre sem rede (plotly.js embutido uma vez)"""
+    linhas = [
+        ('💵 Total Rendimentos', totais['total_rendimentos_centavos']),
+        ('💸 Total Gastos', totais['total_gastos_centavos']),
+        ('💰 Saldo Líquido', totais['total_rendimentos_centavos'] - totais['total_gastos_centavos']),
+        ('🏦 Poupança', totais['saldo_poupanca_centavos'])
+    ]
+    resumo = '<table>' + ''.join(
+        f'<tr><th>{rotulo}</th><td>{formatar_reais(valor)}</td></tr>' for rotulo, valor in linhas
+    ) + '</table>'
+    if not resumos_df.empty:
+        tabela = resumos_df[['mes_ano', 'total_rendimentos_centavos', 'total_gastos_centavos',
+                             'saldo_mensal_centavos']].copy()
+        for coluna in tabela.columns[1:]:
+            tabela[coluna] = tabela[coluna].apply(formatar_reais)
+        tabela.columns = ['Mês/Ano', 'Rendimentos', 'Gastos', 'Saldo']
+        resumo += tabela.to_html(index=False, escape=True)
+
+    partes = [fig.to_html(full_html=False, include_plotlyjs=plotly_js if i == 0 else False)
+              for i, fig in enumerate(graficos)]
+    return _PAGINA.format(titulo=html.escape(titulo), gerado_em=time.strftime('%Y-%m-%d %H:%M'),
+                          resumo=resumo, graficos='\n'.join(partes))
+
+
+def gerar_relatorio(caminho, pasta_saida, plotly_js='inline'):
+    """Grava os CSVs e o relatorio.html de um arquivo de dados (executado no processo trabalhador)"""
+    inicio = time.perf_counter()
+    try:
+        if not os.path.isfile(caminho):
+            # DataManager criaria dados vazios: aqui um arquivo ausente é erro
+            raise FileNotFoundError(f"arquivo não encontrado: {caminho}")
+        os.makedirs(pasta_saida, exist_ok=True)
+        dm = DataManager(caminho)
+        tabelas, graficos, totais = montar_relatorio(dm)
+
+        for nome in TABELAS:
+            if not tabelas[nome].empty:
+                tabelas[nome].to_csv(os.path.join(pasta_saida, f'{nome}.csv'), index=False)
+
+        pagina = _html_relatorio(os.path.basename(caminho), totais, tabelas['resumo_mensal'],
+                                 graficos, plotly_js)
+        with open(os.path.join(pasta_saida, 'relatorio.html'), 'w', encoding='utf-8') as f:
+            f.write(pagina)
+
+        return {'arquivo': caminho, 'pasta': pasta_saida, 'erro': None, 'graficos': len(graficos),
+                'duracao_s': time.perf_counter() - inicio, **totais}
+    except Exception as e:
+        return {'arquivo': caminho, 'pasta': pasta_saida, 'erro': str(e),
+                'duracao_s': time.perf_counter() - inicio}
+
+
+def pastas_de_saida(caminhos, pasta_saida):
+    """Uma subpasta por arquivo de dados, com o nome do arquivo (sufixo em nomes repetidos)"""
+    usados = {}
+    pastas = []
+    for caminho in caminhos:
+        nome = os.path.splitext(os.path.basename(caminho))[0]
+        usados[nome] = usados.get(nome, 0) + 1
+        if usados[nome] > 1:
+            nome = f'{nome}_{usados[nome]}'
+        pastas.append(os.path.join(pasta_saida, nome))
+    return pastas
+
+
+def gerar_relatorios(caminhos, pasta_saida, processos=None, plotly_js='inline'):
+    """Relatórios de vários arquivos em paralelo, um arquivo por tarefa do pool"""
+    caminhos = list(caminhos)
+    pastas = pastas_de_saida(caminhos, pasta_saida)
+    if len(caminhos) == 1 or processos == 1:
+        return [gerar_relatorio(c, p, plotly_js) for c, p in zip(caminhos, pastas)]
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        return list(executor.map(gerar_relatorio, caminhos, pastas,
+                                 [plotly_js] * len(caminhos)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Gera relatórios (CSV e HTML) de um ou vários arquivos de dados, sem o app")
+    parser.add_argument("arquivos", nargs='+', help="Arquivos finance_data.json")
+    parser.add_argument("-o", "--saida", default='relatorios',
+                        help="Pasta de saída (uma subpasta por arquivo)")
+    parser.add_argument("-p", "--processos", type=int, default=None,
+                        help="Processos em paralelo (padrão: número de núcleos)")
+    parser.add_argument("--plotly-js", choices=['inline', 'cdn'], default='inline',
+                        help="inline embute o plotly.js (HTML abre sem rede); cdn gera arquivos menores")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    resultados = gerar_relatorios(args.arquivos, args.saida, args.processos, args.plotly_js)
+    erros = [r for r in resultados if r['erro']]
+    for r in erros:
+        print(f"❌ {r['arquivo']}: {r['erro']}")
+    print(f"✅ {len(resultados) - len(erros)} relatórios gravados em {args.saida} "
+          f"({time.perf_counter() - inicio:.1f} s)")
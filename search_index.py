@@ -0,0 +1,139 @@
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+import numpy as np
+
+PADRAO_TOKEN = re.compile(r'\w+')
+
+# Compacta a lista de um texto quando 1/FRACAO_COMPACTAR dela são lápides
+FRACAO_COMPACTAR = 4
+
+
+def normalizar_texto(texto):
+    """Minúsculas e sem acentos ('Educação' -> 'educacao')"""
+    decomposto = unicodedata.normalize('NFKD', str(texto or ''))
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def tokenizar(texto):
+    """Quebra o texto normalizado em palavras (emojis e pontuação são ignorados)"""
+    return PADRAO_TOKEN.findall(normalizar_texto(texto))
+
+
+class IndiceBusca:
+    """Índice invertido sobre os textos de uma coleção de transações
+
+    Como descrições e rótulos se repetem muito, o índice é feito sobre os
+    textos distintos: cada palavra aponta para os textos que a contêm e
+    cada texto guarda os ids (int64) das transações que o usam. Uma busca
+    resolve os prefixos no vocabulário ordenado e só então junta os ids.
+
+    Remoções não varrem a lista do texto (a de uma categoria tem todas as
+    transações dela): o id vai para as lápides do texto, filtradas na
+    busca, e a lista é compactada quando as lápides passam de uma fração.
+    """
+
+    def __init__(self, campos):
+        self.campos = tuple(campos)
+        self._textos_por_token = {}
+        self._tokens_ordenados = []
+        self._ids_por_texto = {}
+        # (campo, texto) -> ids removidos que ainda estão na lista do texto
+        self._lapides = {}
+
+    def construir(self, grupos):
+        """Carga (ou acréscimo em lote) a partir de {campo: {texto: array de ids}}"""
+        for campo, por_texto in grupos.items():
+            for texto, ids in por_texto.items():
+                self._registrar_texto(campo, texto)
+                if (campo, texto) in self._lapides:
+                    self._compactar((campo, texto))
+                self._ids_por_texto[(campo, texto)].frombytes(
+                    np.ascontiguousarray(ids, dtype=np.int64).tobytes())
+
+    def _registrar_texto(self, campo, texto):
+        """Associa as palavras de um texto novo ao próprio texto"""
+        chave = (campo, texto)
+        if chave in self._ids_por_texto:
+            return
+        self._ids_por_texto[chave] = array('q')
+        for token in set(tokenizar(texto)):
+            textos = self._textos_por_token.get(token)
+            if textos is None:
+                textos = self._textos_por_token[token] = set()
+                self._tokens_ordenados.insert(
+                    bisect_left(self._tokens_ordenados, token), token)
+            textos.add(chave)
+
+    def adicionar(self, registro):
+        """Indexa uma transação nova"""
+        id_ = int(registro['id'])
+        for campo in self.campos:
+            chave = (campo, registro.get(campo) or '')
+            self._registrar_texto(*chave)
+            lapides = self._lapides.get(chave)
+            if lapides is not None and id_ in lapides:
+                # Ainda está na lista: basta tirar a lápide (ex.: edição sem trocar o texto)
+                lapides.discard(id_)
+            else:
+                self._ids_por_texto[chave].append(id_)
+
+    def remover(self, registro):
+        """Retira uma transação do índice — O(1) amortizado"""
+        id_ = int(registro['id'])
+        for campo in self.campos:
+            chave = (campo, registro.get(campo) or '')
+            ids = self._ids_por_texto.get(chave)
+            if ids is None:
+                continue
+            lapides = self._lapides.setdefault(chave, set())
+            lapides.add(id_)
+            if len(lapides) * FRACAO_COMPACTAR >= len(ids):
+                self._compactar(chave)
+
+    def _compactar(self, chave):
+        """Reescreve a lista do texto sem os ids removidos"""
+        lapides = self._lapides.pop(chave)
+        ids = np.frombuffer(self._ids_por_texto[chave], dtype=np.int64)
+        vivos = ids[~np.isin(ids, np.fromiter(lapides, dtype=np.int64, count=len(lapides)))]
+        self._ids_por_texto[chave] = array('q', vivos.tobytes())
+
+    def _ids(self, chave):
+        """Ids vivos de um texto"""
+        ids = np.frombuffer(self._ids_por_texto[chave], dtype=np.int64)
+        lapides = self._lapides.get(chave)
+        if lapides:
+            ids = ids[~np.isin(ids, np.fromiter(lapides, dtype=np.int64, count=len(lapides)))]
+        return ids
+
+    def _textos_com_prefixo(self, prefixo):
+        """Textos que contêm alguma palavra começando pelo prefixo"""
+        textos = set()
+        i = bisect_left(self._tokens_ordenados, prefixo)
+        while i < len(self._tokens_ordenados) and self._tokens_ordenados[i].startswith(prefixo):
+            textos |= self._textos_por_token[self._tokens_ordenados[i]]
+            i += 1
+        return textos
+
+    def buscar(self, consulta):
+        """Ids das transações que contêm todos os termos (como prefixo)"""
+        termos = tokenizar(consulta)
+        if not termos:
+            return None
+
+        resultado = None
+        # Termos mais seletivos primeiro: a interseção encolhe mais rápido
+        conjuntos = sorted((self._textos_com_prefixo(t)
+                           for t in set(termos)), key=len)
+        for textos in conjuntos:
+            if not textos:
+                return np.zeros(0, dtype=np.int64)
+            ids = np.unique(np.concatenate(
+                [self._ids(t) for t in textos]))
+            resultado = ids if resultado is None else np.intersect1d(
+                resultado, ids, assume_unique=True)
+            if len(resultado) == 0:
+                break
+        return resultado
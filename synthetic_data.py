@@ -0,0 +1,266 @@
+import argparse
+import json
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+# Categorias com peso relativo e parâmetros da distribuição log-normal do valor
+CATEGORIAS_GASTOS = {
+    "🏠 Moradia": (0.04, 5.5, 0.6),
+    "🍽️ Alimentação": (0.30, 3.5, 0.8),
+    "🚗 Transporte": (0.15, 3.2, 0.7),
+    "💊 Saúde": (0.05, 4.2, 0.9),
+    "🎓 Educação": (0.04, 5.0, 0.7),
+    "🎬 Lazer": (0.12, 3.8, 0.8),
+    "👕 Vestuário": (0.06, 4.3, 0.7),
+    "📱 Tecnologia": (0.03, 5.2, 1.0),
+    "💡 Utilidades": (0.08, 4.5, 0.5),
+    "🎁 Presentes": (0.04, 4.0, 0.8),
+    "📄 Documentos": (0.02, 3.9, 0.6),
+    "🔧 Outros": (0.07, 3.7, 1.0)
+}
+
+DESCRICOES_GASTOS = {
+    "🏠 Moradia": ["Aluguel", "Condomínio", "IPTU", "Manutenção"],
+    "🍽️ Alimentação": ["Mercado", "Restaurante", "Padaria", "iFood", "Feira"],
+    "🚗 Transporte": ["Uber", "Combustível", "Ônibus", "Estacionamento"],
+    "💊 Saúde": ["Farmácia", "Consulta", "Plano de saúde", "Exames"],
+    "🎓 Educação": ["Mensalidade faculdade", "Curso online", "Livros"],
+    "🎬 Lazer": ["Cinema", "Streaming", "Show", "Viagem"],
+    "👕 Vestuário": ["Roupas", "Calçados", "Acessórios"],
+    "📱 Tecnologia": ["Celular", "Notebook", "Assinatura software"],
+    "💡 Utilidades": ["Conta de luz", "Conta de água", "Internet", "Gás"],
+    "🎁 Presentes": ["Presente aniversário", "Presente Natal"],
+    "📄 Documentos": ["Cartório", "Taxas", "Passaporte"],
+    "🔧 Outros": ["Mensalidade Academia", "Fatura Nubank", "Diversos"]
+}
+
+# Gastos recorrentes mensais: (categoria, descrição, valor, dia do mês)
+GASTOS_RECORRENTES = [
+    ("🏠 Moradia", "Aluguel", 450.0, 6),
+    ("🎓 Educação", "Mensalidade faculdade", 200.0, 6),
+    ("🔧 Outros", "Mensalidade Academia", 62.0, 12)
+]
+
+FONTES_RENDIMENTOS = {
+    "Salário": (0.55, 7.7, 0.05),
+    "Freelance": (0.30, 6.3, 0.7),
+    "Investimentos": (0.10, 4.5, 0.9),
+    "Outros": (0.05, 4.8, 1.0)
+}
+
+# Período padrão fixo para que a mesma seed gere sempre o mesmo arquivo
+DATA_FIM_PADRAO = date(2025, 12, 31)
+
+OBJETIVOS = [
+    ("Reserva de emergência", 15000.0, 24),
+    ("Viagem", 8000.0, 12),
+    ("Carro", 45000.0, 48),
+    ("Casa", 120000.0, 120)
+]
+
+
+def gerar_dados_sinteticos(n_transacoes, seed=42, data_inicio=None, data_fim=None):
+    """Gera dados sintéticos no formato do finance_data.json"""
+    return {
+        chave: (list(valor) if chave in ('rendimentos', 'gastos') else valor)
+        for chave, valor in _gerar_colecoes(n_transacoes, seed, data_inicio, data_fim).items()
+    }
+
+
+def escrever_dados_sinteticos(caminho, n_transacoes, seed=42, data_inicio=None, data_fim=None):
+    """Grava os dados sintéticos em disco registro a registro, sem montar o JSON em memória"""
+    colecoes = _gerar_colecoes(n_transacoes, seed, data_inicio, data_fim)
+
+    with open(caminho, 'w', encoding='utf-8') as f:
+        f.write('{\n')
+        for chave in ('rendimentos', 'gastos'):
+            f.write(f'  "{chave}": [')
+            primeiro = True
+            for registro in colecoes[chave]:
+                f.write('\n    ' if primeiro else ',\n    ')
+                f.write(json.dumps(registro, ensure_ascii=False))
+                primeiro = False
+            f.write('\n  ],\n')
+        f.write('  "poupanca": ')
+        f.write(json.dumps(colecoes['poupanca'], ensure_ascii=False))
+        f.write(',\n  "objetivos": ')
+        f.write(json.dumps(colecoes['objetivos'], ensure_ascii=False))
+        f.write('\n}\n')
+
+    return caminho
+
+
+def _gerar_colecoes(n_transacoes, seed, data_inicio, data_fim):
+    """Distribui as transações entre rendimentos, gastos e poupança"""
+    rng = np.random.default_rng(seed)
+    data_fim = data_fim or DATA_FIM_PADRAO
+    data_inicio = data_inicio or data_fim - timedelta(days=5 * 365)
+    dias_totais = max((data_fim - data_inicio).days, 1)
+
+    n_poupanca = max(int(n_transacoes * 0.05), 1)
+    n_rendimentos = max(int(n_transacoes * 0.10), 1)
+    n_gastos = max(n_transacoes - n_poupanca - n_rendimentos, 1)
+
+    return {
+        'rendimentos': _gerar_rendimentos(rng, n_rendimentos, data_inicio, dias_totais),
+        'gastos': _gerar_gastos(rng, n_gastos, data_inicio, dias_totais),
+        'poupanca': _gerar_poupanca(rng, n_poupanca, data_inicio, dias_totais),
+        'objetivos': _gerar_objetivos(data_inicio)
+    }
+
+
+def _datas_ordenadas(rng, n, data_inicio, dias_totais):
+    """Sorteia n datas dentro do período, em ordem cronológica"""
+    offsets = np.sort(rng.integers(0, dias_totais + 1, size=n))
+    base = np.datetime64(data_inicio, 'D')
+    return (base + offsets).astype(str)
+
+
+def _timestamp(data_str, segundos):
+    """Monta um timestamp ISO a partir da data e de um deslocamento em segundos"""
+    return (datetime.fromisoformat(data_str) + timedelta(seconds=int(segundos))).isoformat()
+
+
+def _gerar_rendimentos(rng, n, data_inicio, dias_totais):
+    """Gera rendimentos com fontes e valores sorteados"""
+    fontes = list(FONTES_RENDIMENTOS)
+    pesos = np.array([FONTES_RENDIMENTOS[f][0] for f in fontes])
+    idx_fontes = rng.choice(len(fontes), size=n, p=pesos / pesos.sum())
+    mu = np.array([FONTES_RENDIMENTOS[f][1] for f in fontes])[idx_fontes]
+    sigma = np.array([FONTES_RENDIMENTOS[f][2] for f in fontes])[idx_fontes]
+    centavos = np.rint(rng.lognormal(mu, sigma) * 100).astype(np.int64)
+    datas = _datas_ordenadas(rng, n, data_inicio, dias_totais)
+    segundos = rng.integers(0, 86400, size=n)
+
+    for i in range(n):
+        yield {
+            'id': i + 1,
+            'fonte': fontes[idx_fontes[i]],
+            'valor_centavos': int(centavos[i]),
+            'data': datas[i],
+            'descricao': '',
+            'timestamp': _timestamp(datas[i], segundos[i])
+        }
+
+
+def _gerar_gastos(rng, n, data_inicio, dias_totais):
+    """Gera gastos avulsos e recorrentes mensais"""
+    meses = max(dias_totais // 30, 1)
+    n_recorrentes = min(meses * len(GASTOS_RECORRENTES), n // 2)
+    n_avulsos = n - n_recorrentes
+
+    categorias = list(CATEGORIAS_GASTOS)
+    pesos = np.array([CATEGORIAS_GASTOS[c][0] for c in categorias])
+    idx_categorias = rng.choice(
+        len(categorias), size=n_avulsos, p=pesos / pesos.sum())
+    mu = np.array([CATEGORIAS_GASTOS[c][1] for c in categorias])[idx_categorias]
+    sigma = np.array([CATEGORIAS_GASTOS[c][2]
+                     for c in categorias])[idx_categorias]
+    centavos = np.rint(rng.lognormal(mu, sigma) * 100).astype(np.int64)
+    idx_descricoes = rng.integers(0, 1 << 16, size=n_avulsos)
+    datas = _datas_ordenadas(rng, n_avulsos, data_inicio, dias_totais)
+
+    # Recorrentes: um lançamento por mês para cada item
+    inicio = np.datetime64(data_inicio, 'M')
+    recorrentes = []
+    for k in range(n_recorrentes):
+        categoria, descricao, valor, dia = GASTOS_RECORRENTES[k % len(
+            GASTOS_RECORRENTES)]
+        mes = inicio + k // len(GASTOS_RECORRENTES)
+        data_str = str(mes.astype('datetime64[D]') + (dia - 1))
+        recorrentes.append(
+            (data_str, categoria, descricao, int(round(valor * 100))))
+
+    avulsos = (
+        (datas[i], categorias[idx_categorias[i]],
+         DESCRICOES_GASTOS[categorias[idx_categorias[i]]][idx_descricoes[i] % len(
+             DESCRICOES_GASTOS[categorias[idx_categorias[i]]])],
+         int(centavos[i]))
+        for i in range(n_avulsos)
+    )
+
+    segundos = rng.integers(0, 86400, size=n)
+    for i, (data_str, categoria, descricao, valor_centavos) in enumerate(_intercalar(avulsos, recorrentes)):
+        yield {
+            'id': i + 1,
+            'categoria': categoria,
+            'valor_centavos': valor_centavos,
+            'data': data_str,
+            'descricao': descricao,
+            'timestamp': _timestamp(data_str, segundos[i])
+        }
+
+
+def _intercalar(avulsos, recorrentes):
+    """Intercala duas sequências já ordenadas por data"""
+    recorrentes = iter(recorrentes)
+    proximo = next(recorrentes, None)
+    for item in avulsos:
+        while proximo is not None and proximo[0] <= item[0]:
+            yield proximo
+            proximo = next(recorrentes, None)
+        yield item
+    while proximo is not None:
+        yield proximo
+        proximo = next(recorrentes, None)
+
+
+def _gerar_poupanca(rng, n, data_inicio, dias_totais):
+    """Gera o histórico da poupança com saldo consistente (sem saldo negativo)"""
+    datas = _datas_ordenadas(rng, n, data_inicio, dias_totais)
+    centavos = np.rint(rng.lognormal(6.5, 0.6, size=n) * 100).astype(np.int64)
+    saques = rng.random(n) < 0.2
+    segundos = rng.integers(0, 86400, size=n)
+
+    historico = []
+    saldo = 0
+    for i in range(n):
+        valor = int(centavos[i])
+        operacao = 'saque' if saques[i] and valor <= saldo else 'deposito'
+        saldo = saldo + valor if operacao == 'deposito' else saldo - valor
+        historico.append({
+            'id': i + 1,
+            'operacao': operacao,
+            'valor_centavos': valor,
+            'data': datas[i],
+            'descricao': 'Aporte mensal' if operacao == 'deposito' else 'Resgate',
+            'timestamp': _timestamp(datas[i], segundos[i])
+        })
+
+    return {
+        'saldo_atual_centavos': saldo,
+        'historico': historico,
+        'taxa_cdi': 13.75
+    }
+
+
+def _gerar_objetivos(data_inicio):
+    """Gera a lista fixa de objetivos"""
+    return [
+        {
+            'id': i + 1,
+            'nome': nome,
+            'valor_meta': valor_meta,
+            'prazo_meses': prazo,
+            'descricao': '',
+            'data_criacao': data_inicio.strftime('%Y-%m-%d'),
+            'ativo': True
+        }
+        for i, (nome, valor_meta, prazo) in enumerate(OBJETIVOS)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Gera um finance_data.json sintético")
+    parser.add_argument("saida", help="Arquivo JSON de saída")
+    parser.add_argument("-n", "--transacoes", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-fim", type=date.fromisoformat,
+                        default=DATA_FIM_PADRAO, help="Última data (AAAA-MM-DD)")
+    args = parser.parse_args()
+
+    escrever_dados_sinteticos(
+        args.saida, args.transacoes, args.seed, data_fim=args.data_fim)
+    print(f"✅ {args.transacoes} transações gravadas em {args.saida}")
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from data_manager import DataManager
+from search_index import normalizar_texto
+
+# Memória padrão para DataManagers carregados no processo
+ORCAMENTO_MEMORIA_PADRAO_MB = 512
+
+# Inquilinos sem acesso há mais tempo que isso são descarregados
+OCIOSIDADE_MAXIMA_S = 30 * 60
+
+
+def caminho_usuario(pasta, usuario):
+    """Arquivo de dados de um usuário: nome legível + hash (sem colisões nem '../')"""
+    legivel = re.sub(r'[^a-z0-9]+', '_', normalizar_texto(usuario)).strip('_')[:40] or 'usuario'
+    sufixo = hashlib.blake2b(str(usuario).encode('utf-8'), digest_size=6).hexdigest()
+    return os.path.join(pasta, f'{legivel}_{sufixo}.json')
+
+
+class PoolDataManagers:
+    """DataManagers carregados por usuário, com LRU e orçamento de memória
+
+    Um usuário frequente é atendido da memória; um usuário frio é só um
+    arquivo em disco até o primeiro acesso. Ao passar do orçamento (ou da
+    ociosidade máxima) os menos recentes são gravados e descarregados. O
+    pool é compartilhado entre as sessões do processo e protegido por
+    lock; cada rerun deve pedir o DataManager de novo com obter().
+    """
+
+    def __init__(self, pasta, orcamento_bytes=ORCAMENTO_MEMORIA_PADRAO_MB * 1024 * 1024,
+                 ociosidade_maxima=OCIOSIDADE_MAXIMA_S, fabrica=DataManager):
+        self.pasta = pasta
+        self.orcamento_bytes = orcamento_bytes
+        self.ociosidade_maxima = ociosidade_maxima
+        self.fabrica = fabrica
+        # usuario -> (DataManager, memória estimada, último acesso)
+        self._carregados = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(pasta, exist_ok=True)
+
+    def obter(self, usuario):
+        """DataManager do usuário, carregando do disco se não estiver em memória"""
+        with self._lock:
+            agora = time.monotonic()
+            if usuario in self._carregados:
+                dm, memoria, _ = self._carregados.pop(usuario)
+            else:
+                dm = self.fabrica(caminho_usuario(self.pasta, usuario))
+                memoria = dm.memoria_bytes()
+            # Mais recente no fim
+            self._carregados[usuario] = (dm, memoria, agora)
+            self._descarregar_excedentes(agora, manter=usuario)
+            return dm
+
+    def atualizar_memoria(self, usuario):
+        """Reestima a memória de um usuário depois de uma carga grande (importação, mescla)"""
+        with self._lock:
+            if usuario in self._carregados:
+                dm, _, acesso = self._carregados[usuario]
+                self._carregados[usuario] = (dm, dm.memoria_bytes(), acesso)
+                self._descarregar_excedentes(time.monotonic(), manter=usuario)
+
+    def memoria_total(self):
+        return sum(memoria for _, memoria, _ in self._carregados.values())
+
+    def _reestimar_sob_demanda(self):
+        """Usuários carregados só com o cabeçalho (memória 0) que já leram as transações"""
+        for usuario, (dm, memoria, acesso) in list(self._carregados.items()):
+            if not memoria and dm.transacoes_carregadas:
+                self._carregados[usuario] = (dm, dm.memoria_bytes(), acesso)
+
+    def _descarregar_excedentes(self, agora, manter):
+        """Descarrega do menos recente para o mais recente enquanto houver excesso"""
+        self._reestimar_sob_demanda()
+        for usuario in list(self._carregados):
+            if usuario == manter:
+                continue
+            _, _, acesso = self._carregados[usuario]
+            ocioso = agora - acesso > self.ociosidade_maxima
+            if not ocioso and self.memoria_total() <= self.orcamento_bytes:
+                # O restante é mais recente: nem ocioso nem necessário liberar
+                break
+            self._descarregar(usuario)
+
+    def _descarregar(self, usuario):
+        """Grava alterações pendentes e tira o usuário da memória"""
+        dm, _, _ = self._carregados[usuario]
+        if not dm.flush():
+            # Sem conseguir gravar, mantém em memória para não perder dados
+            self._carregados.move_to_end(usuario)
+            return False
+        del self._carregados[usuario]
+        return True
+
+    def descarregar_todos(self):
+        """Grava e descarrega todos os usuários (encerramento do processo)"""
+        with self._lock:
+            for usuario in list(self._carregados):
+                self._descarregar(usuario)
+
+    def estatisticas(self):
+        """Usuários em memória, memória estimada e orçamento"""
+        with self._lock:
+            return {
+                'usuarios_carregados': len(self._carregados),
+                'memoria_bytes': self.memoria_total(),
+                'orcamento_bytes': self.orcamento_bytes
+            }
@@ -0,0 +1,15 @@
+from datetime import date
+
+from data_manager import DataManager
+
+
+def test_gasto_corrigido_e_pontuado_na_nova_categoria(tmp_path):
+    dm = DataManager(str(tmp_path / 'dados.json'))
+    for dia in range(1, 21):
+        dm.add_gasto('🍔 Alimentação', 30 + dia % 7, date(2024, 5, dia), 'Almoço')
+    dm.add_gasto('🔧 Outros', 2500, date(2024, 5, 21), 'Jantar de aniversário')
+    gasto_id = int(dm.get_gastos_df()['id'].max())
+    assert gasto_id not in dm.get_anomalias_df()['id'].tolist()
+
+    assert dm.corrigir_categoria_gasto(gasto_id, '🍔 Alimentação')
+    assert gasto_id in dm.get_anomalias_df()['id'].tolist()
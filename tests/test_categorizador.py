@@ -0,0 +1,33 @@
+from datetime import date
+
+from data_manager import DataManager
+
+
+def _modelo(dm):
+    return dm.categorizador.estado()['frases']
+
+
+def test_gasto_removido_sai_do_modelo(tmp_path):
+    dm = DataManager(str(tmp_path / 'dados.json'))
+    dm.add_gasto('🍔 Alimentação', 30, date(2024, 5, 10), 'Padaria Pão Quente')
+    dm.add_gasto('🍔 Alimentação', 25, date(2024, 5, 11), 'Padaria Pão Quente')
+    gasto_id = int(dm.get_gastos_df()['id'].iloc[0])
+
+    assert dm.delete_gasto(gasto_id)
+    assert _modelo(dm) == {'padaria pao quente': {'🍔 Alimentação': 1}}
+
+    assert dm.delete_gasto(gasto_id + 1)
+    assert _modelo(dm) == {}
+    assert dm.categorizador.classificar('Padaria Pão Quente') == (None, 0.0)
+    # O modelo gravado também esquece
+    assert _modelo(DataManager(dm.data_file)) == {}
+
+
+def test_correcao_de_categoria_move_a_contagem(tmp_path):
+    dm = DataManager(str(tmp_path / 'dados.json'))
+    dm.add_gasto('🔧 Outros', 90, date(2024, 5, 10), 'Farmácia Central')
+    gasto_id = int(dm.get_gastos_df()['id'].iloc[0])
+
+    assert dm.corrigir_categoria_gasto(gasto_id, '💊 Saúde')
+    assert _modelo(dm) == {'farmacia central': {'💊 Saúde': 1}}
+    assert dm.categorizador.classificar('Farmácia Central')[0] == '💊 Saúde'
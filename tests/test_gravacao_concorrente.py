@@ -0,0 +1,53 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from data_manager import DataManager
+
+RODADAS = 15
+POR_RODADA = 20
+
+
+def _gravador(caminho, nome):
+    """Processo de importação: relê o arquivo, importa gastos e grava, várias vezes"""
+    gravados = 0
+    for rodada in range(RODADAS):
+        dm = DataManager(caminho, pasta_backups=os.path.join(os.path.dirname(caminho), 'bk'))
+        gastos = pd.DataFrame({
+            'categoria': [nome] * POR_RODADA,
+            'valor': [1.0 + rodada] * POR_RODADA,
+            'data': ['2024-05-10'] * POR_RODADA,
+            'descricao': [f'{nome} {rodada}'] * POR_RODADA
+        })
+        if dm.importar_gastos(gastos):
+            gravados += POR_RODADA
+    return gravados
+
+
+def _verificar(caminho, pasta):
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        gravados = sum(executor.map(_gravador, [caminho] * 2, ['A', 'B']))
+
+    # O arquivo final é íntegro e tem exatamente o que os dois processos gravaram
+    dm = DataManager(caminho, sob_demanda=False)
+    assert gravados > 0
+    assert len(dm.data['gastos']) == gravados
+    ids = dm.data['gastos'].visao_colunas()['id']
+    assert len(set(ids.tolist())) == len(ids)
+    temporarios = [nome for _, _, nomes in os.walk(pasta) for nome in nomes
+                   if nome.endswith('.tmp')]
+    assert temporarios == []
+
+
+def test_dois_processos_gravando_o_arquivo_unico(tmp_path):
+    caminho = str(tmp_path / 'dados.json')
+    assert DataManager(caminho).save_data()
+    _verificar(caminho, tmp_path)
+
+
+def test_dois_processos_gravando_a_pasta_particionada(tmp_path):
+    caminho = str(tmp_path / 'dados')
+    os.makedirs(caminho)
+    assert DataManager(caminho, particionado=True).save_data()
+    _verificar(caminho, tmp_path)
@@ -0,0 +1,164 @@
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+import ingest_server
+from data_manager import DataManager
+from ingest_server import ServidorIngestao
+
+
+@pytest.fixture
+def servidor(tmp_path):
+    caminho = str(tmp_path / 'dados.json')
+    servidores = []
+
+    def criar(**opcoes):
+        srv = ServidorIngestao(DataManager(caminho), porta=0, **opcoes)
+        # Conta os pedidos que já passaram pela validação e entraram na fila
+        srv.enfileirados = threading.Semaphore(0)
+        enfileirar = srv.enfileirar
+
+        def contar(tipo, corpo):
+            pedido = enfileirar(tipo, corpo)
+            srv.enfileirados.release()
+            return pedido
+
+        srv.enfileirar = contar
+        srv.iniciar()
+        servidores.append(srv)
+        return srv
+
+    yield criar
+    for srv in servidores:
+        srv.encerrar()
+
+
+def _post(srv, rota, corpo, cabecalhos=None):
+    """(status, corpo da resposta, cabeçalhos)"""
+    conexao = http.client.HTTPConnection(*srv.endereco, timeout=30)
+    try:
+        conteudo = json.dumps(corpo).encode('utf-8') if corpo is not None else b''
+        conexao.request('POST', rota, body=conteudo, headers={
+            'Content-Type': 'application/json', 'Content-Length': str(len(conteudo)),
+            **(cabecalhos or {})})
+        resposta = conexao.getresponse()
+        return resposta.status, json.loads(resposta.read() or b'null'), dict(resposta.getheaders())
+    finally:
+        conexao.close()
+
+
+def _gastos(n, descricao='Mercado'):
+    return [{'categoria': '🍔 Alimentação', 'valor': 10.5, 'data': '2024-05-10',
+             'descricao': descricao}] * n
+
+
+def _em_thread(funcao, *args):
+    resultado = {}
+    thread = threading.Thread(target=lambda: resultado.setdefault('valor', funcao(*args)))
+    thread.start()
+    return thread, resultado
+
+
+def _esperar_fila_vazia(srv):
+    prazo = time.monotonic() + 5
+    while srv.fila.qsize() and time.monotonic() < prazo:
+        time.sleep(0.005)
+    # O gravador já tirou o pedido: dá tempo de ele parar na trava
+    time.sleep(0.05)
+
+
+def test_pedidos_simultaneos_saem_em_poucos_lotes(servidor):
+    srv = servidor()
+    pedidos = 12
+    with srv._lock:
+        # Gravador parado: os pedidos se acumulam na fila
+        threads = [_em_thread(_post, srv, '/gastos', _gastos(5, f'Mercado {i}'))
+                   for i in range(pedidos)]
+        for _ in range(pedidos):
+            assert srv.enfileirados.acquire(timeout=10)
+    for thread, _ in threads:
+        thread.join()
+
+    assert [resultado['valor'][0] for _, resultado in threads] == [201] * pedidos
+    ids = sorted(i for _, resultado in threads for i in resultado['valor'][1]['ids'])
+    assert ids == list(range(ids[0], ids[0] + 5 * pedidos))
+    estatisticas = srv.status()
+    assert estatisticas['pedidos'] == pedidos
+    assert estatisticas['lotes'] < pedidos
+    assert len(DataManager(srv.dm.data_file).get_gastos_df()) == 5 * pedidos
+
+
+def test_fila_cheia_recebe_503(servidor, monkeypatch):
+    monkeypatch.setattr(ingest_server, 'ESPERA_FILA_S', 0.05)
+    monkeypatch.setattr(ingest_server, 'JANELA_LOTE_S', 0.0)
+    srv = servidor(fila_maxima=1)
+    with srv._lock:
+        # O primeiro fica com o gravador (parado na trava), o segundo ocupa a fila
+        primeiro = _em_thread(_post, srv, '/gastos', _gastos(1))
+        assert srv.enfileirados.acquire(timeout=10)
+        _esperar_fila_vazia(srv)
+        segundo = _em_thread(_post, srv, '/gastos', _gastos(1))
+        assert srv.enfileirados.acquire(timeout=10)
+        # O terceiro não tem lugar: desiste depois de ESPERA_FILA_S
+        terceiro = _em_thread(_post, srv, '/gastos', _gastos(1))
+        time.sleep(0.3)
+    terceiro[0].join()
+    status, corpo, cabecalhos = terceiro[1]['valor']
+    assert status == 503
+    assert cabecalhos['Retry-After'] == '1'
+    for thread, resultado in (primeiro, segundo):
+        thread.join()
+        assert resultado['valor'][0] == 201
+    assert srv.status()['recusados_fila_cheia'] == 1
+
+
+def test_saque_sem_saldo_recebe_422_e_desfaz_o_pedido(servidor):
+    srv = servidor()
+    status, corpo, _ = _post(srv, '/poupanca', {'operacao': 'deposito', 'valor': 100,
+                                                'data': '2024-05-01'})
+    assert status == 201
+    assert corpo['saldo_poupanca_centavos'] == 10000
+
+    status, corpo, _ = _post(srv, '/poupanca', [
+        {'operacao': 'deposito', 'valor': 50, 'data': '2024-05-02'},
+        {'operacao': 'saque', 'valor': 200, 'data': '2024-05-03'}])
+    assert status == 422
+    assert 'saldo insuficiente' in corpo['erro']
+    assert DataManager(srv.dm.data_file).get_saldo_poupanca_centavos() == 10000
+
+    # Retroativo: na data e hoje há saldo, mas o saque de 05-02 já consumiu parte
+    assert _post(srv, '/poupanca', {'operacao': 'saque', 'valor': 80, 'data': '2024-05-10'})[0] == 201
+    assert _post(srv, '/poupanca', {'operacao': 'deposito', 'valor': 80, 'data': '2024-05-20'})[0] == 201
+    status, corpo, _ = _post(srv, '/poupanca', {'operacao': 'saque', 'valor': 50,
+                                                'data': '2024-05-05'})
+    assert status == 422
+
+
+@pytest.mark.parametrize('tamanho', ['abc', '-1', '1e3'])
+def test_content_length_invalido_recebe_400(servidor, tamanho):
+    srv = servidor()
+    status, corpo, _ = _post(srv, '/gastos', None, {'Content-Length': tamanho})
+    assert status == 400
+    assert 'Content-Length' in corpo['erro']
+
+
+def test_gravador_continua_depois_de_falha_na_releitura(servidor, monkeypatch):
+    srv = servidor()
+
+    def falhar(*args, **kwargs):
+        raise OSError("disco indisponível")
+
+    with monkeypatch.context() as m:
+        m.setattr(srv.dm, 'flush', falhar)
+        m.setattr(srv.dm, 'recarregar', falhar)
+        status, corpo, _ = _post(srv, '/gastos', _gastos(3, 'Perdido'))
+    assert status == 500
+
+    # A memória do lote com falha é descartada antes do próximo lote
+    status, corpo, _ = _post(srv, '/gastos', _gastos(2))
+    assert status == 201
+    gastos = DataManager(srv.dm.data_file).get_gastos_df()
+    assert gastos['descricao'].tolist() == ['Mercado', 'Mercado']
@@ -0,0 +1,43 @@
+import json
+from datetime import date
+
+import numpy as np
+
+from data_manager import DataManager
+
+
+def test_ids_repetidos_de_arquivo_antigo_sao_renumerados(tmp_path):
+    caminho = tmp_path / 'dados.json'
+    # Esquema antigo: id = len(lista) + 1, repetido depois de uma exclusão
+    caminho.write_text(json.dumps({
+        'schema_version': 3,
+        'rendimentos': [
+            {'id': 1, 'fonte': 'Salário', 'valor_centavos': 500000, 'data': '2024-01-05', 'descricao': ''}],
+        'gastos': [
+            {'id': 1, 'categoria': '🍔 Alimentação', 'valor_centavos': 1000, 'data': '2024-01-10', 'descricao': 'a'},
+            {'id': 3, 'categoria': '🍔 Alimentação', 'valor_centavos': 2000, 'data': '2024-01-11', 'descricao': 'b'},
+            {'id': 3, 'categoria': '🚗 Transporte', 'valor_centavos': 3000, 'data': '2024-01-12', 'descricao': 'c'},
+            {'id': 2, 'categoria': '🚗 Transporte', 'valor_centavos': 4000, 'data': '2024-01-13', 'descricao': 'd'}],
+        'poupanca': {'saldo_atual_centavos': 0, 'historico': []},
+    }), encoding='utf-8')
+
+    dm = DataManager(str(caminho))
+    gastos = dm.get_gastos_df()
+    assert gastos['id'].tolist() == [1, 3, 4, 2]
+    assert [m['versao'] for m in dm.migracoes_aplicadas] == [4]
+    assert dm.migracoes_aplicadas[0]['alteracoes'] == 1
+
+    patrimonio = dm.get_patrimonio_df()
+    assert patrimonio['descricao'].tolist()[1:] == ['a', 'b', 'c', 'd']
+    assert patrimonio['rotulo'].tolist()[-2:] == ['🚗 Transporte', '🚗 Transporte']
+    assert DataManager(str(caminho)).get_gastos_df()['id'].tolist() == [1, 3, 4, 2]
+
+
+def test_dataframe_compartilha_as_colunas_do_store(tmp_path):
+    dm = DataManager(str(tmp_path / 'dados.json'))
+    dm.add_gasto('🍔 Alimentação', 10.5, date(2024, 5, 10), 'Mercado')
+    store = dm.data['gastos']
+
+    df = store.to_dataframe()
+    assert np.shares_memory(df['id'].to_numpy(), store._ids)
+    assert np.shares_memory(df['valor_centavos'].to_numpy(), store._centavos)
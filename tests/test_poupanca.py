@@ -0,0 +1,36 @@
+from datetime import date
+
+from data_manager import DataManager
+
+
+def test_excluir_deposito_que_cobre_um_saque_e_recusado(tmp_path):
+    dm = DataManager(str(tmp_path / 'dados.json'))
+    dm.update_poupanca('deposito', 100, data=date(2024, 1, 1))
+    dm.update_poupanca('saque', 80, data=date(2024, 2, 1))
+
+    assert not dm.delete_operacao_poupanca(1)
+    assert dm.get_saldo_poupanca_centavos() == 2000
+
+    assert dm.delete_operacao_poupanca(2)
+    assert dm.delete_operacao_poupanca(1)
+    relido = DataManager(dm.data_file)
+    assert relido.get_saldo_poupanca_centavos() == 0
+    assert relido.data['poupanca']['historico'] == []
+
+
+def test_mesclar_recusa_saque_sem_o_deposito_correspondente(tmp_path):
+    dm = DataManager(str(tmp_path / 'dados.json'))
+    dm.update_poupanca('deposito', 50, data=date(2024, 1, 1))
+    backup = {'poupanca': {'historico': [
+        {'id': 1, 'operacao': 'deposito', 'valor_centavos': 5000, 'data': '2024-01-01'},
+        # Saque de 03-01 coberto pelo depósito de 02-01 que vem depois na lista
+        {'id': 3, 'operacao': 'saque', 'valor_centavos': 9000, 'data': '2024-03-01'},
+        {'id': 2, 'operacao': 'deposito', 'valor_centavos': 4000, 'data': '2024-02-01'},
+        # Sem depósito que o cubra
+        {'id': 4, 'operacao': 'saque', 'valor_centavos': 7000, 'data': '2024-04-01'}]}}
+
+    relatorio = dm.mesclar_dados(backup)
+
+    assert relatorio['poupanca'] == {'adicionados': 2, 'duplicados': 1, 'recusados': 1}
+    assert dm.get_saldo_poupanca_centavos() == 0
+    assert dm.verificar_saldo_poupanca()['consistente']
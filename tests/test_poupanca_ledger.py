@@ -0,0 +1,70 @@
+import random
+
+from poupanca_ledger import LedgerPoupanca
+
+
+def _saldo_minimo_bruto(ledger, data):
+    """Saldo ao final da data e de cada dia com operação depois dela"""
+    dias = {item['data'] for item in ledger.itens.values() if item['data'] >= data}
+    return min([ledger.saldo_em(data)] + [ledger.saldo_em(dia) for dia in dias])
+
+
+def _ledger_aleatorio(rng, n):
+    return LedgerPoupanca([{
+        'id': i + 1,
+        'operacao': rng.choice(['deposito', 'saque']),
+        'valor_centavos': rng.randint(1, 1000),
+        'data': f"{rng.choice([2023, 2024, 2025])}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    } for i in range(n)])
+
+
+def test_saque_retroativo_nao_pode_negativar_um_dia_no_meio():
+    ledger = LedgerPoupanca([
+        {'id': 1, 'operacao': 'deposito', 'valor_centavos': 10000, 'data': '2024-01-01'},
+        {'id': 2, 'operacao': 'saque', 'valor_centavos': 8000, 'data': '2024-02-01'},
+        {'id': 3, 'operacao': 'deposito', 'valor_centavos': 8000, 'data': '2024-03-01'}])
+
+    # Saldo na data e saldo atual são 10000, mas em fevereiro sobram 2000
+    assert ledger.saldo_em('2024-01-15') == 10000
+    assert ledger.total == 10000
+    assert ledger.saldo_minimo_desde('2024-01-15') == 2000
+    assert ledger.saldo_minimo_desde('2024-02-15') == 2000
+    assert ledger.saldo_minimo_desde('2024-03-01') == 10000
+
+
+def test_saldo_minimo_bate_com_a_conta_dia_a_dia():
+    rng = random.Random(7)
+    for _ in range(200):
+        ledger = _ledger_aleatorio(rng, rng.randint(0, 30))
+        for data in ('2020-01-01', '2023-06-15', '2024-02-10', '2025-12-31', '2030-01-01'):
+            assert ledger.saldo_minimo_desde(data) == _saldo_minimo_bruto(ledger, data)
+
+
+def test_saldo_minimo_corrigido_nao_altera_o_ledger():
+    rng = random.Random(11)
+    for _ in range(100):
+        ledger = _ledger_aleatorio(rng, rng.randint(1, 30))
+        id_ = rng.choice(list(ledger.itens))
+        campos = {'operacao': 'saque', 'valor_centavos': 500, 'data': '2024-07-07'}
+        desde = min(ledger.itens[id_]['data'], campos['data'])
+        antes = _saldo_minimo_bruto(ledger, '2020-01-01')
+
+        esperado = LedgerPoupanca([dict(item) for item in ledger.itens.values()])
+        esperado.corrigir(id_, **campos)
+        assert ledger.saldo_minimo_corrigido(id_, **campos) == _saldo_minimo_bruto(esperado, desde)
+        assert ledger.saldo_minimo_desde('2020-01-01') == antes
+
+
+def test_saldo_minimo_sem_e_remocao_mantem_o_historico():
+    rng = random.Random(13)
+    for _ in range(100):
+        ledger = _ledger_aleatorio(rng, rng.randint(1, 30))
+        id_ = rng.choice(list(ledger.itens))
+        desde = ledger.itens[id_]['data']
+
+        esperado = LedgerPoupanca([dict(item) for item in ledger.itens.values() if item['id'] != id_])
+        assert ledger.saldo_minimo_sem(id_) == _saldo_minimo_bruto(esperado, desde)
+
+        ledger.remover(id_)
+        assert sorted(item['id'] for item in ledger.historico) == sorted(ledger.itens)
+        assert ledger.total == esperado.total
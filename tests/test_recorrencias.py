@@ -0,0 +1,20 @@
+import pytest
+
+from calculations import FinanceCalculator
+from data_manager import DataManager
+from synthetic_data import GASTOS_RECORRENTES, escrever_dados_sinteticos
+
+PLANTADAS = {descricao for _, descricao, _, _ in GASTOS_RECORRENTES}
+
+
+@pytest.mark.parametrize('seed', [1, 42])
+def test_gastos_plantados_saem_mensais(tmp_path, seed):
+    caminho = escrever_dados_sinteticos(str(tmp_path / 'dados.json'), 20000, seed=seed)
+    gastos_df = DataManager(caminho).get_gastos_df()
+
+    recorrencias = FinanceCalculator.detectar_recorrencias(gastos_df)
+
+    # Só os plantados: avulsos frequentes (ex.: Condomínio) não viram recorrência
+    assert set(recorrencias['descricao']) == PLANTADAS
+    assert (recorrencias['periodo'] == 'mensal').all()
+    assert (recorrencias['ocorrencias'] >= 60).all()
@@ -0,0 +1,46 @@
+import random
+
+import numpy as np
+
+from search_index import IndiceBusca, tokenizar
+
+CATEGORIAS = ['🍔 Alimentação', '🚗 Transporte', '🎓 Educação']
+DESCRICOES = ['Almoço', 'Uber centro', 'Mensalidade faculdade', 'Mercado']
+
+
+def test_remocoes_e_reinclusoes_batem_com_a_busca_direta():
+    rng = random.Random(3)
+    indice = IndiceBusca(('categoria', 'descricao'))
+    registros = {}
+    for id_ in range(1, 301):
+        registros[id_] = {'id': id_, 'categoria': rng.choice(CATEGORIAS),
+                          'descricao': rng.choice(DESCRICOES)}
+        indice.adicionar(registros[id_])
+
+    for _ in range(400):
+        id_ = rng.choice(list(registros))
+        indice.remover(registros[id_])
+        if rng.random() < 0.5:
+            # Edição: volta com outro rótulo (ou o mesmo)
+            registros[id_] = dict(registros[id_], categoria=rng.choice(CATEGORIAS))
+            indice.adicionar(registros[id_])
+        else:
+            del registros[id_]
+
+        consulta = rng.choice(['alim', 'educ mensal', 'uber', 'mercado'])
+        esperado = sorted(i for i, r in registros.items() if all(
+            any(palavra.startswith(termo) for palavra in
+                tokenizar(r['categoria']) + tokenizar(r['descricao']))
+            for termo in consulta.split()))
+        assert indice.buscar(consulta).tolist() == esperado
+
+
+def test_lista_da_categoria_e_compactada():
+    indice = IndiceBusca(('categoria',))
+    for id_ in range(100):
+        indice.adicionar({'id': id_, 'categoria': 'Alimentação'})
+    for id_ in range(60):
+        indice.remover({'id': id_, 'categoria': 'Alimentação'})
+
+    assert np.array_equal(indice.buscar('alimentacao'), np.arange(60, 100))
+    assert len(indice._ids_por_texto[('categoria', 'Alimentação')]) < 100
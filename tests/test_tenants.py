@@ -0,0 +1,40 @@
+from data_manager import DataManager
+from synthetic_data import escrever_dados_sinteticos
+from tenants import PoolDataManagers, caminho_usuario
+
+
+def _pool(tmp_path, usuarios):
+    pasta = str(tmp_path / 'usuarios')
+    pool = PoolDataManagers(pasta, orcamento_bytes=1)
+    for usuario in usuarios:
+        caminho = escrever_dados_sinteticos(caminho_usuario(pasta, usuario), 2000,
+                                            seed=len(usuario))
+        # Regravado pelo DataManager: formato atual, com o cabeçalho lido sob demanda
+        assert DataManager(caminho, sob_demanda=False).save_data()
+    return pool
+
+
+def test_transacoes_lidas_depois_entram_no_orcamento(tmp_path):
+    pool = _pool(tmp_path, ['ana', 'bruno'])
+    # Só o cabeçalho: não conta memória, os dois cabem no orçamento
+    ana = pool.obter('ana')
+    pool.obter('bruno')
+    assert not ana.transacoes_carregadas
+    assert pool.estatisticas()['usuarios_carregados'] == 2
+
+    # A sessão da ana lê as transações; o fim do rerun reestima e descarrega o bruno
+    ana.get_gastos_df()
+    pool.atualizar_memoria('ana')
+    assert pool.estatisticas() == {'usuarios_carregados': 1,
+                                   'memoria_bytes': ana.memoria_bytes(), 'orcamento_bytes': 1}
+
+
+def test_outra_sessao_ve_a_carga_sob_demanda(tmp_path):
+    pool = _pool(tmp_path, ['ana', 'bruno'])
+    ana = pool.obter('ana')
+    ana.get_gastos_df()
+
+    # Sem atualizar_memoria (rerun interrompido): o próximo obter já reestima a ana
+    pool.obter('bruno')
+    assert pool.estatisticas()['usuarios_carregados'] == 1
+    assert isinstance(pool.obter('bruno'), DataManager)
@@ -0,0 +1,491 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from money import reais_para_centavos, reais_para_centavos_lote
+
+# Sentinela para timestamps ausentes (NaT em datetime64)
+TIMESTAMP_AUSENTE = np.iinfo(np.int64).min
+
+CAMPOS_PADRAO = ('id', 'data', 'valor_centavos', 'descricao', 'timestamp')
+
+# Registros montados por vez ao percorrer ou gravar a coleção
+BLOCO_REGISTROS = 50000
+
+# Campo em reais (float) dos arquivos antigos, convertido para centavos na carga
+CAMPO_LEGADO_VALOR = 'valor'
+
+
+class Vocabulario:
+    """Interna strings repetidas como códigos inteiros"""
+
+    def __init__(self):
+        self.valores = []
+        self._codigos = {}
+
+    def codificar(self, valor):
+        """Retorna o código da string, registrando-a se for nova"""
+        valor = '' if valor is None else str(valor)
+        codigo = self._codigos.get(valor)
+        if codigo is None:
+            codigo = self._codigos[valor] = len(self.valores)
+            self.valores.append(valor)
+        return codigo
+
+    def codificar_lote(self, valores):
+        """Codifica uma lista de strings de uma vez"""
+        return np.fromiter((self.codificar(v) for v in valores), dtype=np.int32, count=len(valores))
+
+    def __len__(self):
+        return len(self.valores)
+
+
+class TransactionStore:
+    """Armazena rendimentos ou gastos em colunas NumPy
+
+    Cada transação ocupa ~32 bytes (id, dia, valor em centavos, rótulo,
+    descrição e timestamp) em vez de um dict com seis strings. No DataFrame,
+    ids, valores, códigos e timestamps são visões das próprias colunas; só a
+    data é recalculada.
+    """
+
+    def __init__(self, campo_rotulo, registros=None):
+        self.campo_rotulo = campo_rotulo
+        self._campos = frozenset(
+            CAMPOS_PADRAO + (campo_rotulo, CAMPO_LEGADO_VALOR))
+        self.rotulos = Vocabulario()
+        self.descricoes = Vocabulario()
+        self._n = 0
+        self._max_id = 0
+        self._extras = {}
+        self._alocar(0)
+        if registros is not None:
+            self.extend(registros)
+
+    # ------------------------------------------------------------------
+    # Armazenamento
+    # ------------------------------------------------------------------
+    def _alocar(self, capacidade):
+        """Cria as colunas vazias com a capacidade pedida"""
+        self._ids = np.zeros(capacidade, dtype=np.int64)
+        self._dias = np.zeros(capacidade, dtype=np.int32)
+        self._centavos = np.zeros(capacidade, dtype=np.int64)
+        self._cod_rotulos = np.zeros(capacidade, dtype=np.int32)
+        self._cod_descricoes = np.zeros(capacidade, dtype=np.int32)
+        self._timestamps = np.full(
+            capacidade, TIMESTAMP_AUSENTE, dtype=np.int64)
+
+    def _colunas(self):
+        return ('_ids', '_dias', '_centavos', '_cod_rotulos', '_cod_descricoes', '_timestamps')
+
+    def _garantir_capacidade(self, extra):
+        """Cresce as colunas geometricamente para manter append O(1) amortizado"""
+        necessario = self._n + extra
+        capacidade = len(self._ids)
+        if necessario <= capacidade:
+            return
+        nova = max(necessario, capacidade * 2, 16)
+        for nome in self._colunas():
+            antiga = getattr(self, nome)
+            coluna = np.empty(nova, dtype=antiga.dtype)
+            coluna[:self._n] = antiga[:self._n]
+            setattr(self, nome, coluna)
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+    def append(self, registro):
+        """Adiciona uma transação a partir de um dict"""
+        self._garantir_capacidade(1)
+        i = self._n
+        self._ids[i] = int(registro['id'])
+        self._dias[i] = data_para_dia(registro['data'])
+        self._centavos[i] = _centavos_do_registro(registro)
+        self._cod_rotulos[i] = self.rotulos.codificar(
+            registro.get(self.campo_rotulo))
+        self._cod_descricoes[i] = self.descricoes.codificar(
+            registro.get('descricao'))
+        self._timestamps[i] = _timestamp_para_int(registro.get('timestamp'))
+        self._guardar_extras(registro)
+        self._max_id = max(self._max_id, int(registro['id']))
+        self._n += 1
+
+    def extend(self, registros):
+        """Adiciona várias transações convertendo cada campo em lote
+
+        Aceita dicts ou um DataFrame com um campo por coluna (como o
+        deixado pelas migrações de esquema), lido coluna a coluna.
+        """
+        if isinstance(registros, pd.DataFrame):
+            self._extend_tabela(registros)
+            return
+        registros = list(registros)
+        if not registros:
+            return
+        k = len(registros)
+        self._garantir_capacidade(k)
+        fatia = slice(self._n, self._n + k)
+
+        self._ids[fatia] = np.fromiter(
+            (r['id'] for r in registros), dtype=np.int64, count=k)
+        self._dias[fatia] = np.array(
+            [r['data'] for r in registros], dtype='datetime64[D]').astype(np.int64)
+        if all('valor_centavos' in r for r in registros):
+            self._centavos[fatia] = np.fromiter(
+                (r['valor_centavos'] for r in registros), dtype=np.int64, count=k)
+        elif not any('valor_centavos' in r for r in registros):
+            # Arquivos antigos: 'valor' em reais, convertido de uma vez
+            self._centavos[fatia] = reais_para_centavos_lote(
+                [r[CAMPO_LEGADO_VALOR] for r in registros])
+        else:
+            self._centavos[fatia] = [
+                _centavos_do_registro(r) for r in registros]
+        self._cod_rotulos[fatia] = self.rotulos.codificar_lote(
+            [r.get(self.campo_rotulo) for r in registros])
+        self._cod_descricoes[fatia] = self.descricoes.codificar_lote(
+            [r.get('descricao') for r in registros])
+        self._timestamps[fatia] = _timestamps_lote(
+            [r.get('timestamp') for r in registros])
+
+        for registro in registros:
+            self._guardar_extras(registro)
+        self._max_id = max(self._max_id, int(self._ids[fatia].max()))
+        self._n += k
+
+    def _extend_tabela(self, df):
+        """extend() a partir de um DataFrame, sem montar um dict por linha"""
+        k = len(df)
+        if not k:
+            return
+        self._garantir_capacidade(k)
+        fatia = slice(self._n, self._n + k)
+
+        def coluna(campo):
+            """Valores da coluna como objetos Python, None onde o campo falta"""
+            if campo not in df:
+                return [None] * k
+            return df[campo].astype(object).where(df[campo].notna(), None).tolist()
+
+        self._ids[fatia] = df['id'].to_numpy(dtype=np.int64)
+        self._dias[fatia] = np.array(
+            df['data'].astype(str).str[:10].tolist(), dtype='datetime64[D]').astype(np.int64)
+        centavos = (df['valor_centavos'] if 'valor_centavos' in df
+                    else pd.Series(np.nan, index=df.index))
+        if centavos.isna().any():
+            faltando = centavos.isna().to_numpy()
+            centavos = centavos.to_numpy(dtype=np.float64)
+            centavos[faltando] = reais_para_centavos_lote(
+                df[CAMPO_LEGADO_VALOR].to_numpy()[faltando])
+        self._centavos[fatia] = np.asarray(centavos, dtype=np.int64)
+        self._cod_rotulos[fatia] = self.rotulos.codificar_lote(coluna(self.campo_rotulo))
+        self._cod_descricoes[fatia] = self.descricoes.codificar_lote(coluna('descricao'))
+        self._timestamps[fatia] = _timestamps_lote(coluna('timestamp'))
+
+        extras = [c for c in df.columns if c not in self._campos]
+        if extras:
+            # Só as linhas com algum campo extra preenchido viram dict
+            linhas = np.flatnonzero(df[extras].notna().any(axis=1).to_numpy())
+            tabela = df[extras].iloc[linhas].astype(object)
+            for id_, registro in zip(self._ids[fatia][linhas].tolist(),
+                                     tabela.to_dict('records')):
+                self._extras[id_] = {c: v for c, v in registro.items() if not pd.isna(v)}
+        self._max_id = max(self._max_id, int(self._ids[fatia].max()))
+        self._n += k
+
+    def anexar_de(self, outro, posicoes):
+        """Copia linhas de outro store (mesmo tipo) com ids novos; retorna a posição inicial
+
+        Os códigos de rótulo e descrição são traduzidos de um vocabulário
+        para o outro uma vez por texto distinto, não por linha.
+        """
+        posicoes = np.asarray(posicoes, dtype=np.int64)
+        inicio = self._n
+        k = len(posicoes)
+        if not k:
+            return inicio
+        self._garantir_capacidade(k)
+        fatia = slice(inicio, inicio + k)
+
+        novos_ids = np.arange(self.proximo_id, self.proximo_id + k, dtype=np.int64)
+        self._ids[fatia] = novos_ids
+        self._dias[fatia] = outro._dias[posicoes]
+        self._centavos[fatia] = outro._centavos[posicoes]
+        self._timestamps[fatia] = outro._timestamps[posicoes]
+        mapa_rotulos = self.rotulos.codificar_lote(outro.rotulos.valores)
+        mapa_descricoes = self.descricoes.codificar_lote(outro.descricoes.valores)
+        self._cod_rotulos[fatia] = mapa_rotulos[outro._cod_rotulos[posicoes]]
+        self._cod_descricoes[fatia] = mapa_descricoes[outro._cod_descricoes[posicoes]]
+
+        if outro._extras:
+            for id_antigo, id_novo in zip(outro._ids[posicoes].tolist(), novos_ids.tolist()):
+                if id_antigo in outro._extras:
+                    self._extras[id_novo] = dict(outro._extras[id_antigo])
+        self._max_id = int(novos_ids[-1])
+        self._n += k
+        return inicio
+
+    def remover(self, ids):
+        """Remove as transações com os ids informados"""
+        ids = np.atleast_1d(np.asarray(ids, dtype=np.int64))
+        manter = ~np.isin(self._ids[:self._n], ids)
+        if manter.all():
+            return 0
+
+        removidos = self._n - int(manter.sum())
+        # Compacta em colunas novas para não alterar DataFrames já entregues
+        for nome in self._colunas():
+            setattr(self, nome, getattr(self, nome)[:self._n][manter])
+        self._n -= removidos
+        for id_ in ids.tolist():
+            self._extras.pop(id_, None)
+        return removidos
+
+    def _guardar_extras(self, registro):
+        """Preserva campos fora do esquema padrão sem custo para os demais"""
+        if not registro.keys() <= self._campos:
+            self._extras[int(registro['id'])] = {
+                k: v for k, v in registro.items() if k not in self._campos}
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+    def __len__(self):
+        return self._n
+
+    def __bool__(self):
+        return self._n > 0
+
+    def __iter__(self):
+        for inicio in range(0, self._n, BLOCO_REGISTROS):
+            yield from self._registros_bloco(inicio, min(inicio + BLOCO_REGISTROS, self._n))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._registro(j) for j in range(*i.indices(self._n))]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError('índice fora do intervalo')
+        return self._registro(i)
+
+    def _registro(self, i):
+        """Monta o dict de uma transação (mesmo formato do JSON)"""
+        id_ = int(self._ids[i])
+        registro = {
+            'id': id_,
+            self.campo_rotulo: self.rotulos.valores[self._cod_rotulos[i]],
+            'valor_centavos': int(self._centavos[i]),
+            'data': str(np.datetime64(int(self._dias[i]), 'D')),
+            'descricao': self.descricoes.valores[self._cod_descricoes[i]],
+            'timestamp': _int_para_timestamp(self._timestamps[i])
+        }
+        if id_ in self._extras:
+            registro.update(self._extras[id_])
+        return registro
+
+    def _registros_bloco(self, inicio, fim):
+        """Dicts das posições [inicio, fim), com cada coluna convertida de uma vez"""
+        fatia = slice(inicio, fim)
+        rotulos = self.rotulos.valores
+        descricoes = self.descricoes.valores
+        datas = np.datetime_as_string(self._dias[fatia].astype('datetime64[D]')).tolist()
+        for id_, cod_rotulo, centavos, data, cod_descricao, timestamp in zip(
+                self._ids[fatia].tolist(), self._cod_rotulos[fatia].tolist(),
+                self._centavos[fatia].tolist(), datas,
+                self._cod_descricoes[fatia].tolist(), _timestamps_iso(self._timestamps[fatia])):
+            registro = {
+                'id': id_,
+                self.campo_rotulo: rotulos[cod_rotulo],
+                'valor_centavos': centavos,
+                'data': data,
+                'descricao': descricoes[cod_descricao],
+                'timestamp': timestamp
+            }
+            if id_ in self._extras:
+                registro.update(self._extras[id_])
+            yield registro
+
+    def obter(self, id_):
+        """Retorna o dict da transação com o id informado (ou None)"""
+        posicoes = np.flatnonzero(self._ids[:self._n] == int(id_))
+        return self._registro(posicoes[0]) if len(posicoes) else None
+
+    def obter_lote(self, ids):
+        """Dicts das transações com os ids informados (ids ausentes são ignorados)"""
+        posicoes = np.flatnonzero(np.isin(self._ids[:self._n], np.asarray(ids, dtype=np.int64)))
+        return [self._registro(i) for i in posicoes]
+
+    def agrupar_ids(self, campo, inicio=0):
+        """Agrupa os ids (a partir da posição inicio) por texto distinto do campo"""
+        if campo == self.campo_rotulo:
+            codigos, vocab = self._cod_rotulos[inicio:self._n], self.rotulos
+        else:
+            codigos, vocab = self._cod_descricoes[inicio:self._n], self.descricoes
+
+        ordem = np.argsort(codigos, kind='stable')
+        codigos_ordenados = codigos[ordem]
+        unicos, inicios = np.unique(codigos_ordenados, return_index=True)
+        grupos = np.split(self._ids[inicio:self._n][ordem], inicios[1:])
+        return {vocab.valores[c]: ids for c, ids in zip(unicos.tolist(), grupos)}
+
+    def visao_colunas(self):
+        """Colunas numéricas (somente leitura) para operações em lote"""
+        visoes = {}
+        for chave, nome in (('id', '_ids'), ('dia', '_dias'), ('valor_centavos', '_centavos'),
+                            ('cod_rotulo', '_cod_rotulos'), ('cod_descricao', '_cod_descricoes')):
+            visao = getattr(self, nome)[:self._n]
+            visao.flags.writeable = False
+            visoes[chave] = visao
+        return visoes
+
+    def contar_rotulos_por_descricao(self, inicio=0):
+        """Lista (descricao, rotulo, quantidade) de cada par distinto"""
+        pares = (self._cod_descricoes[inicio:self._n].astype(np.int64) << 32) | \
+            self._cod_rotulos[inicio:self._n].astype(np.int64)
+        unicos, quantidades = np.unique(pares, return_counts=True)
+        return [(self.descricoes.valores[p >> 32], self.rotulos.valores[p & 0xFFFFFFFF], n)
+                for p, n in zip(unicos.tolist(), quantidades.tolist())]
+
+    def atualizar_rotulo(self, id_, rotulo):
+        """Troca o rótulo (fonte/categoria) de uma transação"""
+        posicoes = np.flatnonzero(self._ids[:self._n] == int(id_))
+        if not len(posicoes):
+            return False
+        # Coluna nova para não alterar DataFrames já entregues
+        self._cod_rotulos = self._cod_rotulos.copy()
+        self._cod_rotulos[posicoes] = self.rotulos.codificar(rotulo)
+        return True
+
+    def to_records(self):
+        """Retorna a lista de dicts (visão compatível com o formato JSON)"""
+        return list(self)
+
+    @property
+    def proximo_id(self):
+        return self._max_id + 1
+
+    def memoria_bytes(self):
+        """Memória usada pelas colunas e pelos vocabulários"""
+        colunas = sum(getattr(self, nome)[:self._n].nbytes
+                      for nome in self._colunas())
+        vocab = sum(len(s.encode('utf-8')) + 49
+                    for s in self.rotulos.valores + self.descricoes.valores)
+        return colunas + vocab
+
+    def to_dataframe(self):
+        """Monta o DataFrame com visões somente leitura de id, valor, códigos e timestamp
+
+        A coluna data (dias -> datetime64[s]) é a única alocada a cada chamada.
+        """
+        n = self._n
+
+        def visao(coluna):
+            v = coluna[:n]
+            v.flags.writeable = False
+            return v
+
+        dias = self._dias[:n].astype(np.int64) * 86400
+        df = pd.DataFrame({
+            'id': visao(self._ids),
+            self.campo_rotulo: pd.Categorical.from_codes(
+                visao(self._cod_rotulos), self.rotulos.valores, validate=False),
+            'valor_centavos': visao(self._centavos),
+            'data': dias.view('datetime64[s]'),
+            'descricao': pd.Categorical.from_codes(
+                visao(self._cod_descricoes), self.descricoes.valores, validate=False),
+            'timestamp': visao(self._timestamps).view('datetime64[us]')
+        }, copy=False)
+        return df
+
+    def escrever_json(self, f, indent='  ', posicoes=None):
+        """Grava a coleção (ou só as linhas em posicoes) como array JSON, um registro por linha
+
+        O texto de cada linha é o mesmo de json.dumps(registro), montado a
+        partir das colunas: rótulos e descrições são codificados uma vez
+        por texto distinto, não por linha.
+        """
+        if posicoes is None:
+            posicoes = np.arange(self._n)
+        chave_rotulo = json.dumps(self.campo_rotulo)
+        rotulos = [json.dumps(v, ensure_ascii=False) for v in self.rotulos.valores]
+        descricoes = [json.dumps(v, ensure_ascii=False) for v in self.descricoes.valores]
+        f.write('[')
+        for inicio in range(0, len(posicoes), BLOCO_REGISTROS):
+            fatia = posicoes[inicio:inicio + BLOCO_REGISTROS]
+            datas = np.datetime_as_string(self._dias[fatia].astype('datetime64[D]')).tolist()
+            timestamps = ['null' if t is None else f'"{t}"'
+                          for t in _timestamps_iso(self._timestamps[fatia])]
+            linhas = []
+            for i, id_, cod_rotulo, centavos, data, cod_descricao, timestamp in zip(
+                    fatia.tolist(), self._ids[fatia].tolist(), self._cod_rotulos[fatia].tolist(),
+                    self._centavos[fatia].tolist(), datas,
+                    self._cod_descricoes[fatia].tolist(), timestamps):
+                if id_ in self._extras:
+                    linhas.append(json.dumps(self._registro(i), ensure_ascii=False))
+                else:
+                    linhas.append(
+                        f'{{"id": {id_}, {chave_rotulo}: {rotulos[cod_rotulo]}, '
+                        f'"valor_centavos": {centavos}, "data": "{data}", '
+                        f'"descricao": {descricoes[cod_descricao]}, "timestamp": {timestamp}}}')
+            f.write('\n' if inicio == 0 else ',\n')
+            f.write(indent * 2)
+            f.write(f',\n{indent * 2}'.join(linhas))
+        f.write(f'\n{indent}]' if len(posicoes) else ']')
+
+
+def data_para_dia(data):
+    """Converte 'AAAA-MM-DD' (ou date) no número de dias desde 1970-01-01"""
+    return int(np.datetime64(str(data)[:10], 'D').astype(np.int64))
+
+
+def _timestamp_para_int(timestamp):
+    """Converte um timestamp ISO em microssegundos desde a época"""
+    if not timestamp:
+        return TIMESTAMP_AUSENTE
+    try:
+        ts = pd.Timestamp(timestamp)
+        if ts.tz is not None:
+            ts = ts.tz_localize(None)
+        return int(ts.value // 1000)
+    except (ValueError, TypeError):
+        return TIMESTAMP_AUSENTE
+
+
+def _timestamps_lote(valores):
+    """Timestamps ISO (ou None) em microssegundos desde a época, de uma vez"""
+    timestamps = pd.to_datetime(pd.Series(valores, dtype=object),
+                                format='ISO8601', errors='coerce')
+    if getattr(timestamps.dt, 'tz', None) is not None:
+        timestamps = timestamps.dt.tz_localize(None)
+    return timestamps.to_numpy(dtype='datetime64[us]').view(np.int64)
+
+
+def _timestamps_iso(valores):
+    """Lista de timestamps ISO (ou None) de microssegundos desde a época
+
+    Mesmo texto de pd.Timestamp.isoformat(): segundos inteiros sem a fração.
+    """
+    valores = np.asarray(valores, dtype=np.int64)
+    datas = valores.view('datetime64[us]')
+    textos = np.where(valores % 1_000_000 == 0,
+                      np.datetime_as_string(datas, unit='s'),
+                      np.datetime_as_string(datas, unit='us')).tolist()
+    ausentes = np.flatnonzero(valores == TIMESTAMP_AUSENTE)
+    for i in ausentes.tolist():
+        textos[i] = None
+    return textos
+
+
+def _int_para_timestamp(valor):
+    """Converte microssegundos desde a época em timestamp ISO"""
+    if valor == TIMESTAMP_AUSENTE:
+        return None
+    return pd.Timestamp(int(valor), unit='us').isoformat()
+
+
+def _centavos_do_registro(registro):
+    """Lê o valor em centavos, aceitando o campo legado em reais"""
+    if 'valor_centavos' in registro:
+        return int(registro['valor_centavos'])
+    return reais_para_centavos(registro[CAMPO_LEGADO_VALOR])
@@ -1,11 +1,12 @@
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
-import streamlit as st
+from money import centavos_para_reais
+from profiling import perfil
 
 
+@perfil.instrumentar
 class FinanceVisualizations:
 
     @staticmethod
@@ -14,7 +15,10 @@ class FinanceVisualizations:
         if historico_df.empty:
             return None
 
-        # Usar 'saldo_atual' em vez de 'saldo'
+        # Saldo em reais apenas para exibição
+        historico_df = historico_df.assign(
+            saldo_atual=centavos_para_reais(historico_df['saldo_atual_centavos']))
+
         fig = px.line(
             historico_df,
             x='data',
@@ -125,6 +129,280 @@ class FinanceVisualizations:
 
         return fig
 
+    @staticmethod
+    def plot_fluxo_projetado(fluxo_df):
+        """Fluxo de caixa mensal projetado a partir das recorrências"""
+        if fluxo_df.empty:
+            return None
+
+        fig = go.Figure()
+
+        fig.add_trace(go.Bar(
+            name='Rendimentos',
+            x=fluxo_df['mes_ano'],
+            y=fluxo_df['total_rendimentos'],
+            marker_color='green'
+        ))
+
+        fig.add_trace(go.Bar(
+            name='Gastos',
+            x=fluxo_df['mes_ano'],
+            y=-fluxo_df['total_gastos'],
+            marker_color='red'
+        ))
+
+        fig.add_trace(go.Scatter(
+            name='Saldo',
+            x=fluxo_df['mes_ano'],
+            y=fluxo_df['saldo_mensal'],
+            mode='lines+markers',
+            line=dict(color='blue', width=2)
+        ))
+
+        fig.update_layout(
+            title='🔁 Fluxo de Caixa Projetado (recorrências)',
+            xaxis_title='Mês/Ano',
+            yaxis_title='Valor (R\$)',
+            barmode='relative',
+            hovermode='x unified'
+        )
+
+        return fig
+
+    @staticmethod
+    def plot_previsao_categorias(historico_df, previsao_df):
+        """Histórico mensal e previsão (com intervalo) de cada categoria"""
+        if previsao_df.empty:
+            return None
+
+        fig = go.Figure()
+        cores = px.colors.qualitative.Plotly
+
+        for i, (categoria, previsao) in enumerate(previsao_df.groupby('categoria', sort=False)):
+            cor = cores[i % len(cores)]
+            historico = historico_df[historico_df['categoria'] == categoria]
+
+            fig.add_trace(go.Scatter(
+                name=categoria,
+                legendgroup=categoria,
+                x=historico['mes_ano'],
+                y=historico['valor'],
+                mode='lines',
+                line=dict(color=cor, width=2)
+            ))
+
+            # Faixa do intervalo: superior e depois inferior invertido, preenchido
+            fig.add_trace(go.Scatter(
+                legendgroup=categoria,
+                x=list(previsao['mes_ano']) + list(previsao['mes_ano'])[::-1],
+                y=list(previsao['superior']) + list(previsao['inferior'])[::-1],
+                fill='toself',
+                fillcolor=cor,
+                opacity=0.15,
+                line=dict(width=0),
+                hoverinfo='skip',
+                showlegend=False
+            ))
+
+            fig.add_trace(go.Scatter(
+                name=f'{categoria} (previsão)',
+                legendgroup=categoria,
+                x=previsao['mes_ano'],
+                y=previsao['previsto'],
+                mode='lines+markers',
+                line=dict(color=cor, width=2, dash='dash'),
+                showlegend=False
+            ))
+
+        fig.update_layout(
+            title='🔮 Previsão de Gastos por Categoria',
+            xaxis_title='Mês/Ano',
+            yaxis_title='Valor (R\$)',
+            hovermode='x unified'
+        )
+
+        return fig
+
+    @staticmethod
+    def plot_orcamentos(status_df):
+        """Gasto do mês, projeção de fim de mês e limite de cada orçamento"""
+        if status_df.empty:
+            return None
+
+        cores = {'estourado': 'red', 'vai_estourar': 'orange',
+                 'atencao': 'gold', 'ok': 'green'}
+        fig = go.Figure()
+
+        fig.add_trace(go.Bar(
+            name='Gasto no mês',
+            y=status_df['categoria'],
+            x=centavos_para_reais(status_df['gasto_centavos']),
+            orientation='h',
+            marker_color=status_df['alerta'].map(cores)
+        ))
+
+        fig.add_trace(go.Scatter(
+            name='Projeção fim do mês',
+            y=status_df['categoria'],
+            x=centavos_para_reais(status_df['projetado_centavos']),
+            mode='markers',
+            marker=dict(symbol='diamond', size=10, color='gray')
+        ))
+
+        fig.add_trace(go.Scatter(
+            name='Limite',
+            y=status_df['categoria'],
+            x=centavos_para_reais(status_df['limite_centavos']),
+            mode='markers',
+            marker=dict(symbol='line-ns-open', size=24, color='black', line=dict(width=3))
+        ))
+
+        fig.update_layout(
+            title='🎯 Orçamentos do Mês',
+            xaxis_title='Valor (R\$)',
+            yaxis=dict(autorange='reversed'),
+            hovermode='y unified'
+        )
+
+        return fig
+
+    @staticmethod
+    def plot_orcado_realizado(comparacao_df):
+        """Utilização mensal de cada orçamento (100% = limite)"""
+        if comparacao_df.empty:
+            return None
+
+        fig = px.line(
+            comparacao_df.assign(utilizacao=comparacao_df['utilizacao'] * 100),
+            x='mes_ano',
+            y='utilizacao',
+            color='categoria',
+            markers=True,
+            title='🎯 Orçado x Realizado'
+        )
+        fig.add_hline(y=100, line_dash='dash', line_color='red')
+
+        fig.update_layout(
+            xaxis_title='Mês/Ano',
+            yaxis_title='Utilização do orçamento (%)'
+        )
+
+        return fig
+
+    @staticmethod
+    def plot_janelas_moveis(janelas_df, canal='gastos', janelas=(7, 30, 90)):
+        """Média diária móvel de rendimentos ou gastos em várias janelas"""
+        if janelas_df.empty:
+            return None
+
+        fig = go.Figure()
+        larguras = [1, 2, 3]
+
+        for i, w in enumerate(janelas):
+            fig.add_trace(go.Scatter(
+                name=f'{w} dias',
+                x=janelas_df['data'],
+                y=janelas_df[f'{canal}_{w}d_media'],
+                mode='lines',
+                line=dict(width=larguras[i % len(larguras)])
+            ))
+
+        fig.update_layout(
+            title=f'📉 {canal.capitalize()}: média diária móvel',
+            xaxis_title='Data',
+            yaxis_title='Valor por dia (R\$)',
+            hovermode='x unified'
+        )
+
+        return fig
+
+    @staticmethod
+    def plot_fluxo_acumulado(janelas_df):
+        """Fluxo líquido acumulado (rendimentos - gastos) dia a dia"""
+        if janelas_df.empty:
+            return None
+
+        fig = go.Figure()
+
+        fig.add_trace(go.Scatter(
+            name='Fluxo líquido acumulado',
+            x=janelas_df['data'],
+            y=janelas_df['fluxo_liquido_acumulado'],
+            mode='lines',
+            fill='tozeroy',
+            line=dict(color='blue', width=2)
+        ))
+
+        fig.update_layout(
+            title='💹 Fluxo de Caixa Líquido Acumulado',
+            xaxis_title='Data',
+            yaxis_title='Valor (R\$)',
+            hovermode='x unified'
+        )
+
+        return fig
+
+    @staticmethod
+    def plot_agregados_semanais(semanal_df):
+        """Rendimentos, gastos e saldo por semana"""
+        if semanal_df.empty:
+            return None
+
+        fig = go.Figure()
+
+        for coluna, nome, cor in (('total_rendimentos', 'Rendimentos', 'green'),
+                                  ('total_gastos', 'Gastos', 'red'),
+                                  ('saldo_semanal', 'Saldo', 'blue')):
+            fig.add_trace(go.Scatter(
+                name=nome,
+                x=semanal_df['semana'],
+                y=semanal_df[coluna],
+                mode='lines+markers',
+                line=dict(color=cor, width=2)
+            ))
+
+        fig.update_layout(
+            title='📅 Tendência Semanal',
+            xaxis_title='Semana',
+            yaxis_title='Valor (R\$)',
+            hovermode='x unified'
+        )
+
+        return fig
+
+    @staticmethod
+    def plot_patrimonio(patrimonio_df):
+        """Saldo de caixa, poupança e patrimônio total ao fim de cada dia"""
+        if patrimonio_df.empty:
+            return None
+
+        # Último lançamento de cada dia
+        datas = patrimonio_df['data'].to_numpy()
+        fim_do_dia = np.r_[datas[1:] != datas[:-1], True]
+        diario = patrimonio_df[fim_do_dia]
+
+        fig = go.Figure()
+
+        for coluna, nome, cor, largura in (('caixa_centavos', 'Caixa', 'green', 1),
+                                           ('poupanca_centavos', 'Poupança', 'orange', 1),
+                                           ('patrimonio_centavos', 'Patrimônio', 'blue', 3)):
+            fig.add_trace(go.Scatter(
+                name=nome,
+                x=diario['data'],
+                y=centavos_para_reais(diario[coluna]),
+                mode='lines',
+                line=dict(color=cor, width=largura)
+            ))
+
+        fig.update_layout(
+            title='🏛️ Evolução do Patrimônio',
+            xaxis_title='Data',
+            yaxis_title='Valor (R\$)',
+            hovermode='x unified'
+        )
+
+        return fig
+
     @staticmethod
     def plot_objetivo_progresso(saldo_atual, valor_meta, nome_objetivo):
         """Gráfico de progresso do objetivo"""
@@ -156,7 +434,7 @@ class FinanceVisualizations:
         return fig
 
     @staticmethod
-    def plot_evolucao_poupanca_melhorado(historico_df):
+    def plot_evolucao_poupanca_melhorado(historico_df, rendimento_df=None):
         """Gráfico melhorado de evolução da poupança com marcadores de operações"""
         if historico_df.empty:
             return None
@@ -165,6 +443,10 @@ class FinanceVisualizations:
         if 'data' in historico_df.columns:
             historico_df['data'] = pd.to_datetime(historico_df['data'])
 
+        # Saldo em reais apenas para exibição
+        historico_df['saldo_atual'] = centavos_para_reais(
+            historico_df['saldo_atual_centavos'])
+
         # Criar gráfico base
         fig = go.Figure()
 
@@ -178,6 +460,17 @@ class FinanceVisualizations:
             marker=dict(size=6)
         ))
 
+        # Saldo com o rendimento CDI acumulado (dias úteis)
+        if rendimento_df is not None and not rendimento_df.empty:
+            fig.add_trace(go.Scatter(
+                x=rendimento_df['data'],
+                y=centavos_para_reais(
+                    rendimento_df['saldo_com_rendimento_centavos']),
+                mode='lines',
+                name='Saldo com Rendimento (CDI)',
+                line=dict(color='orange', width=2, dash='dot')
+            ))
+
         # Marcar depósitos
         depositos = historico_df[historico_df['operacao'] == 'deposito']
         if not depositos.empty: